@@ -0,0 +1,38 @@
+import os
+import sys
+
+# --- Application Configuration ---
+# Kept here (not in main.py) so windows can read it without importing main,
+# which under "python main.py" would load the entry script a second time.
+APP_NAME = "Johnny Bravo Media Tools"
+APP_GEOMETRY = "400x350"
+ICON_NAME = "favicon.ico"
+
+# Headless job server ("python main.py --serve")
+SERVER_HOST = "127.0.0.1"
+SERVER_PORT = 8750
+SERVER_TOKEN_ENV = "JOHNNY_BRAVO_API_TOKEN" # Optional: use this "Authorization: Bearer <token>" instead of the saved one
+
+# --- Application Data Directory ---
+# Journals, caches and indexes are stored per user, outside the install folder,
+# so they survive updates of the packaged .exe.
+DATA_DIR_NAME = "JohnnyBravoMediaTools"
+DATA_DIR_ENV = "JOHNNY_BRAVO_DATA_DIR" # Optional override (e.g. for render boxes)
+
+
+def get_data_dir():
+    """Returns (and creates) the per-user data directory of the application."""
+    data_dir = os.environ.get(DATA_DIR_ENV)
+    if not data_dir:
+        if sys.platform == "win32":
+            base_dir = os.environ.get("APPDATA") or os.path.expanduser("~")
+        else:
+            base_dir = os.environ.get("XDG_DATA_HOME") or os.path.join(os.path.expanduser("~"), ".local", "share")
+        data_dir = os.path.join(base_dir, DATA_DIR_NAME)
+    os.makedirs(data_dir, exist_ok=True)
+    return data_dir
+
+
+def data_path(*parts):
+    """Returns a path inside the application data directory."""
+    return os.path.join(get_data_dir(), *parts)
@@ -0,0 +1,262 @@
+import math
+import time
+import threading
+import subprocess
+import collections
+
+from media_probe import get_probe_cache, file_signature
+
+# --- Audio Analysis ---
+# A quick look at a file before converting it: waveform overview, peak and
+# RMS levels and silent spans. ffmpeg decodes the first audio stream to raw
+# float PCM on a pipe, which is read in fixed-size chunks and reduced with
+# vectorized NumPy, so memory stays constant however long the file is.
+# Results are cached in the probe cache database, next to the probe data.
+# Needs NumPy (pip install numpy); everything else works without it.
+
+SAMPLE_RATE = 22050 # Hz; plenty for levels and an overview, and cheap to reduce
+CHUNK_FRAMES = 65536 # Frames read from the pipe at a time
+WAVEFORM_BUCKETS = 1000 # Overview points (the result holds 1x-2x this many min/max pairs)
+SILENCE_THRESHOLD_DB = -50.0 # dBFS; quieter windows count as silence
+SILENCE_WINDOW_SECONDS = 0.05
+MIN_SILENCE_SECONDS = 0.5
+MAX_SILENCE_SPANS = 1000 # Keeps the result bounded for pathological files
+PROGRESS_INTERVAL = 0.25 # Seconds of wall time between progress callbacks
+ANALYSIS_VERSION = 1 # Bump when the output changes, so cached results are recomputed
+
+STDERR_TAIL_LINES = 20
+NUMPY_MISSING_MESSAGE = "Audio analysis needs NumPy: pip install numpy"
+
+
+class AnalysisError(Exception):
+    """Raised when a file can't be analyzed (no audio, ffmpeg error, NumPy missing)."""
+
+
+class AnalysisCancelled(AnalysisError):
+    """Raised when a running analysis is cancelled."""
+
+
+def analysis_params():
+    """Returns the settings a cached result must have been computed with."""
+    return (f"v{ANALYSIS_VERSION}:{SAMPLE_RATE}:{WAVEFORM_BUCKETS}:{SILENCE_THRESHOLD_DB}:"
+            f"{SILENCE_WINDOW_SECONDS}:{MIN_SILENCE_SECONDS}")
+
+
+def to_db(value):
+    """Converts a linear amplitude to dBFS (None for digital silence)."""
+    return round(20 * math.log10(value), 2) if value > 0 else None
+
+
+class PcmAnalyzer:
+    """Reduces a stream of float PCM chunks to waveform, levels and silence spans."""
+    def __init__(self, channels, sample_rate=SAMPLE_RATE, expected_frames=None):
+        import numpy as np
+        self.np = np
+        self.channels = channels
+        self.sample_rate = sample_rate
+        # Start near the final bucket size if the length is known; buckets are merged as they pile up
+        self.bucket_frames = max(1, (expected_frames or 0) // WAVEFORM_BUCKETS) or 1024
+        self.window_frames = max(1, int(sample_rate * SILENCE_WINDOW_SECONDS))
+
+        self.frames = 0
+        self.peak = 0.0
+        self.sum_squares = 0.0
+        self.mins = np.empty(0, dtype=np.float32)
+        self.maxs = np.empty(0, dtype=np.float32)
+        self.bucket_rest = np.empty((0, channels), dtype=np.float32) # Frames short of a full bucket
+        self.window_rest = np.empty((0, channels), dtype=np.float32) # Frames short of a full window
+        self.windows = 0
+        self.in_silence = False
+        self.silence_start = 0 # Window index where the current silent run began
+        self.silences = []
+
+    def feed(self, data):
+        """Adds raw little-endian float32 PCM (a whole number of frames)."""
+        np = self.np
+        samples = np.frombuffer(data, dtype="<f4").reshape(-1, self.channels)
+        if not len(samples):
+            return
+        self.frames += len(samples)
+        self.peak = max(self.peak, float(np.abs(samples).max()))
+        self.sum_squares += float(np.square(samples, dtype=np.float64).sum())
+        self._add_buckets(samples)
+        self._add_windows(samples)
+
+    def _add_buckets(self, samples):
+        """Folds samples into min/max waveform buckets."""
+        np = self.np
+        samples = np.concatenate((self.bucket_rest, samples))
+        full = len(samples) // self.bucket_frames * self.bucket_frames
+        buckets = samples[:full].reshape(-1, self.bucket_frames * self.channels)
+        self.mins = np.concatenate((self.mins, buckets.min(axis=1)))
+        self.maxs = np.concatenate((self.maxs, buckets.max(axis=1)))
+        self.bucket_rest = samples[full:]
+        if len(self.mins) >= 2 * WAVEFORM_BUCKETS:
+            # Too many points: merge neighbours and double the bucket size
+            if len(self.mins) % 2:
+                # The odd last bucket (just built from this chunk) goes back to the pending frames
+                self.mins, self.maxs = self.mins[:-1], self.maxs[:-1]
+                self.bucket_rest = samples[full - self.bucket_frames:]
+            self.mins = self.mins.reshape(-1, 2).min(axis=1)
+            self.maxs = self.maxs.reshape(-1, 2).max(axis=1)
+            self.bucket_frames *= 2
+
+    def _add_windows(self, samples):
+        """Finds silent runs from the RMS of short windows."""
+        np = self.np
+        samples = np.concatenate((self.window_rest, samples))
+        full = len(samples) // self.window_frames * self.window_frames
+        windows = samples[:full].reshape(-1, self.window_frames * self.channels)
+        self.window_rest = samples[full:]
+        if not len(windows):
+            return
+
+        rms = np.sqrt(np.square(windows, dtype=np.float64).mean(axis=1))
+        silent = rms < 10 ** (SILENCE_THRESHOLD_DB / 20)
+        # Only the indices where silence starts or ends are handled in Python
+        states = np.concatenate(([self.in_silence], silent))
+        for index in np.flatnonzero(states[1:] != states[:-1]):
+            if silent[index]:
+                self.silence_start = self.windows + int(index)
+            else:
+                self._close_silence(self.windows + int(index))
+        self.in_silence = bool(silent[-1])
+        self.windows += len(windows)
+
+    def _close_silence(self, end_window):
+        """Records a silent run if it is long enough."""
+        seconds = self.window_frames / self.sample_rate
+        if (end_window - self.silence_start) * seconds >= MIN_SILENCE_SECONDS \
+                and len(self.silences) < MAX_SILENCE_SPANS:
+            self.silences.append([round(self.silence_start * seconds, 3), round(end_window * seconds, 3)])
+
+    def result(self):
+        """Returns the analysis as a JSON-serializable dict."""
+        np = self.np
+        mins, maxs = self.mins, self.maxs
+        if len(self.bucket_rest):
+            mins = np.append(mins, self.bucket_rest.min())
+            maxs = np.append(maxs, self.bucket_rest.max())
+        if self.in_silence:
+            self._close_silence(self.windows)
+            self.in_silence = False
+        samples = self.frames * self.channels
+        return {
+            "duration": round(self.frames / self.sample_rate, 3),
+            "channels": self.channels,
+            "peak": round(self.peak, 6),
+            "peak_db": to_db(self.peak),
+            "rms_db": to_db(math.sqrt(self.sum_squares / samples)) if samples else None,
+            "bucket_seconds": self.bucket_frames / self.sample_rate,
+            "waveform": [[round(float(low), 4), round(float(high), 4)] for low, high in zip(mins, maxs)],
+            "silence_threshold_db": SILENCE_THRESHOLD_DB,
+            "silences": self.silences,
+        }
+
+
+def _drain_stderr(pipe, tail):
+    """(THREAD) Keeps the end of ffmpeg's log for error messages."""
+    for raw in iter(pipe.readline, b""):
+        tail.append(raw.decode(errors="replace").rstrip())
+    pipe.close()
+
+
+def audio_stream_info(media_info):
+    """Returns (channels, duration in seconds) of the first audio stream in probe data."""
+    for stream in (media_info or {}).get("streams", []):
+        if stream.get("codec_type") == "audio":
+            try:
+                duration = float(stream.get("duration") or media_info.get("format", {}).get("duration") or 0)
+            except (TypeError, ValueError):
+                duration = 0.0
+            return int(stream.get("channels") or 2), duration or None
+    return None, None
+
+
+def run_analysis(input_file, media_info=None, cancel_event=None, on_progress=None):
+    """
+    Decodes input_file through a pipe and analyzes it (see PcmAnalyzer).
+    on_progress receives the fraction done (0-1) if the duration is known.
+    Raises AnalysisError on failure and AnalysisCancelled if cancel_event is set.
+    """
+    import ffmpeg
+    channels, duration = audio_stream_info(media_info)
+    if media_info and channels is None:
+        raise AnalysisError("The file has no audio stream")
+    channels = min(channels or 2, 2) # Levels of a surround mix are judged on its stereo downmix
+    expected_frames = int(duration * SAMPLE_RATE) if duration else None
+    try:
+        analyzer = PcmAnalyzer(channels, SAMPLE_RATE, expected_frames)
+    except ImportError:
+        raise AnalysisError(NUMPY_MISSING_MESSAGE)
+
+    stream = ffmpeg.input(input_file).audio.output("pipe:", format="f32le", acodec="pcm_f32le",
+                                                   ac=channels, ar=SAMPLE_RATE)
+    args = ffmpeg.compile(stream.global_args("-nostdin", "-loglevel", "error"))
+    process = subprocess.Popen(args, stdin=subprocess.DEVNULL, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+    stderr_tail = collections.deque(maxlen=STDERR_TAIL_LINES)
+    stderr_thread = threading.Thread(target=_drain_stderr, args=(process.stderr, stderr_tail), daemon=True)
+    stderr_thread.start()
+
+    frame_bytes = 4 * channels
+    chunk_bytes = CHUNK_FRAMES * frame_bytes
+    leftover = b"" # A read may end mid-frame
+    reported_at = 0.0
+    try:
+        while True:
+            if cancel_event is not None and cancel_event.is_set():
+                raise AnalysisCancelled("Analysis cancelled")
+            data = process.stdout.read(chunk_bytes)
+            if not data:
+                break
+            data = leftover + data
+            usable = len(data) // frame_bytes * frame_bytes
+            analyzer.feed(data[:usable])
+            leftover = data[usable:]
+            if on_progress and expected_frames:
+                now = time.monotonic()
+                if now - reported_at >= PROGRESS_INTERVAL:
+                    reported_at = now
+                    on_progress(min(1.0, analyzer.frames / expected_frames))
+    except BaseException:
+        process.terminate()
+        raise
+    finally:
+        process.stdout.close()
+        process.wait()
+        stderr_thread.join(timeout=5)
+
+    if process.returncode != 0:
+        raise AnalysisError(stderr_tail[-1] if stderr_tail else "ffmpeg failed to decode the audio")
+    if not analyzer.frames:
+        raise AnalysisError("The file has no decodable audio")
+    return analyzer.result()
+
+
+def analyze_audio(input_file, cancel_event=None, on_progress=None, use_cache=True):
+    """
+    Returns the analysis of input_file (see PcmAnalyzer.result), from the
+    cache if the file hasn't changed since it was last analyzed.
+    """
+    signature = file_signature(input_file)
+    if signature is None:
+        raise AnalysisError(f"File not found: '{input_file}'")
+
+    cache = get_probe_cache()
+    if use_cache:
+        cached = cache.lookup_analysis(signature, analysis_params())
+        if cached is not None:
+            return cached
+
+    result = run_analysis(input_file, cache.probe(input_file), cancel_event, on_progress)
+    cache.store_analysis(signature, analysis_params(), result)
+    return result
+
+
+def format_analysis(result):
+    """Returns a one-line summary of an analysis, for status labels."""
+    peak = f"{result['peak_db']:.1f} dBFS" if result["peak_db"] is not None else "silent"
+    rms = f"{result['rms_db']:.1f} dBFS" if result["rms_db"] is not None else "n/a"
+    silent_seconds = sum(end - start for start, end in result["silences"])
+    return (f"Peak: {peak} | RMS: {rms} | Silence: {len(result['silences'])} spans, "
+            f"{silent_seconds:.1f}s of {result['duration']:.1f}s")
@@ -0,0 +1,143 @@
+import os
+import time
+import threading
+import subprocess
+import collections
+
+from converter_core import ConversionError, STDERR_TAIL_LINES, remove_partial_output, _drain_stderr
+
+# --- Streaming Audio Download ---
+# In Audio (MP3) mode the downloaded bytes are piped straight into an ffmpeg
+# encoder, so transcoding overlaps the download and no intermediate audio
+# file is written. Only plain HTTP(S) formats can be streamed this way;
+# fragmented (DASH/HLS) media falls back to the normal download + convert.
+
+STREAM_AUDIO_FORMAT = ("bestaudio[protocol^=http][protocol!*=dash]"
+                       "/best[protocol^=http][protocol!*=dash]")
+STREAM_READ_SIZE = 256 * 1024
+MP3_BITRATE = "192k"
+MP3_BYTES_PER_SECOND = 192 * 1000 // 8
+
+
+class StreamUnavailable(Exception):
+    """Raised when a URL has no format that can be streamed into ffmpeg."""
+
+
+def select_stream_format(ydl, info):
+    """
+    Returns the processed info of the best streamable audio format of info
+    (ydl must use STREAM_AUDIO_FORMAT). Raises StreamUnavailable if there is none.
+    """
+    import yt_dlp
+    try:
+        selected = ydl.process_ie_result(info, download=False)
+    except yt_dlp.utils.DownloadError as e:
+        raise StreamUnavailable(str(e)) from e
+    if selected.get("requested_formats") or not selected.get("url"):
+        raise StreamUnavailable("No single streamable format")
+    return selected
+
+
+def _byte_ranges(selected):
+    """
+    Yields the (start, end) byte ranges to request. Sites like YouTube throttle
+    single large requests, so their chunk size (if yt-dlp sets one) is honoured.
+    """
+    chunk_size = (selected.get("downloader_options") or {}).get("http_chunk_size")
+    total = selected.get("filesize")
+    if not chunk_size or not total:
+        yield None
+        return
+    for start in range(0, total, chunk_size):
+        yield start, min(start + chunk_size, total) - 1
+
+
+def _open_stream(ydl, selected):
+    """Yields the response bodies of the selected format, one per byte range."""
+    from yt_dlp.networking import Request
+    for byte_range in _byte_ranges(selected):
+        headers = dict(selected.get("http_headers") or {})
+        if byte_range is not None:
+            headers["Range"] = "bytes=%d-%d" % byte_range
+        yield ydl.urlopen(Request(selected["url"], headers=headers))
+
+
+def _progress(selected, output_file, downloaded, total, started):
+    """Builds a yt-dlp style progress dict for the queue's progress hook."""
+    from yt_dlp.utils import format_bytes
+    elapsed = time.monotonic() - started
+    speed = downloaded / elapsed if elapsed > 0 else None
+    percent = downloaded / total * 100 if total else None
+    return {
+        "status": "downloading",
+        "filename": output_file,
+        "downloaded_bytes": downloaded,
+        "total_bytes": total,
+        "speed": speed,
+        "eta": (total - downloaded) / speed if total and speed else None,
+        "elapsed": elapsed,
+        "info_dict": selected,
+        "_percent_str": f"{percent:.1f}%" if percent is not None else "...",
+        "_speed_str": f"{format_bytes(speed)}/s" if speed else "...",
+    }
+
+
+def stream_to_mp3(ydl, info, progress_hook):
+    """
+    Downloads the best streamable audio of info and encodes it to MP3 while it
+    arrives. The output path comes from ydl's 'outtmpl'. Returns the output path.
+    Raises StreamUnavailable (nothing written) if the media can't be streamed.
+    """
+    import ffmpeg
+    from yt_dlp.utils import ContentTooShortError
+    selected = select_stream_format(ydl, info)
+    output_file = ydl.prepare_filename(selected)
+    part_file = output_file + ".part"
+    os.makedirs(os.path.dirname(os.path.abspath(output_file)), exist_ok=True)
+
+    stream = ffmpeg.output(ffmpeg.input("pipe:0"), part_file, vn=None, acodec="libmp3lame",
+                           audio_bitrate=MP3_BITRATE, f="mp3")
+    args = ffmpeg.compile(stream.global_args("-nostats", "-loglevel", "error"), overwrite_output=True)
+    process = subprocess.Popen(args, stdin=subprocess.PIPE, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE)
+
+    stderr_tail = collections.deque(maxlen=STDERR_TAIL_LINES)
+    stderr_thread = threading.Thread(target=_drain_stderr, args=(process.stderr, stderr_tail), daemon=True)
+    stderr_thread.start()
+
+    total = selected.get("filesize") or selected.get("filesize_approx")
+    downloaded = 0
+    started = time.monotonic()
+    try:
+        for response in _open_stream(ydl, selected):
+            with response:
+                expected = int(response.headers.get("Content-Length") or 0)
+                if total is None and expected:
+                    total = expected # Single, unranged request
+                received = 0
+                for chunk in iter(lambda: response.read(STREAM_READ_SIZE), b""):
+                    process.stdin.write(chunk)
+                    received += len(chunk)
+                    downloaded += len(chunk)
+                    progress_hook(_progress(selected, output_file, downloaded, total, started))
+                # A dropped connection just ends the body; don't publish a truncated MP3
+                if expected and received < expected:
+                    raise ContentTooShortError(received, expected)
+        process.stdin.close()
+        process.wait()
+    except BrokenPipeError:
+        process.wait() # ffmpeg stopped reading; its log says why
+    except BaseException:
+        process.kill()
+        process.wait()
+        remove_partial_output(part_file)
+        raise
+    finally:
+        stderr_thread.join(timeout=5)
+
+    if process.returncode != 0:
+        remove_partial_output(part_file)
+        raise ConversionError(stderr_tail[-1] if stderr_tail else "ffmpeg failed", list(stderr_tail))
+
+    os.replace(part_file, output_file)
+    progress_hook(dict(_progress(selected, output_file, downloaded, downloaded, started), status="finished"))
+    return output_file
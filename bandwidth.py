@@ -0,0 +1,202 @@
+import re
+import json
+import time
+import threading
+from contextlib import contextmanager
+
+from app_config import data_path
+
+# --- Bandwidth Scheduler ---
+# One download budget for the whole app, split evenly across the downloads
+# that are running right now and re-split whenever one starts or finishes.
+# Each download is paced in its progress hook (called by yt-dlp, and by the
+# MP3 streamer, after every block), so shares change live for plain, segmented
+# and streamed downloads alike. An optional schedule lowers or lifts the
+# budget at certain times of day (e.g. office hours). Settings live in bandwidth.json:
+#   {"limit": "4M", "schedule": [{"start": "09:00", "end": "18:00", "limit": "1M"}]}
+# Limits are bytes/s with an optional K/M/G suffix; 0 or null means unlimited.
+
+SETTINGS_FILE = "bandwidth.json"
+MIN_SHARE = 16 * 1024 # Bytes/s; keeps every download moving however many run at once
+BURST_SECONDS = 1.0 # A download may run ahead of its share by this much, then waits
+MAX_WAIT_STEP = 0.5 # Seconds; the progress hook is re-run this often while waiting (to notice cancel)
+SCHEDULE_CHECK_INTERVAL = 10 # Seconds between checks for a new schedule window
+
+_RATE_PATTERN = re.compile(r"^\s*(\d+(?:\.\d+)?)\s*([KMG]?)i?B?\s*$", re.IGNORECASE)
+_RATE_UNITS = {"": 1, "K": 1024, "M": 1024 ** 2, "G": 1024 ** 3}
+
+
+def parse_rate(value):
+    """Turns 500000, "500K" or "1.5M" into bytes/s. Returns None for unlimited (0, None, "")."""
+    if value in (None, ""):
+        return None
+    if isinstance(value, (int, float)):
+        return int(value) or None
+    match = _RATE_PATTERN.match(str(value))
+    if not match:
+        raise ValueError(f"Invalid rate '{value}' (use e.g. 500K or 2M)")
+    return int(float(match.group(1)) * _RATE_UNITS[match.group(2).upper()]) or None
+
+
+def parse_clock(value):
+    """Turns "HH:MM" into minutes after midnight."""
+    hours, minutes = str(value).split(":")
+    return int(hours) * 60 + int(minutes)
+
+
+class DownloadThrottle:
+    """Paces one download to its share of the budget (a token bucket fed at the share rate)."""
+    def __init__(self, scheduler):
+        self.scheduler = scheduler
+        self.lock = threading.Lock() # Fragments of one download report from several threads
+        self.seen = {} # file name -> downloaded bytes at the last hook call
+        self.tokens = 0.0 # Bytes that may still be downloaded without waiting; negative = debt
+        self.refilled_at = time.monotonic()
+
+    def wrap_hook(self, progress_hook):
+        """
+        Returns progress_hook, pacing the download after each reported block.
+        While it waits, progress_hook is called again so a cancel raised from it still stops the download.
+        """
+        def hook(d):
+            progress_hook(d)
+            if d.get("status") != "downloading":
+                return
+            delay = self.consume(d.get("filename"), d.get("downloaded_bytes") or 0)
+            while delay > 0:
+                time.sleep(min(delay, MAX_WAIT_STEP))
+                progress_hook(d)
+                delay = self.consume(None, 0)
+        return hook
+
+    def consume(self, filename, downloaded):
+        """Accounts for the bytes downloaded since the last call; returns the seconds to wait."""
+        self.scheduler.refresh()
+        rate = self.scheduler.share_rate
+        with self.lock:
+            now = time.monotonic()
+            # Refill (up to the burst) before taking the new bytes out, so idle time never buys more than one burst
+            if rate is not None:
+                self.tokens = min(self.tokens + (now - self.refilled_at) * rate, rate * BURST_SECONDS)
+            self.refilled_at = now
+            if filename is not None:
+                # The first report of a file (also after resuming) only sets the baseline
+                self.tokens -= max(0, downloaded - self.seen.get(filename, downloaded))
+                self.seen[filename] = downloaded
+            if rate is None:
+                self.tokens = 0.0
+                return 0.0
+            return -self.tokens / rate if self.tokens < 0 else 0.0
+
+
+class BandwidthScheduler:
+    """Splits a global download budget evenly across the running downloads."""
+    def __init__(self, limit=None, schedule=()):
+        self.lock = threading.Lock()
+        self.limit = limit # Bytes/s outside of schedule windows, None = unlimited
+        self.schedule = list(schedule) # [(start minute, end minute, bytes/s or None)]
+        self.active = 0 # Running downloads
+        self.budget = None # Budget the current share was computed from
+        self.share_rate = None # Bytes/s each running download may use, None = unlimited
+        self.checked_at = 0.0
+
+    def current_limit(self, now=None):
+        """Returns the budget (bytes/s, None = unlimited) in effect at now (default: current time)."""
+        local = time.localtime(now)
+        minute = local.tm_hour * 60 + local.tm_min
+        for start, end, limit in self.schedule:
+            # Windows may wrap around midnight (e.g. 22:00-06:00)
+            if start <= minute < end or (end < start and (minute >= start or minute < end)):
+                return limit
+        return self.limit
+
+    def set_limit(self, limit):
+        """Changes the budget (bytes/s, None = unlimited); running downloads follow at once."""
+        with self.lock:
+            self.limit = limit
+            self._rebalance()
+
+    def set_schedule(self, schedule):
+        """Replaces the time-of-day schedule; running downloads follow at once."""
+        with self.lock:
+            self.schedule = list(schedule)
+            self._rebalance()
+
+    @contextmanager
+    def share(self):
+        """Counts a download as running while the block runs; yields its DownloadThrottle."""
+        with self.lock:
+            self.active += 1
+            self._rebalance()
+        try:
+            yield DownloadThrottle(self)
+        finally:
+            with self.lock:
+                self.active -= 1
+                self._rebalance()
+
+    def refresh(self):
+        """Rebalances if a schedule window started or ended since the last check."""
+        now = time.monotonic()
+        if not self.schedule or now - self.checked_at < SCHEDULE_CHECK_INTERVAL:
+            return
+        with self.lock:
+            self.checked_at = now
+            if self.current_limit() != self.budget:
+                self._rebalance()
+
+    def _rebalance(self):
+        """Recomputes the equal share of every running download (lock must be held)."""
+        self.budget = self.current_limit()
+        if self.budget is None or not self.active:
+            self.share_rate = None
+        else:
+            self.share_rate = max(MIN_SHARE, self.budget // self.active)
+
+
+# --- Settings ---
+
+def load_settings(path=None):
+    """Returns (limit, schedule) from the settings file; unlimited if it is missing or broken."""
+    try:
+        with open(path or data_path(SETTINGS_FILE), encoding="utf-8") as f:
+            settings = json.load(f)
+        schedule = [(parse_clock(entry["start"]), parse_clock(entry["end"]), parse_rate(entry.get("limit")))
+                    for entry in settings.get("schedule", [])]
+        return parse_rate(settings.get("limit")), schedule
+    except FileNotFoundError:
+        return None, []
+    except (OSError, ValueError, KeyError, TypeError, AttributeError) as e:
+        print(f"Bandwidth settings error: {e}")
+        return None, []
+
+
+def save_limit(limit, path=None):
+    """Stores the budget (bytes/s, None = unlimited) in the settings file, keeping its schedule."""
+    path = path or data_path(SETTINGS_FILE)
+    try:
+        with open(path, encoding="utf-8") as f:
+            settings = json.load(f)
+    except (OSError, ValueError):
+        settings = {}
+    settings["limit"] = limit
+    try:
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(settings, f, indent=2)
+    except OSError as e:
+        print(f"Could not save bandwidth settings: {e}")
+
+
+# --- Shared Instance ---
+
+_scheduler = None
+_scheduler_lock = threading.Lock()
+
+
+def get_bandwidth_scheduler():
+    """Returns the shared scheduler, configured from the settings file on first use."""
+    global _scheduler
+    with _scheduler_lock:
+        if _scheduler is None:
+            _scheduler = BandwidthScheduler(*load_settings())
+        return _scheduler
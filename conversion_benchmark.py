@@ -0,0 +1,208 @@
+import os
+import sys
+import json
+import time
+import argparse
+import platform
+import statistics
+import subprocess
+
+from converter_core import PRESETS, convert_file, describe_conversion, run_ffmpeg
+from encoder_profiles import PROFILES
+
+# --- Conversion Benchmark ---
+# Headless benchmark of every File Converter preset over deterministic inputs
+# generated from ffmpeg's synthetic sources (testsrc2 + sine). Conversions go
+# through convert_file, the same path as the GUI, with the output cache off.
+# Usage:
+#   python conversion_benchmark.py --json results.json
+#   python conversion_benchmark.py --json new.json --compare results.json
+#   python conversion_benchmark.py --profile fast_draft   # with an encoder profile
+
+DEFAULT_DURATIONS = (10, 60) # Seconds
+DEFAULT_RESOLUTIONS = ("640x360", "1280x720")
+DEFAULT_THRESHOLD = 0.10 # Slowdowns above 10% are reported as regressions
+
+# Codecs of the generated inputs, per input extension
+SOURCE_OPTIONS = {
+    ".mp4": {"vcodec": "libx264", "acodec": "aac"},
+    ".mkv": {"vcodec": "libx264", "acodec": "aac"},
+    ".avi": {"vcodec": "mpeg4", "acodec": "libmp3lame"},
+    ".wav": {"acodec": "pcm_s16le"},
+    ".mp3": {"acodec": "libmp3lame", "audio_bitrate": "192k"},
+    ".m4a": {"acodec": "aac"},
+}
+AUDIO_EXTENSIONS = (".wav", ".mp3", ".m4a")
+
+
+def preset_input_ext(preset_name):
+    """Returns the input extension a preset is benchmarked with (its first open pattern)."""
+    pattern = PRESETS[preset_name]["open_types"][0][1].split(";")[0]
+    return os.path.splitext(pattern)[1]
+
+
+def generate_input(work_dir, ext, duration, resolution):
+    """Creates (once) a deterministic synthetic input file and returns its path."""
+    import ffmpeg
+    is_audio = ext in AUDIO_EXTENSIONS
+    name = f"src_{duration}s{ext}" if is_audio else f"src_{resolution}_{duration}s{ext}"
+    path = os.path.join(work_dir, name)
+    if os.path.exists(path):
+        return path
+
+    audio = ffmpeg.input(f"sine=frequency=440:sample_rate=48000:duration={duration}", f="lavfi")
+    streams = [audio]
+    if not is_audio:
+        streams.insert(0, ffmpeg.input(f"testsrc2=size={resolution}:rate=30:duration={duration}", f="lavfi"))
+
+    options = dict(SOURCE_OPTIONS[ext], fflags="+bitexact", flags="+bitexact")
+    if not is_audio:
+        options["pix_fmt"] = "yuv420p"
+    run_ffmpeg(ffmpeg.output(*streams, path + ".tmp" + ext, **options), path + ".tmp" + ext)
+    os.replace(path + ".tmp" + ext, path)
+    return path
+
+
+def plan_cases(preset_names, durations, resolutions):
+    """Returns the (preset, input extension, duration, resolution) cases to run."""
+    cases = []
+    for preset_name in preset_names:
+        ext = preset_input_ext(preset_name)
+        for duration in durations:
+            if ext in AUDIO_EXTENSIONS:
+                cases.append((preset_name, ext, duration, None))
+            else:
+                cases.extend((preset_name, ext, duration, resolution) for resolution in resolutions)
+    return cases
+
+
+def children_cpu_time():
+    """CPU seconds used by finished child processes (ffmpeg). Always 0 on Windows."""
+    times = os.times()
+    return times.children_user + times.children_system
+
+
+def run_case(work_dir, preset_name, ext, duration, resolution, repeat, profile=None):
+    """Converts one synthetic input repeat times and returns the median measurements."""
+    input_file = generate_input(work_dir, ext, duration, resolution)
+    output_file = os.path.join(work_dir, f"out_{preset_name}_{resolution or 'audio'}_{duration}s"
+                                         f"{PRESETS[preset_name]['save_ext']}")
+    walls, cpus = [], []
+    for _ in range(repeat):
+        cpu_started = children_cpu_time()
+        started = time.perf_counter()
+        result = convert_file(preset_name, input_file, output_file, use_cache=False, profile=profile)
+        walls.append(time.perf_counter() - started)
+        cpus.append(children_cpu_time() - cpu_started)
+
+    wall = statistics.median(walls)
+    cpu = statistics.median(cpus)
+    return {
+        "case": f"{preset_name}/{resolution or 'audio'}/{duration}s/{profile or 'preset'}",
+        "preset": preset_name,
+        "profile": profile,
+        "resolution": resolution,
+        "duration": duration,
+        "wall_seconds": wall,
+        "cpu_seconds": cpu if cpu > 0 else None,
+        "realtime_factor": duration / wall if wall > 0 else None,
+        "output_bytes": os.path.getsize(output_file),
+        "mode": describe_conversion(result) or "encoded",
+    }
+
+
+def environment_info():
+    """Describes the machine and ffmpeg build, so results are only compared like with like."""
+    try:
+        ffmpeg_version = subprocess.run(["ffmpeg", "-version"], capture_output=True,
+                                        text=True).stdout.splitlines()[0]
+    except (OSError, IndexError):
+        ffmpeg_version = "unknown"
+    return {
+        "created": time.strftime("%Y-%m-%d %H:%M:%S"),
+        "python": sys.version.split()[0],
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "ffmpeg": ffmpeg_version,
+    }
+
+
+def case_key(entry):
+    """Returns what makes two results comparable: preset, input size and length, and encoder profile."""
+    return entry["preset"], entry["resolution"], entry["duration"], entry.get("profile")
+
+
+def compare_results(results, baseline, threshold=DEFAULT_THRESHOLD):
+    """
+    Prints the wall time change of every case also found in baseline (run
+    with the same encoder profile). Returns the cases that got slower than threshold allows.
+    """
+    previous = {case_key(entry): entry for entry in baseline["results"]}
+    regressions = []
+    compared = 0
+    for entry in results:
+        old = previous.get(case_key(entry))
+        if old is None:
+            continue
+        compared += 1
+        change = entry["wall_seconds"] / old["wall_seconds"] - 1 if old["wall_seconds"] else 0
+        marker = " <-- REGRESSION" if change > threshold else ""
+        print(f"{entry['case']:48} {old['wall_seconds']:8.2f}s -> {entry['wall_seconds']:8.2f}s "
+              f"({change:+.1%}){marker}")
+        if marker:
+            regressions.append(entry["case"])
+    if not compared:
+        print("No case of the baseline matches these results (different presets, sizes or profile).")
+    return regressions
+
+
+def print_header():
+    """Prints the header of the results table."""
+    print(f"{'case':48} {'wall':>8} {'cpu':>8} {'x rt':>7} {'size':>10}  mode")
+
+
+def print_row(entry):
+    """Prints one row of the results table."""
+    cpu = f"{entry['cpu_seconds']:.2f}s" if entry["cpu_seconds"] is not None else "n/a"
+    factor = f"{entry['realtime_factor']:.1f}x" if entry["realtime_factor"] else "n/a"
+    print(f"{entry['case']:48} {entry['wall_seconds']:7.2f}s {cpu:>8} {factor:>7} "
+          f"{entry['output_bytes'] / 1024 ** 2:8.2f}MB  {entry['mode']}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the File Converter presets on synthetic media.")
+    parser.add_argument("--presets", nargs="+", choices=sorted(PRESETS), default=list(PRESETS))
+    parser.add_argument("--durations", nargs="+", type=int, default=list(DEFAULT_DURATIONS))
+    parser.add_argument("--resolutions", nargs="+", default=list(DEFAULT_RESOLUTIONS))
+    parser.add_argument("--profile", choices=sorted(PROFILES),
+                        help="encoder profile (default: the presets' own settings)")
+    parser.add_argument("--repeat", type=int, default=1, help="runs per case (the median is kept)")
+    parser.add_argument("--work-dir", default="benchmark_media", help="where inputs and outputs are kept")
+    parser.add_argument("--json", help="save the results to this file")
+    parser.add_argument("--compare", help="earlier results file to compare against")
+    parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD)
+    args = parser.parse_args()
+
+    os.makedirs(args.work_dir, exist_ok=True)
+    results = []
+    print_header()
+    for case in plan_cases(args.presets, args.durations, args.resolutions):
+        results.append(run_case(args.work_dir, *case, repeat=max(1, args.repeat), profile=args.profile))
+        print_row(results[-1])
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump({"environment": environment_info(), "results": results}, f, indent=2)
+
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            baseline = json.load(f)
+        print()
+        regressions = compare_results(results, baseline, args.threshold)
+        if regressions:
+            print(f"{len(regressions)} regressions above {args.threshold:.0%}")
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
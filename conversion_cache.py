@@ -0,0 +1,227 @@
+import os
+import json
+import time
+import shutil
+import sqlite3
+import hashlib
+import threading
+
+from app_config import data_path
+from media_probe import file_signature
+
+# --- Conversion Output Cache ---
+# Content-addressed store of finished conversions. The key is the SHA-256
+# of the input's bytes plus the preset's ffmpeg options, so converting the
+# same source with the same preset again is served by a hardlink (or copy)
+# of the earlier output instead of a new encode.
+
+CACHE_DIR_NAME = "conversion_cache"
+CACHE_INDEX_FILE = "index.sqlite3"
+DEFAULT_MAX_BYTES = 20 * 1024 ** 3 # 20 GB
+HASH_CHUNK_SIZE = 1024 * 1024
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS entries (
+    key TEXT PRIMARY KEY,
+    path TEXT NOT NULL,
+    size INTEGER NOT NULL,
+    mtime_ns INTEGER NOT NULL,
+    created REAL NOT NULL,
+    last_used REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS entries_lru ON entries (last_used);
+CREATE TABLE IF NOT EXISTS input_hashes (
+    path TEXT PRIMARY KEY,
+    size INTEGER NOT NULL,
+    mtime_ns INTEGER NOT NULL,
+    sha256 TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS stats (
+    name TEXT PRIMARY KEY,
+    value INTEGER NOT NULL
+);
+"""
+
+
+def link_or_copy(source, destination):
+    """Hardlinks source to destination, copying if linking isn't possible (e.g. across drives)."""
+    try:
+        os.link(source, destination)
+    except OSError:
+        shutil.copy2(source, destination)
+
+
+class ConversionCache:
+    """
+    Size-capped, least-recently-used cache of conversion outputs with
+    persistent hit/miss counters.
+    """
+    def __init__(self, cache_dir=None, max_bytes=DEFAULT_MAX_BYTES):
+        self.cache_dir = cache_dir or data_path(CACHE_DIR_NAME)
+        self.max_bytes = max_bytes
+        os.makedirs(self.cache_dir, exist_ok=True)
+
+        self.lock = threading.Lock()
+        self.conn = sqlite3.connect(os.path.join(self.cache_dir, CACHE_INDEX_FILE),
+                                    check_same_thread=False, isolation_level=None)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.executescript(_SCHEMA)
+
+    # --- Keys ---
+
+    def content_hash(self, input_file):
+        """Returns the SHA-256 of a file, reusing the stored hash while size and mtime match."""
+        signature = file_signature(input_file)
+        if signature is None:
+            raise FileNotFoundError(input_file)
+        path, size, mtime_ns = signature
+
+        with self.lock:
+            row = self.conn.execute(
+                "SELECT sha256 FROM input_hashes WHERE path=? AND size=? AND mtime_ns=?",
+                (path, size, mtime_ns)).fetchone()
+        if row:
+            return row[0]
+
+        digest = hashlib.sha256()
+        with open(path, "rb") as f:
+            for chunk in iter(lambda: f.read(HASH_CHUNK_SIZE), b""):
+                digest.update(chunk)
+        sha256 = digest.hexdigest()
+
+        with self.lock:
+            self.conn.execute(
+                "INSERT OR REPLACE INTO input_hashes (path, size, mtime_ns, sha256) VALUES (?, ?, ?, ?)",
+                (path, size, mtime_ns, sha256))
+        return sha256
+
+    def make_key(self, input_file, options, save_ext):
+        """Returns the cache key of converting input_file with the given ffmpeg options."""
+        material = json.dumps({"input": self.content_hash(input_file), "options": options, "ext": save_ext},
+                              sort_keys=True)
+        return hashlib.sha256(material.encode()).hexdigest()
+
+    def entry_path(self, key, save_ext):
+        """Returns where the cached output of a key is stored."""
+        return os.path.join(self.cache_dir, key[:2], key + save_ext)
+
+    # --- Lookups ---
+
+    def fetch(self, key, output_file):
+        """
+        Places the cached output of key at output_file.
+        Returns True on a hit, False on a miss.
+        """
+        with self.lock:
+            row = self.conn.execute("SELECT path, size, mtime_ns FROM entries WHERE key=?", (key,)).fetchone()
+        if row is None:
+            self._count("misses")
+            return False
+
+        path, size, mtime_ns = row
+        signature = file_signature(path)
+        if signature is None or signature[1:] != (size, mtime_ns):
+            # Missing or modified in place (e.g. through a hardlinked output): drop it
+            self._remove_entry(key, path)
+            self._count("misses")
+            return False
+
+        if os.path.lexists(output_file):
+            os.remove(output_file)
+        link_or_copy(path, output_file)
+
+        with self.lock:
+            self.conn.execute("UPDATE entries SET last_used=? WHERE key=?", (time.time(), key))
+        self._count("hits")
+        self._count("bytes_saved", size)
+        return True
+
+    def store(self, key, output_file, save_ext):
+        """Adds a finished output to the cache, then evicts old entries over the size cap."""
+        size = os.path.getsize(output_file)
+        if size > self.max_bytes:
+            return
+
+        path = self.entry_path(key, save_ext)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        if os.path.lexists(path):
+            os.remove(path)
+        link_or_copy(output_file, path)
+
+        now = time.time()
+        with self.lock:
+            self.conn.execute(
+                "INSERT OR REPLACE INTO entries (key, path, size, mtime_ns, created, last_used) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (key, path, size, os.stat(path).st_mtime_ns, now, now))
+        self.evict()
+
+    def evict(self):
+        """Removes least-recently-used entries until the cache fits its size cap."""
+        with self.lock:
+            total = self.conn.execute("SELECT COALESCE(SUM(size), 0) FROM entries").fetchone()[0]
+            if total <= self.max_bytes:
+                return
+            rows = self.conn.execute("SELECT key, path, size FROM entries ORDER BY last_used").fetchall()
+
+        for key, path, size in rows:
+            if total <= self.max_bytes:
+                break
+            self._remove_entry(key, path)
+            total -= size
+
+    def _remove_entry(self, key, path):
+        """Deletes one cache entry and its file."""
+        try:
+            if os.path.lexists(path):
+                os.remove(path)
+        except OSError as e:
+            print(f"Could not remove cache file '{path}': {e}")
+        with self.lock:
+            self.conn.execute("DELETE FROM entries WHERE key=?", (key,))
+
+    # --- Statistics ---
+
+    def _count(self, name, amount=1):
+        """Increments a persistent counter."""
+        with self.lock:
+            self.conn.execute(
+                "INSERT INTO stats (name, value) VALUES (?, ?) "
+                "ON CONFLICT(name) DO UPDATE SET value = value + excluded.value",
+                (name, amount))
+
+    def stats(self):
+        """Returns hits, misses, bytes saved, entry count and cache size."""
+        with self.lock:
+            counters = dict(self.conn.execute("SELECT name, value FROM stats").fetchall())
+            entries, total = self.conn.execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM entries").fetchone()
+        return {
+            "hits": counters.get("hits", 0),
+            "misses": counters.get("misses", 0),
+            "bytes_saved": counters.get("bytes_saved", 0),
+            "entries": entries,
+            "total_bytes": total,
+        }
+
+
+def format_cache_stats(stats):
+    """Formats cache statistics for a status label."""
+    saved_gb = stats["bytes_saved"] / 1024 ** 3
+    used_gb = stats["total_bytes"] / 1024 ** 3
+    return (f"Cache: {stats['hits']} hits / {stats['misses']} misses | "
+            f"Saved: {saved_gb:.2f} GB | Size: {used_gb:.2f} GB")
+
+
+# --- Shared Instance ---
+
+_conversion_cache = None
+_conversion_cache_lock = threading.Lock()
+
+
+def get_conversion_cache():
+    """Returns the shared conversion cache."""
+    global _conversion_cache
+    with _conversion_cache_lock:
+        if _conversion_cache is None:
+            _conversion_cache = ConversionCache()
+        return _conversion_cache
@@ -0,0 +1,964 @@
+import os
+import re
+import time
+import fnmatch
+import threading
+import subprocess
+import collections
+from contextlib import ExitStack
+from concurrent.futures import ThreadPoolExecutor
+
+from job_journal import KIND_CONVERT, JOB_DONE, JOB_FAILED, JOB_CANCELLED
+from job_metrics import JOB_SKIPPED, file_size
+from media_probe import get_probe_cache
+from conversion_cache import get_conversion_cache
+from scratch import staged_output
+from encoder_profiles import apply_profile
+
+# --- Conversion Core ---
+# Tk-free conversion logic shared by the File Converter window and batch mode.
+# Everything in here is safe to call from worker threads.
+
+# --- Conversion Presets ---
+# Each preset describes one button of the File Converter window:
+# the file dialog filters, the target extension and the ffmpeg output options.
+PRESETS = {
+    "mp4_to_avi": {
+        "label": "MP4 to AVI",
+        "kind": "video",
+        "open_types": [("MP4 Files", "*.mp4")],
+        "save_types": [("AVI Files", "*.avi")],
+        "save_ext": ".avi",
+        "options": {"vcodec": "libxvid"},
+    },
+    "avi_to_mp4": {
+        "label": "AVI to MP4",
+        "kind": "video",
+        "open_types": [("AVI Files", "*.avi")],
+        "save_types": [("MP4 Files", "*.mp4")],
+        "save_ext": ".mp4",
+        "options": {"vcodec": "libx264"},
+    },
+    "mkv_to_mp4": {
+        "label": "MKV to MP4",
+        "kind": "video",
+        "open_types": [("MKV Files", "*.mkv")],
+        "save_types": [("MP4 Files", "*.mp4")],
+        "save_ext": ".mp4",
+        "options": {"vcodec": "libx264", "acodec": "copy"},
+    },
+    "mp4_to_mkv": {
+        "label": "MP4 to MKV",
+        "kind": "video",
+        "open_types": [("MP4 Files", "*.mp4")],
+        "save_types": [("MKV Files", "*.mkv")],
+        "save_ext": ".mkv",
+        "options": {"vcodec": "copy", "acodec": "copy"},
+    },
+    "wav_to_mp3": {
+        "label": "WAV to MP3",
+        "kind": "audio",
+        "open_types": [("WAV Files", "*.wav")],
+        "save_types": [("MP3 Files", "*.mp3")],
+        "save_ext": ".mp3",
+        "options": {"acodec": "libmp3lame", "audio_bitrate": "192k"},
+    },
+    "mp3_to_wav": {
+        "label": "MP3 to WAV",
+        "kind": "audio",
+        "open_types": [("MP3 Files", "*.mp3")],
+        "save_types": [("WAV Files", "*.wav")],
+        "save_ext": ".wav",
+        "options": {},
+    },
+    "m4a_to_mp3": {
+        "label": "M4A to MP3",
+        "kind": "audio",
+        "open_types": [("M4A Files", "*.m4a")],
+        "save_types": [("MP3 Files", "*.mp3")],
+        "save_ext": ".mp3",
+        "options": {"acodec": "libmp3lame", "audio_bitrate": "192k"},
+    },
+    "mp3_to_m4a": {
+        "label": "MP3 to M4A",
+        "kind": "audio",
+        "open_types": [("MP3 Files", "*.mp3")],
+        "save_types": [("M4A Files", "*.m4a")],
+        "save_ext": ".m4a",
+        "options": {"acodec": "aac"},
+    },
+    "video_to_audio": {
+        "label": "Extract Audio (to MP3)",
+        "kind": "extract",
+        "open_types": [("Video Files", "*.mp4;*.avi;*.mkv")],
+        "save_types": [("MP3 Files", "*.mp3")],
+        "save_ext": ".mp3",
+        "options": {"vn": None, "acodec": "libmp3lame", "audio_bitrate": "192k"},
+    },
+    # Native extraction: the audio stream is copied out as it is when the container can hold it
+    "video_to_m4a": {
+        "label": "Extract Audio (to M4A, AAC/ALAC copy)",
+        "kind": "extract",
+        "open_types": [("Video Files", "*.mp4;*.mkv;*.mov;*.webm;*.avi")],
+        "save_types": [("M4A Files", "*.m4a")],
+        "save_ext": ".m4a",
+        "options": {"vn": None, "sn": None, "acodec": "copy", "audio_bitrate": "192k"},
+    },
+    "video_to_opus": {
+        "label": "Extract Audio (to Opus, Opus copy)",
+        "kind": "extract",
+        "open_types": [("Video Files", "*.webm;*.mkv;*.mp4;*.mov")],
+        "save_types": [("Opus Files", "*.opus")],
+        "save_ext": ".opus",
+        "options": {"vn": None, "sn": None, "acodec": "copy", "audio_bitrate": "128k"},
+    },
+    "video_to_mka": {
+        "label": "Extract Audio (to MKA, any codec copy)",
+        "kind": "extract",
+        "open_types": [("Video Files", "*.mp4;*.mkv;*.mov;*.webm;*.avi")],
+        "save_types": [("Matroska Audio Files", "*.mka")],
+        "save_ext": ".mka",
+        "options": {"vn": None, "sn": None, "acodec": "copy"},
+    },
+}
+
+# --- Native Audio Extraction ---
+# "Original format" extraction is not a preset of its own: every input is
+# probed and mapped to the extract preset whose container holds its audio
+# codec as it is, so the stream is copied (seconds) instead of re-encoded
+# (minutes). MP3 is only encoded when the MP3 preset is chosen explicitly.
+NATIVE_AUDIO = "video_to_native_audio"
+NATIVE_AUDIO_LABEL = "Extract Audio (Original Format)"
+NATIVE_AUDIO_PRESETS = {
+    "aac": "video_to_m4a",
+    "alac": "video_to_m4a",
+    "opus": "video_to_opus",
+    "mp3": "video_to_audio", # Already MP3: copied into the .mp3 as it is
+}
+NATIVE_AUDIO_FALLBACK = "video_to_mka" # Matroska audio holds any codec (Vorbis, FLAC, AC-3, PCM...)
+
+SUCCESS_MESSAGES = {
+    "video": "Conversion Successful!",
+    "audio": "Conversion Successful!",
+    "extract": "Audio Extraction Successful!",
+}
+
+# Batch job states, as shown in the batch window
+STATUS_QUEUED = "Queued"
+STATUS_RUNNING = "Running"
+STATUS_DONE = "Done"
+STATUS_FAILED = "Failed"
+STATUS_CANCELLED = "Cancelled"
+STATUS_SKIPPED = "Skipped"
+
+WAV_BYTES_PER_SECOND = 48000 * 2 * 2 # 48 kHz, 16-bit stereo PCM
+
+
+class ConversionError(Exception):
+    """Raised when ffmpeg exits with an error."""
+    def __init__(self, message, log_tail=None):
+        super().__init__(message)
+        self.log_tail = log_tail or [] # Last lines of ffmpeg's log
+
+
+class ConversionCancelled(ConversionError):
+    """Raised when a running conversion is cancelled."""
+
+
+def get_open_types(preset_name):
+    """Returns the input file dialog filters of a preset (or of NATIVE_AUDIO)."""
+    return PRESETS[NATIVE_AUDIO_FALLBACK if preset_name == NATIVE_AUDIO else preset_name]["open_types"]
+
+
+def get_preset_pattern(preset_name):
+    """Returns the input glob pattern of a preset, e.g. '*.mp4;*.avi'."""
+    return get_open_types(preset_name)[0][1]
+
+
+def journal_options(preset_name, profile=None):
+    """Returns the options recorded in the job journal for a preset and encoder profile."""
+    options = {"preset": preset_name, "options": PRESETS[preset_name]["options"]}
+    if profile:
+        options["profile"] = profile
+    return options
+
+
+def default_worker_count():
+    """Returns the default size of the ffmpeg worker pool (one per CPU core)."""
+    return max(1, os.cpu_count() or 1)
+
+
+def remove_partial_output(output_file):
+    """Deletes a half-written output file, ignoring errors."""
+    try:
+        if output_file and os.path.exists(output_file):
+            os.remove(output_file)
+    except OSError as e:
+        print(f"Could not remove partial file '{output_file}': {e}")
+
+
+def is_output_current(input_file, output_file):
+    """Returns True if output_file exists and is newer than input_file."""
+    try:
+        return os.path.getmtime(output_file) >= os.path.getmtime(input_file)
+    except OSError:
+        return False
+
+
+def probe_media(input_file):
+    """Returns ffprobe's JSON description of input_file (cached), or None if probing fails."""
+    return get_probe_cache().probe(input_file)
+
+
+def media_duration(media_info):
+    """Returns the duration in seconds from probe data, or None if unknown."""
+    if not media_info:
+        return None
+    try:
+        duration = float(media_info.get("format", {}).get("duration", 0))
+    except (TypeError, ValueError):
+        return None
+    return duration if duration > 0 else None
+
+
+def probe_duration(input_file):
+    """Returns the media duration in seconds, or None if it cannot be determined."""
+    return media_duration(probe_media(input_file))
+
+
+# --- Stream Copy Fast Path ---
+# Streams the target container can hold as they are get remuxed ('copy')
+# instead of re-encoded. Only the streams that don't fit are transcoded.
+
+ANY_CODEC = "any"
+
+# Codecs each target container accepts without re-encoding.
+# A missing stream type means the container drops that type (e.g. no video in MP3).
+# MPEG-4 Part 2 (Xvid/DivX) is left out of MP4 on purpose: it plays poorly there.
+CONTAINER_CODECS = {
+    ".mp4": {"video": {"h264", "hevc", "av1", "vp9"},
+             "audio": {"aac", "mp3", "alac", "ac3", "eac3", "opus", "flac"}},
+    ".mkv": {"video": ANY_CODEC, "audio": ANY_CODEC},
+    ".avi": {"video": {"mpeg4", "msmpeg4v3", "mjpeg"},
+             "audio": {"mp3", "ac3", "pcm_s16le"}},
+    ".mp3": {"audio": {"mp3"}},
+    ".m4a": {"audio": {"aac", "alac"}},
+    ".opus": {"audio": {"opus"}},
+    ".mka": {"audio": ANY_CODEC},
+    ".wav": {"audio": {"pcm_s16le", "pcm_s24le", "pcm_s32le", "pcm_f32le", "pcm_u8"}},
+}
+
+# Encoders used when a preset says 'copy' but the stream doesn't fit the container
+DEFAULT_ENCODERS = {
+    ".mp4": {"vcodec": "libx264", "acodec": "aac"},
+    ".mkv": {"vcodec": "libx264", "acodec": "aac"},
+    ".avi": {"vcodec": "libxvid", "acodec": "libmp3lame"},
+    ".mp3": {"acodec": "libmp3lame"},
+    ".m4a": {"acodec": "aac"},
+    ".opus": {"acodec": "libopus"},
+    ".mka": {"acodec": "flac"},
+    ".wav": {"acodec": "pcm_s16le"},
+}
+
+# Encoder settings that are meaningless (or invalid) for a copied stream
+VIDEO_ENCODE_OPTIONS = ("video_bitrate", "crf", "q:v", "preset", "pix_fmt", "vf")
+AUDIO_ENCODE_OPTIONS = ("audio_bitrate", "ar", "ac", "af")
+
+
+def first_stream(media_info, codec_type):
+    """Returns the first stream of a type from probe data (cover art is ignored)."""
+    for stream in (media_info or {}).get("streams", []):
+        if stream.get("codec_type") != codec_type:
+            continue
+        if stream.get("disposition", {}).get("attached_pic"):
+            continue
+        return stream
+    return None
+
+
+def full_encode_options(preset_name, profile=None):
+    """
+    Returns the preset's options with 'copy' codecs replaced by real encoders,
+    tuned by an encoder profile (see encoder_profiles) if one is given.
+    """
+    preset = PRESETS[preset_name]
+    options = dict(preset["options"])
+    defaults = DEFAULT_ENCODERS.get(preset["save_ext"], {})
+    for key in ("vcodec", "acodec"):
+        if options.get(key) == "copy" and key in defaults:
+            options[key] = defaults[key]
+    return apply_profile(options, profile)
+
+
+def plan_stream_copy(preset_name, media_info, profile=None):
+    """
+    Returns (options, copied, transcoded): ffmpeg options that stream-copy every
+    stream the target container can hold, and the stream types copied or re-encoded.
+    """
+    preset = PRESETS[preset_name]
+    options = full_encode_options(preset_name, profile)
+    container = CONTAINER_CODECS.get(preset["save_ext"])
+    if not media_info or container is None:
+        return options, [], []
+
+    copied, transcoded = [], []
+    for codec_type, codec_key, encode_keys in (("video", "vcodec", VIDEO_ENCODE_OPTIONS),
+                                               ("audio", "acodec", AUDIO_ENCODE_OPTIONS)):
+        if codec_type not in container or (codec_type == "video" and "vn" in options):
+            continue
+        stream = first_stream(media_info, codec_type)
+        if stream is None:
+            continue
+        allowed = container[codec_type]
+        if allowed == ANY_CODEC or stream.get("codec_name") in allowed:
+            options[codec_key] = "copy"
+            for key in encode_keys:
+                options.pop(key, None)
+            copied.append(codec_type)
+        else:
+            transcoded.append(codec_type)
+
+    video = first_stream(media_info, "video")
+    if "video" in copied and preset["save_ext"] == ".mp4" and video.get("codec_name") == "hevc":
+        options["vtag"] = "hvc1" # Tag expected by Apple players for HEVC in MP4
+    return options, copied, transcoded
+
+
+def native_audio_preset(media_info):
+    """Returns the extract preset that stream-copies the audio described by probe data."""
+    stream = first_stream(media_info, "audio")
+    codec = stream.get("codec_name") if stream else None
+    return NATIVE_AUDIO_PRESETS.get(codec, NATIVE_AUDIO_FALLBACK)
+
+
+def resolve_preset(preset_name, input_file):
+    """Returns the preset to convert input_file with; NATIVE_AUDIO is resolved by probing it."""
+    if preset_name == NATIVE_AUDIO:
+        return native_audio_preset(probe_media(input_file))
+    return preset_name
+
+
+def describe_conversion(result):
+    """Returns a short note on how a conversion was done, for status messages."""
+    if result.get("cached"):
+        return "served from cache, no re-encode"
+    if result.get("fallback"):
+        return "remux failed, fully re-encoded"
+    if result.get("segmented"):
+        return "encoded in parallel segments"
+    copied = result.get("copied") or []
+    if not copied:
+        return ""
+    if not result.get("transcoded"):
+        return "remuxed, no re-encode"
+    return f"{' and '.join(copied)} copied, {' and '.join(result['transcoded'])} re-encoded"
+
+
+# --- ffmpeg Progress ---
+# ffmpeg is run with '-progress pipe:1', which prints blocks of key=value
+# lines (ending with 'progress=continue' or 'progress=end') about twice a second.
+
+STDERR_TAIL_LINES = 40 # Only the end of ffmpeg's log is kept for error messages
+
+
+def _parse_float(value):
+    """Parses an ffmpeg progress number ('N/A' and blanks become None)."""
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def _progress_snapshot(block, duration):
+    """Turns one block of ffmpeg progress keys into a progress dict."""
+    out_time = None
+    # 'out_time_ms' is (despite its name) also in microseconds
+    for key in ("out_time_us", "out_time_ms"):
+        value = _parse_float(block.get(key))
+        if value is not None:
+            out_time = max(0.0, value / 1_000_000)
+            break
+
+    speed = _parse_float(block.get("speed", "").strip().rstrip("x"))
+    finished = block.get("progress") == "end"
+
+    percent = eta = None
+    if duration and out_time is not None:
+        percent = 100.0 if finished else min(100.0, out_time / duration * 100)
+        if finished:
+            eta = 0.0
+        elif speed:
+            eta = max(0.0, (duration - out_time) / speed)
+
+    return {
+        "out_time": out_time,
+        "duration": duration,
+        "percent": percent,
+        "speed": speed,
+        "fps": _parse_float(block.get("fps")),
+        "bitrate": block.get("bitrate", "N/A").strip(),
+        "eta": eta,
+        "finished": finished,
+    }
+
+
+def format_eta(seconds):
+    """Formats seconds as HH:MM:SS."""
+    seconds = int(seconds)
+    return f"{seconds // 3600:02d}:{seconds % 3600 // 60:02d}:{seconds % 60:02d}"
+
+
+def format_progress(progress):
+    """Formats a progress dict in the style of the downloader's status line."""
+    percent = f"{progress['percent']:.1f}%" if progress["percent"] is not None else "..."
+    speed = f"{progress['speed']:.2f}x" if progress["speed"] else "..."
+    fps = f"{progress['fps']:.0f}" if progress["fps"] else "..."
+    eta = format_eta(progress["eta"]) if progress["eta"] is not None else "..."
+    return f"Converting: {percent} | Speed: {speed} | FPS: {fps} | Bitrate: {progress['bitrate']} | ETA: {eta}"
+
+
+_BENCH_PATTERN = re.compile(r"bench: utime=([\d.]+)s stime=([\d.]+)s")
+
+
+def _split_benchmark(stderr_tail):
+    """
+    Separates ffmpeg's '-benchmark' lines from its log.
+    Returns (CPU seconds used by ffmpeg or None, remaining log lines).
+    """
+    cpu_seconds = None
+    log_lines = []
+    for line in stderr_tail:
+        match = _BENCH_PATTERN.search(line)
+        if match:
+            cpu_seconds = float(match.group(1)) + float(match.group(2))
+        elif not line.startswith("bench:"):
+            log_lines.append(line)
+    return cpu_seconds, log_lines
+
+
+def _drain_stderr(pipe, tail):
+    """(THREAD) Reads ffmpeg's log into a bounded buffer."""
+    for raw in iter(pipe.readline, b""):
+        tail.append(raw.decode(errors="replace").rstrip())
+    pipe.close()
+
+
+def _terminate_on_cancel(process, cancel_event):
+    """(THREAD) Terminates the ffmpeg process once cancel_event is set."""
+    while process.poll() is None:
+        if cancel_event.wait(0.5):
+            if process.poll() is None:
+                process.terminate()
+            return
+
+
+def run_ffmpeg(stream, output_file, duration=None, cancel_event=None, on_progress=None):
+    """
+    Runs a compiled ffmpeg-python output stream, reporting progress as it goes.
+    on_progress receives progress dicts (see _progress_snapshot) from this thread.
+    Returns {"cpu_seconds": CPU time used by ffmpeg}.
+    Raises ConversionError on failure and ConversionCancelled if cancel_event is set.
+    """
+    import ffmpeg
+    stream = stream.global_args("-nostdin", "-nostats", "-benchmark", "-progress", "pipe:1")
+    args = ffmpeg.compile(stream, overwrite_output=True)
+    process = subprocess.Popen(args, stdin=subprocess.DEVNULL,
+                               stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+
+    stderr_tail = collections.deque(maxlen=STDERR_TAIL_LINES)
+    stderr_thread = threading.Thread(target=_drain_stderr, args=(process.stderr, stderr_tail), daemon=True)
+    stderr_thread.start()
+    if cancel_event is not None:
+        threading.Thread(target=_terminate_on_cancel,
+                         args=(process, cancel_event), daemon=True).start()
+
+    block = {}
+    for raw in iter(process.stdout.readline, b""):
+        key, _, value = raw.decode(errors="replace").strip().partition("=")
+        if not key:
+            continue
+        block[key] = value
+        if key == "progress":
+            if on_progress:
+                on_progress(_progress_snapshot(block, duration))
+            block = {}
+    process.stdout.close()
+    process.wait()
+    stderr_thread.join(timeout=5)
+    cpu_seconds, log_lines = _split_benchmark(stderr_tail)
+
+    if cancel_event is not None and cancel_event.is_set():
+        remove_partial_output(output_file)
+        raise ConversionCancelled("Conversion cancelled")
+    if process.returncode != 0:
+        remove_partial_output(output_file)
+        raise ConversionError(log_lines[-1] if log_lines else "ffmpeg failed", log_lines)
+    return {"cpu_seconds": cpu_seconds}
+
+
+def run_conversion(input_file, output_file, options, cancel_event=None, on_progress=None, duration=None):
+    """
+    Runs one ffmpeg conversion and blocks until it finishes.
+    Returns the stats of run_ffmpeg. Raises ConversionError on failure and ConversionCancelled if cancel_event is set.
+    """
+    import ffmpeg
+    if duration is None and on_progress:
+        duration = probe_duration(input_file)
+    # Unlink instead of letting ffmpeg truncate: the old output may be hardlinked into the cache
+    remove_partial_output(output_file)
+    stream = ffmpeg.input(input_file)
+    stream = ffmpeg.output(stream, output_file, **options)
+    return run_ffmpeg(stream, output_file, duration, cancel_event, on_progress)
+
+
+def cache_lookup(preset_name, input_file, output_file, profile=None):
+    """
+    Serves a conversion from the output cache.
+    Returns (cache key, hit); the key is None if the cache is unavailable.
+    """
+    try:
+        cache = get_conversion_cache()
+        key = cache.make_key(input_file, full_encode_options(preset_name, profile),
+                             PRESETS[preset_name]["save_ext"])
+        return key, cache.fetch(key, output_file)
+    except Exception as e:
+        print(f"Conversion cache unavailable: {e}")
+        return None, False
+
+
+def cache_store(preset_name, key, output_file):
+    """Adds a finished output to the conversion cache."""
+    if key is None:
+        return
+    try:
+        get_conversion_cache().store(key, output_file, PRESETS[preset_name]["save_ext"])
+    except Exception as e:
+        print(f"Could not cache '{output_file}': {e}")
+
+
+def convert_file(preset_name, input_file, output_file, cancel_event=None, on_progress=None,
+                 extra_options=None, use_cache=True, segment_parallel=False, profile=None):
+    """
+    Converts input_file with a preset (and optional encoder profile). Identical
+    earlier conversions are served from the output cache; otherwise the input
+    is probed so compatible streams are remuxed instead of re-encoded, and a
+    failed remux is retried automatically as a full encode. Returns a dict describing what was done.
+    """
+    # Everything is written to the scratch folder; output_file only ever appears complete
+    expected_bytes = estimate_output_size(preset_name, input_file)
+    if segment_parallel:
+        expected_bytes *= 2 # Encoded chunks and the joined output exist side by side
+    with staged_output(output_file, expected_bytes) as staged_file:
+        cache_key = None
+        if use_cache:
+            cache_key, hit = cache_lookup(preset_name, input_file, staged_file, profile)
+            if hit:
+                return {"cached": True, "copied": [], "transcoded": [], "fallback": False}
+
+        result = encode_file(preset_name, input_file, staged_file, cancel_event, on_progress, extra_options,
+                             segment_parallel, profile)
+        cache_store(preset_name, cache_key, staged_file)
+    return result
+
+
+def estimate_output_size(preset_name, input_file):
+    """Roughly estimates the output size of a conversion (for free-space checks)."""
+    size = file_size(input_file) or 0
+    if PRESETS[preset_name]["save_ext"] == ".wav":
+        duration = probe_duration(input_file)
+        if duration:
+            size = max(size, int(duration * WAV_BYTES_PER_SECOND)) # Decoding grows compressed audio
+    return size
+
+
+def encode_file(preset_name, input_file, output_file, cancel_event=None, on_progress=None,
+                extra_options=None, segment_parallel=False, profile=None):
+    """
+    Runs ffmpeg for convert_file, preferring stream copy with a full-encode fallback.
+    With segment_parallel, long videos that need a video re-encode are encoded
+    in parallel chunks (see segment_encoder).
+    """
+    media_info = probe_media(input_file)
+    duration = media_duration(media_info)
+    options, copied, transcoded = plan_stream_copy(preset_name, media_info, profile)
+    full_options = full_encode_options(preset_name, profile)
+    if extra_options:
+        options.update(extra_options)
+        full_options.update(extra_options)
+
+    if segment_parallel and "video" in transcoded:
+        from segment_encoder import encode_segmented, SEGMENT_MIN_DURATION
+        if duration and duration >= SEGMENT_MIN_DURATION:
+            try:
+                encode_segmented(input_file, output_file, options, media_info,
+                                 PRESETS[preset_name]["save_ext"], cancel_event, on_progress)
+                return {"copied": copied, "transcoded": transcoded, "fallback": False, "segmented": True,
+                        "duration": duration}
+            except ConversionCancelled:
+                raise
+            except Exception as e:
+                remove_partial_output(output_file)
+                print(f"Segmented encode of '{input_file}' failed ({e}), falling back to a single pass")
+
+    try:
+        stats = run_conversion(input_file, output_file, options, cancel_event, on_progress, duration)
+        return {"copied": copied, "transcoded": transcoded, "fallback": False,
+                "duration": duration, "cpu_seconds": stats["cpu_seconds"]}
+    except ConversionCancelled:
+        raise
+    except ConversionError as e:
+        if not copied or options == full_options:
+            raise
+        print(f"Stream copy of '{input_file}' failed ({e}), falling back to a full encode")
+
+    stats = run_conversion(input_file, output_file, full_options, cancel_event, on_progress, duration)
+    return {"copied": [], "transcoded": transcoded + copied, "fallback": True,
+            "duration": duration, "cpu_seconds": stats["cpu_seconds"]}
+
+
+# --- Multi-Output Conversion ---
+# Several outputs of one source (e.g. MP3 + WAV + M4A, or 1080p + 720p MP4)
+# come from a single ffmpeg run: the input is decoded once and fanned out to
+# one encoder per output, instead of being decoded again for every output.
+# Streams an output can hold as they are are still copied.
+
+MULTI_OUTPUT_PRESET = "multi_output" # Journal name of multi-output jobs (not a preset of its own)
+MULTI_OUTPUT_TARGETS = {
+    "mp3": {"label": "MP3 (192k)", "preset": "video_to_audio", "suffix": ""},
+    "m4a": {"label": "M4A (AAC)", "preset": "video_to_m4a", "suffix": ""},
+    "opus": {"label": "Opus", "preset": "video_to_opus", "suffix": ""},
+    "wav": {"label": "WAV", "preset": "mp3_to_wav", "suffix": ""},
+    "mp4": {"label": "MP4 (source size)", "preset": "avi_to_mp4", "suffix": ""},
+    "mp4_1080p": {"label": "MP4 1080p", "preset": "avi_to_mp4", "suffix": "_1080p",
+                  "options": {"vf": "scale=-2:'min(1080,ih)'"}}, # Never upscales
+    "mp4_720p": {"label": "MP4 720p", "preset": "avi_to_mp4", "suffix": "_720p",
+                 "options": {"vf": "scale=-2:'min(720,ih)'"}},
+    "mp4_480p": {"label": "MP4 480p", "preset": "avi_to_mp4", "suffix": "_480p",
+                 "options": {"vf": "scale=-2:'min(480,ih)'"}},
+    "mkv": {"label": "MKV", "preset": "mp4_to_mkv", "suffix": ""},
+}
+
+
+def plan_multi_outputs(input_file, target_names, output_folder):
+    """Returns the (target name, output path) pairs of a multi-output conversion."""
+    stem = os.path.splitext(os.path.basename(input_file))[0]
+    outputs = []
+    for target_name in target_names:
+        target = MULTI_OUTPUT_TARGETS[target_name]
+        name = stem + target["suffix"]
+        save_ext = PRESETS[target["preset"]]["save_ext"]
+        output_file = os.path.join(output_folder, name + save_ext)
+        if os.path.abspath(output_file) == os.path.abspath(input_file):
+            output_file = os.path.join(output_folder, name + "_converted" + save_ext)
+        outputs.append((target_name, output_file))
+    return outputs
+
+
+def multi_journal_options(target_names, profile=None):
+    """Returns the options recorded in the job journal for a multi-output conversion (output = the folder)."""
+    options = {"preset": MULTI_OUTPUT_PRESET, "targets": list(target_names)}
+    if profile:
+        options["profile"] = profile
+    return options
+
+
+def multi_output_options(target_name, media_info, profile=None):
+    """
+    Returns (options, full_options, copied, transcoded) of one target: its
+    preset's stream-copy plan plus the target's own settings. Scaled video is always re-encoded.
+    """
+    target = MULTI_OUTPUT_TARGETS[target_name]
+    options, copied, transcoded = plan_stream_copy(target["preset"], media_info, profile)
+    full_options = full_encode_options(target["preset"], profile)
+    target_options = target.get("options", {})
+    options.update(target_options)
+    full_options.update(target_options)
+    if "video" in copied and any(key in target_options for key in VIDEO_ENCODE_OPTIONS):
+        options["vcodec"] = full_options["vcodec"]
+        options.pop("vtag", None)
+        copied.remove("video")
+        transcoded.append("video")
+    return options, full_options, copied, transcoded
+
+
+def run_multi_conversion(input_file, outputs, cancel_event=None, on_progress=None, duration=None):
+    """
+    Runs one ffmpeg process that decodes input_file once and writes every
+    (output_file, options) of outputs. Returns the stats of run_ffmpeg.
+    """
+    import ffmpeg
+    for output_file, _ in outputs:
+        remove_partial_output(output_file)
+    source = ffmpeg.input(input_file)
+    stream = ffmpeg.merge_outputs(*[ffmpeg.output(source, output_file, **options)
+                                    for output_file, options in outputs])
+    return run_ffmpeg(stream, None, duration, cancel_event, on_progress)
+
+
+def convert_multi(input_file, outputs, cancel_event=None, on_progress=None, use_cache=True, profile=None):
+    """
+    Converts input_file to every (target name, output path) of outputs with a
+    single decode. Outputs found in the conversion cache are served from it;
+    a failed stream copy is retried as a full encode of all outputs.
+    Returns {"outputs": {output path: result dict as convert_file's}, "duration", "cpu_seconds"}.
+    """
+    media_info = probe_media(input_file)
+    duration = media_duration(media_info)
+    results = {}
+    with ExitStack() as stack:
+        pending = [] # (output, staged path, cache key, preset, options, full options, copied, transcoded)
+        for target_name, output_file in outputs:
+            preset_name = MULTI_OUTPUT_TARGETS[target_name]["preset"]
+            # Each output is staged (and published) on its own, as in convert_file
+            staged_file = stack.enter_context(
+                staged_output(output_file, estimate_output_size(preset_name, input_file)))
+            cache_key = None
+            # Targets with their own settings don't match the preset's cache entries
+            if use_cache and not MULTI_OUTPUT_TARGETS[target_name].get("options"):
+                cache_key, hit = cache_lookup(preset_name, input_file, staged_file, profile)
+                if hit:
+                    results[output_file] = {"cached": True, "copied": [], "transcoded": [], "fallback": False}
+                    continue
+            pending.append((output_file, staged_file, cache_key, preset_name)
+                           + multi_output_options(target_name, media_info, profile))
+
+        if not pending:
+            return {"outputs": results, "duration": duration, "cpu_seconds": None}
+
+        fallback = False
+        try:
+            stats = run_multi_conversion(input_file, [(job[1], job[4]) for job in pending],
+                                         cancel_event, on_progress, duration)
+        except ConversionCancelled:
+            raise
+        except ConversionError as e:
+            if all(job[4] == job[5] for job in pending):
+                raise
+            print(f"Stream copy of '{input_file}' failed ({e}), falling back to a full encode")
+            fallback = True
+            stats = run_multi_conversion(input_file, [(job[1], job[5]) for job in pending],
+                                         cancel_event, on_progress, duration)
+
+        for output_file, staged_file, cache_key, preset_name, _, _, copied, transcoded in pending:
+            if fallback:
+                copied, transcoded = [], transcoded + copied
+            results[output_file] = {"copied": copied, "transcoded": transcoded, "fallback": fallback}
+            cache_store(preset_name, cache_key, staged_file)
+    return {"outputs": results, "duration": duration, "cpu_seconds": stats["cpu_seconds"]}
+
+
+def finish_conversion_record(record, status, input_file, output_file, result=None, error=None):
+    """Completes the metrics record of a conversion (status is a journal state or JOB_SKIPPED)."""
+    result = result or {}
+    record.finish(status, bytes_in=file_size(input_file),
+                  bytes_out=file_size(output_file) if status == JOB_DONE else None,
+                  media_seconds=None if result.get("cached") else result.get("duration"),
+                  child_cpu_seconds=result.get("cpu_seconds"), error=error)
+
+
+# --- Batch Conversion ---
+
+def matches_pattern(name, pattern):
+    """
+    True if a file name matches pattern (case-insensitive).
+    The pattern may hold several globs separated by ';' (e.g. '*.mp4;*.mkv').
+    """
+    name = name.lower()
+    return any(fnmatch.fnmatch(name, g.strip().lower()) for g in pattern.split(";") if g.strip())
+
+
+def collect_batch_files(folder, pattern, recursive=False):
+    """Returns the sorted list of files in folder matching pattern (see matches_pattern)."""
+    matches = []
+    for root, dirs, files in os.walk(folder):
+        dirs.sort()
+        for name in files:
+            if matches_pattern(name, pattern):
+                matches.append(os.path.join(root, name))
+        if not recursive:
+            break
+    return sorted(matches)
+
+
+def plan_batch_jobs(preset_name, input_files, source_folder, output_folder):
+    """
+    Returns the (preset, input, output) jobs of a batch. With NATIVE_AUDIO
+    every input gets the extract preset (and extension) matching its audio codec.
+    """
+    if preset_name != NATIVE_AUDIO:
+        planned = plan_batch_outputs(input_files, source_folder, output_folder, PRESETS[preset_name]["save_ext"])
+        return [(preset_name, input_file, output_file) for input_file, output_file in planned]
+
+    media = get_probe_cache().probe_many(input_files)
+    jobs = []
+    for input_file in input_files:
+        native_preset = native_audio_preset(media.get(input_file))
+        [(_, output_file)] = plan_batch_outputs([input_file], source_folder, output_folder,
+                                                PRESETS[native_preset]["save_ext"])
+        jobs.append((native_preset, input_file, output_file))
+    return jobs
+
+
+def plan_batch_outputs(input_files, source_folder, output_folder, save_ext):
+    """
+    Maps every input file to its output path inside output_folder,
+    keeping the sub-folder layout of source_folder.
+    """
+    jobs = []
+    for input_file in input_files:
+        relative = os.path.relpath(input_file, source_folder)
+        stem = os.path.splitext(relative)[0]
+        output_file = os.path.join(output_folder, stem + save_ext)
+        if os.path.abspath(output_file) == os.path.abspath(input_file):
+            stem += "_converted"
+            output_file = os.path.join(output_folder, stem + save_ext)
+        jobs.append((input_file, output_file))
+    return jobs
+
+
+class BatchConverter:
+    """
+    Runs many conversions on a bounded pool of ffmpeg processes.
+    Jobs are (preset_name, input_file, output_file) tuples, all encoded with one
+    encoder profile (None = the presets' own settings). threads caps the ffmpeg
+    threads of every job, for callers that run several batches side by side.
+    Callbacks are invoked from worker threads; the caller must marshal them to the UI.
+    """
+    def __init__(self, jobs, max_workers=None, journal=None, metrics=None,
+                 on_status=None, on_progress=None, on_finished=None, profile=None, threads=None):
+        self.jobs = list(jobs)
+        self.profile = profile
+        self.max_workers = max(1, min(max_workers or default_worker_count(), len(self.jobs) or 1))
+        self.threads = threads
+        self.journal = journal
+        self.metrics = metrics
+
+        self.on_status = on_status
+        self.on_progress = on_progress
+        self.on_finished = on_finished
+
+        self.cancel_event = threading.Event()
+        self.lock = threading.Lock()
+        self.completed = 0
+        self.failed = 0
+
+        # Seconds of media per job and how far each job got, for the aggregate progress
+        self.durations = [0.0] * len(self.jobs)
+        self.done_seconds = [0.0] * len(self.jobs)
+
+    def extra_options(self):
+        """Returns extra ffmpeg options for every job, splitting CPU threads across workers."""
+        if self.threads:
+            return {"threads": self.threads}
+        if self.max_workers > 1:
+            return {"threads": max(1, default_worker_count() // self.max_workers)}
+        return {}
+
+    def start(self):
+        """Starts the batch in a background thread and returns immediately."""
+        threading.Thread(target=self.run, daemon=True).start()
+
+    def cancel(self):
+        """Cancels queued jobs and terminates running ffmpeg processes."""
+        self.cancel_event.set()
+
+    def run(self):
+        """(THREAD) Runs all jobs and blocks until the batch finishes."""
+        # Probe every input concurrently (mostly cache hits on re-runs) to weight progress by duration
+        media = get_probe_cache().probe_many([input_file for _, input_file, _ in self.jobs])
+        self.durations = [media_duration(media.get(input_file)) or 0.0 for _, input_file, _ in self.jobs]
+
+        job_ids = [None] * len(self.jobs)
+        if self.journal is not None:
+            # Record the whole batch up front so a crash mid-batch can be resumed
+            job_ids = [self.journal.add_job(KIND_CONVERT, input_file, output_file,
+                                            journal_options(preset_name, self.profile))
+                       for preset_name, input_file, output_file in self.jobs]
+
+        queued_at = time.time()
+        with ThreadPoolExecutor(max_workers=self.max_workers) as pool:
+            for index, (preset_name, input_file, output_file) in enumerate(self.jobs):
+                pool.submit(self.run_job, index, job_ids[index], preset_name, input_file, output_file, queued_at)
+
+        if self.on_finished:
+            self.on_finished(self.completed, self.failed, self.cancel_event.is_set())
+
+    def run_job(self, index, job_id, preset_name, input_file, output_file, queued_at=None):
+        """(WORKER) Converts a single file of the batch."""
+        record = self.metrics.start_job(KIND_CONVERT, input_file, queued_at) if self.metrics else None
+        if record: record.profile = self.profile
+        if self.cancel_event.is_set():
+            self._cancelled(index, job_id, record, input_file, output_file)
+            return
+
+        if self.journal is not None:
+            done = self.journal.find_completed(KIND_CONVERT, input_file, output_file,
+                                               journal_options(preset_name, self.profile))
+            if done is not None and done["id"] != job_id and is_output_current(input_file, output_file):
+                self.journal.mark_done(job_id, result=output_file)
+                if record: finish_conversion_record(record, JOB_SKIPPED, input_file, output_file)
+                self._finish(index, STATUS_SKIPPED, "already converted")
+                return
+            self.journal.mark_running(job_id)
+
+        self._report(index, STATUS_RUNNING, "")
+        if record: record.start()
+        try:
+            os.makedirs(os.path.dirname(output_file) or ".", exist_ok=True)
+            result = convert_file(preset_name, input_file, output_file, self.cancel_event,
+                                  on_progress=lambda progress: self._job_progress(index, progress),
+                                  extra_options=self.extra_options(), profile=self.profile)
+            if self.journal is not None:
+                self.journal.mark_done(job_id, result=output_file)
+            if record: finish_conversion_record(record, JOB_DONE, input_file, output_file, result)
+            self._finish(index, STATUS_DONE, describe_conversion(result))
+        except ConversionCancelled:
+            self._cancelled(index, job_id, record, input_file, output_file)
+        except Exception as e:
+            if self.journal is not None:
+                self.journal.mark_failed(job_id, e)
+            if record: finish_conversion_record(record, JOB_FAILED, input_file, output_file, error=e)
+            self._finish(index, STATUS_FAILED, str(e))
+
+    def _cancelled(self, index, job_id, record=None, input_file=None, output_file=None):
+        """Records a job that was cancelled before or while running."""
+        if self.journal is not None:
+            self.journal.mark_cancelled(job_id)
+        if record is not None:
+            finish_conversion_record(record, JOB_CANCELLED, input_file, output_file)
+        self._report(index, STATUS_CANCELLED, "")
+
+    def total_percent(self):
+        """Returns the batch progress in percent, weighted by media duration."""
+        total = sum(self.durations)
+        if not total:
+            return self.completed / len(self.jobs) * 100 if self.jobs else 100.0
+        return min(100.0, sum(self.done_seconds) / total * 100)
+
+    def _job_progress(self, index, progress):
+        """Reports the percentage and encode speed of a running job."""
+        if progress["out_time"] is not None:
+            self.done_seconds[index] = min(progress["out_time"], self.durations[index])
+        if self.on_progress:
+            self.on_progress(self.completed, len(self.jobs), self.failed, self.total_percent())
+        if progress["percent"] is None:
+            return
+        speed = f" @ {progress['speed']:.1f}x" if progress["speed"] else ""
+        self._report(index, STATUS_RUNNING, f"{progress['percent']:.0f}%{speed}")
+
+    def _report(self, index, status, message):
+        """Forwards a per-file status change to the caller."""
+        if self.on_status:
+            self.on_status(index, status, message)
+
+    def _finish(self, index, status, message):
+        """Records a finished job and reports the aggregate progress."""
+        with self.lock:
+            self.completed += 1
+            if status == STATUS_FAILED:
+                self.failed += 1
+            self.done_seconds[index] = self.durations[index]
+            completed, failed = self.completed, self.failed
+        self._report(index, status, message)
+        if self.on_progress:
+            self.on_progress(completed, len(self.jobs), failed, self.total_percent())
@@ -0,0 +1,312 @@
+import os
+import time
+import sqlite3
+import hashlib
+import argparse
+import threading
+import functools
+
+from app_config import data_path
+
+# --- Download Library ---
+# Index of every downloaded file, keyed by site (yt-dlp's extractor) and
+# video ID, so media that is already on disk is never downloaded again: a
+# new request is answered with one primary-key lookup and a stat of the
+# file. Entries hold the path, size, SHA-256 content hash and format.
+# Titles, uploaders and paths are full-text indexed (SQLite FTS5) for
+# instant search over large libraries, and check() reconciles the index
+# with the files on disk. Usage:
+#   python download_library.py search "lecture 2019"
+#   python download_library.py check --verify D:\Videos
+
+LIBRARY_FILE = "library.sqlite3"
+HASH_CHUNK_BYTES = 1024 * 1024
+SEARCH_LIMIT = 200
+GENERIC_EXTRACTOR = "generic" # Its IDs are just file names, so the URL identifies the media instead
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS media (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    extractor TEXT NOT NULL,
+    video_id TEXT NOT NULL,
+    variant TEXT NOT NULL,
+    path TEXT NOT NULL,
+    size INTEGER,
+    mtime_ns INTEGER,
+    sha256 TEXT,
+    format TEXT,
+    title TEXT,
+    uploader TEXT,
+    url TEXT,
+    added REAL NOT NULL,
+    UNIQUE (extractor, video_id, variant)
+);
+CREATE INDEX IF NOT EXISTS media_path ON media (path);
+CREATE INDEX IF NOT EXISTS media_added ON media (added);
+"""
+
+# External-content FTS index kept in sync with the media table by triggers
+_FTS_SCHEMA = """
+CREATE VIRTUAL TABLE IF NOT EXISTS media_fts USING fts5(
+    title, uploader, path, content='media', content_rowid='id', tokenize='unicode61 remove_diacritics 2'
+);
+CREATE TRIGGER IF NOT EXISTS media_fts_insert AFTER INSERT ON media BEGIN
+    INSERT INTO media_fts (rowid, title, uploader, path) VALUES (new.id, new.title, new.uploader, new.path);
+END;
+CREATE TRIGGER IF NOT EXISTS media_fts_delete AFTER DELETE ON media BEGIN
+    INSERT INTO media_fts (media_fts, rowid, title, uploader, path)
+        VALUES ('delete', old.id, old.title, old.uploader, old.path);
+END;
+CREATE TRIGGER IF NOT EXISTS media_fts_update AFTER UPDATE ON media BEGIN
+    INSERT INTO media_fts (media_fts, rowid, title, uploader, path)
+        VALUES ('delete', old.id, old.title, old.uploader, old.path);
+    INSERT INTO media_fts (rowid, title, uploader, path) VALUES (new.id, new.title, new.uploader, new.path);
+END;
+"""
+
+
+def library_variant(download_type, resolution=None):
+    """Returns what tells downloads of the same video apart ('video:1080', 'audio:mp3', ...)."""
+    if download_type == "audio":
+        return "audio:mp3"
+    return f"video:{resolution or 'best'}"
+
+
+def media_key(info):
+    """Returns (extractor, video ID) of a yt-dlp info dict, or None if it has no ID."""
+    if not info or not info.get("id"):
+        return None
+    extractor = (info.get("extractor_key") or info.get("ie_key") or "").lower()
+    if not extractor:
+        return None
+    if extractor == GENERIC_EXTRACTOR:
+        return extractor, info.get("webpage_url") or info.get("original_url") or info["id"]
+    return extractor, info["id"]
+
+
+@functools.lru_cache(maxsize=1024)
+def url_media_key(url):
+    """
+    Returns (extractor, video ID) from the URL alone, without contacting the
+    site (the same matching yt-dlp uses for its download archive), or None
+    if the extractor can't tell the ID from the URL.
+    """
+    from yt_dlp.extractor import gen_extractor_classes
+    for extractor in gen_extractor_classes():
+        if extractor.ie_key().lower() == GENERIC_EXTRACTOR or not extractor.suitable(url):
+            continue
+        video_id = extractor.get_temp_id(url)
+        return (extractor.ie_key().lower(), video_id) if video_id else None
+    return GENERIC_EXTRACTOR, url
+
+
+def file_hash(path):
+    """Returns the SHA-256 of a file's content as hex."""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(HASH_CHUNK_BYTES), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def fts_query(text):
+    """Turns search words into an FTS5 query matching entries that contain all of them (as prefixes)."""
+    words = text.replace('"', " ").split()
+    return " ".join(f'"{word}"*' for word in words)
+
+
+class DownloadLibrary:
+    """Thread-safe SQLite index of downloaded files."""
+    def __init__(self, path=None):
+        self.path = path or data_path(LIBRARY_FILE)
+        self.lock = threading.Lock()
+        self.conn = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None)
+        self.conn.row_factory = sqlite3.Row
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.executescript(_SCHEMA)
+        try:
+            self.conn.executescript(_FTS_SCHEMA)
+            self.fts = True
+        except sqlite3.OperationalError as e:
+            print(f"Library: full-text search unavailable ({e}), searching titles with LIKE instead.")
+            self.fts = False
+
+    def lookup(self, extractor, video_id, variant):
+        """Returns the entry of a video if its file is still on disk, else None."""
+        with self.lock:
+            row = self.conn.execute("SELECT * FROM media WHERE extractor=? AND video_id=? AND variant=?",
+                                    (extractor, video_id, variant)).fetchone()
+        if row is None or not os.path.isfile(row["path"]):
+            return None
+        return dict(row)
+
+    def add(self, extractor, video_id, variant, path, format_name=None, title=None, uploader=None, url=None):
+        """Records (or updates) a downloaded file, hashing its content."""
+        path = os.path.abspath(path)
+        stat = os.stat(path)
+        sha256 = file_hash(path)
+        with self.lock:
+            self.conn.execute(
+                "INSERT INTO media (extractor, video_id, variant, path, size, mtime_ns, sha256, format, title, "
+                "uploader, url, added) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?) "
+                "ON CONFLICT (extractor, video_id, variant) DO UPDATE SET path=excluded.path, size=excluded.size, "
+                "mtime_ns=excluded.mtime_ns, sha256=excluded.sha256, format=excluded.format, "
+                "title=excluded.title, uploader=excluded.uploader, url=excluded.url, added=excluded.added",
+                (extractor, video_id, variant, path, stat.st_size, stat.st_mtime_ns, sha256, format_name, title,
+                 uploader, url, time.time()))
+
+    def search(self, text, limit=SEARCH_LIMIT):
+        """Returns the entries whose title, uploader or path contain all words of text (newest first if empty)."""
+        query = fts_query(text)
+        with self.lock:
+            if not query:
+                rows = self.conn.execute("SELECT * FROM media ORDER BY added DESC LIMIT ?", (limit,))
+            elif self.fts:
+                rows = self.conn.execute(
+                    "SELECT media.* FROM media_fts JOIN media ON media.id = media_fts.rowid "
+                    "WHERE media_fts MATCH ? ORDER BY media_fts.rank LIMIT ?", (query, limit))
+            else:
+                rows = self.conn.execute("SELECT * FROM media WHERE title LIKE ? ORDER BY added DESC LIMIT ?",
+                                         (f"%{text.strip()}%", limit))
+            return [dict(row) for row in rows.fetchall()]
+
+    def count(self):
+        with self.lock:
+            return self.conn.execute("SELECT COUNT(*) FROM media").fetchone()[0]
+
+    def check(self, folders=(), verify_hashes=False, on_progress=None):
+        """
+        Reconciles the index with the files on disk: changed files are
+        re-hashed, missing files are looked for in folders (same size and
+        hash = moved or renamed) and dropped if not found. With verify_hashes
+        every file is re-hashed. on_progress(done, total) is called per entry.
+        Returns the number of entries per outcome.
+        """
+        with self.lock:
+            rows = [dict(row) for row in self.conn.execute("SELECT * FROM media").fetchall()]
+        counts = {"ok": 0, "updated": 0, "moved": 0, "removed": 0}
+        missing = []
+        for done, row in enumerate(rows, 1):
+            if on_progress: on_progress(done - 1, len(rows))
+            try:
+                stat = os.stat(row["path"])
+            except OSError:
+                missing.append(row)
+                continue
+            changed = (stat.st_size, stat.st_mtime_ns) != (row["size"], row["mtime_ns"])
+            sha256 = file_hash(row["path"]) if changed or verify_hashes else row["sha256"]
+            if changed or sha256 != row["sha256"]:
+                self._update_file(row["id"], row["path"], stat, sha256)
+                counts["updated"] += 1
+            else:
+                counts["ok"] += 1
+
+        for row, new_path in self._find_moved(missing, folders):
+            if new_path:
+                self._update_file(row["id"], new_path, os.stat(new_path), row["sha256"])
+                counts["moved"] += 1
+            else:
+                with self.lock:
+                    self.conn.execute("DELETE FROM media WHERE id=?", (row["id"],))
+                counts["removed"] += 1
+        if on_progress: on_progress(len(rows), len(rows))
+        return counts
+
+    def _find_moved(self, missing, folders):
+        """Yields (entry, new path or None) for entries whose file is gone from its recorded path."""
+        by_size = {}
+        for row in missing:
+            by_size.setdefault(row["size"], []).append(row)
+        if missing and folders:
+            with self.lock:
+                known = {row[0] for row in self.conn.execute("SELECT path FROM media").fetchall()}
+            for folder in folders:
+                for root, dirs, files in os.walk(folder):
+                    for name in files:
+                        path = os.path.abspath(os.path.join(root, name))
+                        try:
+                            size = os.path.getsize(path)
+                        except OSError:
+                            continue
+                        if path in known or not by_size.get(size):
+                            continue
+                        sha256 = file_hash(path)
+                        for row in by_size[size]:
+                            if row["sha256"] == sha256:
+                                by_size[size].remove(row)
+                                known.add(path)
+                                yield row, path
+                                break
+        for rows in by_size.values():
+            for row in rows:
+                yield row, None
+
+    def _update_file(self, entry_id, path, stat, sha256):
+        """Stores a file's current location, size, mtime and hash."""
+        with self.lock:
+            self.conn.execute("UPDATE media SET path=?, size=?, mtime_ns=?, sha256=? WHERE id=?",
+                              (os.path.abspath(path), stat.st_size, stat.st_mtime_ns, sha256, entry_id))
+
+    def close(self):
+        with self.lock:
+            self.conn.close()
+
+
+def record_download(info, path, variant, format_name=None):
+    """Adds a finished download to the shared library (errors are reported, never raised)."""
+    key = media_key(info)
+    if key is None:
+        return
+    try:
+        get_library().add(*key, variant, path, format_name=format_name or info.get("format") or info.get("format_id"),
+                          title=info.get("title"), uploader=info.get("uploader") or info.get("channel"),
+                          url=info.get("webpage_url") or info.get("original_url"))
+    except (OSError, sqlite3.Error) as e:
+        print(f"Library error: {e}")
+
+
+def format_entry(entry):
+    """Returns a one-line description of a library entry."""
+    size = f"{entry['size'] / 1024 ** 2:.1f} MiB" if entry["size"] is not None else "?"
+    return f"{entry['title'] or entry['video_id']} [{entry['extractor']} {entry['video_id']}] {size} -> {entry['path']}"
+
+
+# --- Shared Instance ---
+
+_library = None
+_library_lock = threading.Lock()
+
+
+def get_library():
+    """Returns the shared download library."""
+    global _library
+    with _library_lock:
+        if _library is None:
+            _library = DownloadLibrary()
+        return _library
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Search the download library or check it against the disk.")
+    commands = parser.add_subparsers(dest="command", required=True)
+    search_parser = commands.add_parser("search", help="list entries matching all words (newest first if none)")
+    search_parser.add_argument("words", nargs="*")
+    search_parser.add_argument("--limit", type=int, default=SEARCH_LIMIT)
+    check_parser = commands.add_parser("check", help="reconcile the index with the files on disk")
+    check_parser.add_argument("folders", nargs="*", help="folders to look for moved or renamed files in")
+    check_parser.add_argument("--verify", action="store_true", help="re-hash every file")
+    args = parser.parse_args()
+
+    library = get_library()
+    if args.command == "search":
+        for entry in library.search(" ".join(args.words), args.limit):
+            print(format_entry(entry))
+        return
+    counts = library.check(args.folders, args.verify)
+    print(f"{library.count()} entries | OK: {counts['ok']} | Updated: {counts['updated']} | "
+          f"Moved: {counts['moved']} | Removed: {counts['removed']}")
+
+
+if __name__ == "__main__":
+    main()
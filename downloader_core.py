@@ -0,0 +1,653 @@
+import os
+import time
+import random
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from app_config import data_path
+from job_journal import KIND_DOWNLOAD, JOB_QUEUED, JOB_DONE, JOB_FAILED, JOB_CANCELLED, encode_options
+from job_metrics import JOB_SKIPPED, file_size
+from info_cache import get_info_cache, is_single_video
+from bandwidth import get_bandwidth_scheduler
+from audio_stream import stream_to_mp3, StreamUnavailable, STREAM_AUDIO_FORMAT, MP3_BYTES_PER_SECOND
+from scratch import download_work_dir, remove_work_dir, publish, ensure_free_space, same_disk
+from download_library import get_library, library_variant, media_key, url_media_key, record_download
+
+# --- Download Core ---
+# Tk-free download logic shared by the YouTube Downloader window and its
+# download queue. Everything in here is safe to call from worker threads.
+
+DEFAULT_PARALLEL_DOWNLOADS = 3
+MAX_PARALLEL_DOWNLOADS = 8
+FRAGMENT_WORKERS = 4 # Concurrent fragments of one segmented (DASH/HLS) download
+
+# Retries: yt-dlp retries single requests/fragments itself; if a download still
+# fails with a transient error, the whole item is retried and yt-dlp resumes
+# its .part files (HTTP range requests) instead of starting over.
+DOWNLOAD_ATTEMPTS = 4
+RETRY_BASE_DELAY = 2.0 # Seconds before the first item retry, doubled per attempt
+RETRY_MAX_DELAY = 60.0
+REQUEST_RETRIES = 5 # yt-dlp's own retries per request/fragment (its API default is none)
+REQUEST_RETRY_BASE_DELAY = 0.5 # Same, for yt-dlp's own request/fragment retries
+REQUEST_RETRY_MAX_DELAY = 15.0
+TRANSIENT_HTTP_STATUSES = (408, 425, 429, 500, 502, 503, 504)
+# yt-dlp reports some network failures only as text (no exception attached)
+TRANSIENT_MESSAGES = ("[download] Got error:", "unable to download video data", "Did not get any data blocks",
+                      "timed out", "Connection reset", "Connection aborted", "Remote end closed")
+
+# Playlist/channel sync: IDs of every downloaded entry ("<extractor> <id>" per line).
+# yt-dlp loads the file into a set, so entries already in it are skipped without a download.
+ARCHIVE_FILE = "download_archive.txt"
+# The video ID in the file name keeps videos with the same title from overwriting each other
+SINGLE_OUTTMPL = "%(title)s [%(id)s].%(ext)s"
+PLAYLIST_OUTTMPL = "%(playlist_title,playlist_id|Playlist)s/%(playlist_index|0)03d - %(title)s [%(id)s].%(ext)s"
+
+# Queue item states, as shown in the downloader window
+ITEM_QUEUED = "Queued"
+ITEM_DOWNLOADING = "Downloading"
+ITEM_PROCESSING = "Processing"
+ITEM_RETRYING = "Retrying"
+ITEM_DONE = "Done"
+ITEM_SKIPPED = "Already downloaded"
+ITEM_FAILED = "Failed"
+ITEM_CANCELLED = "Cancelled"
+
+NO_FILE_ERROR = "The download finished without producing a file"
+
+
+class DownloadCancelled(Exception):
+    """Raised when a queued or running download is cancelled."""
+
+
+def parse_url_list(text):
+    """
+    Returns the URLs in a block of text (one per line), in order and without
+    duplicates. Blank lines and lines starting with '#' are ignored.
+    """
+    urls = []
+    for line in text.splitlines():
+        url = line.strip()
+        if url and not url.startswith("#") and url not in urls:
+            urls.append(url)
+    return urls
+
+
+def build_format_string(resolution):
+    """Returns the yt-dlp format selector for a video resolution ('best', '1080', ...)."""
+    if resolution == "best":
+        return "bestvideo[ext=mp4]+bestaudio[ext=m4a]/best[ext=mp4]/best"
+    return f"bestvideo[height<={resolution}][ext=mp4]+bestaudio[ext=m4a]/best[height<={resolution}][ext=mp4]/best"
+
+
+def get_archive_path():
+    """Returns the download archive shared by all playlist syncs."""
+    return data_path(ARCHIVE_FILE)
+
+
+def build_ydl_opts(download_type, resolution, output_dir, cookie_file=None, playlist=False,
+                   archive_file=None):
+    """
+    Returns the yt-dlp options for a video or audio (MP3) download.
+    With playlist, every entry of a playlist/channel URL is saved into a
+    folder named after the playlist and entries in the archive are skipped.
+    """
+    file_template = PLAYLIST_OUTTMPL if playlist else SINGLE_OUTTMPL
+    if download_type == "video":
+        ydl_opts = {
+            'format': build_format_string(resolution),
+            'outtmpl': f'{output_dir}/{file_template}',
+            'merge_output_format': 'mp4',
+        }
+    else: # Audio
+        ydl_opts = {
+            'format': 'bestaudio/best',
+            'outtmpl': f'{output_dir}/{file_template[:-len(".%(ext)s")]}.mp3', # Force .mp3 extension
+            'postprocessors': [{
+                'key': 'FFmpegExtractAudio',
+                'preferredcodec': 'mp3',
+                'preferredquality': '192',
+            }],
+        }
+
+    ydl_opts['concurrent_fragment_downloads'] = FRAGMENT_WORKERS
+    ydl_opts['continuedl'] = True # Resume .part files left by a failed or cancelled attempt
+    ydl_opts['retries'] = ydl_opts['fragment_retries'] = REQUEST_RETRIES
+    ydl_opts['retry_sleep_functions'] = {'http': _request_backoff, 'fragment': _request_backoff}
+    if playlist:
+        ydl_opts.update({
+            'download_archive': archive_file or get_archive_path(),
+            'ignoreerrors': True, # One unavailable entry must not stop the sync
+            'lazy_playlist': True, # Start downloading before the whole channel is listed
+        })
+    if cookie_file:
+        ydl_opts['cookiefile'] = cookie_file
+    return ydl_opts
+
+
+def journal_options(download_type, resolution, playlist=False, stream=True):
+    """Returns the options recorded in the job journal for a download."""
+    options = {"type": download_type, "resolution": resolution if download_type == "video" else None}
+    if playlist:
+        options["playlist"] = True
+    elif download_type == "audio" and not stream:
+        options["stream"] = False # Resumed with yt-dlp's download + convert, as it was started
+    return options
+
+
+def item_journal_options(item):
+    """Returns the journal options of a queue item."""
+    return journal_options(item["type"], item["resolution"], item.get("playlist", False), item.get("stream", True))
+
+
+def backoff_delay(attempt, base=RETRY_BASE_DELAY, cap=RETRY_MAX_DELAY):
+    """
+    Returns the wait before retry number attempt + 1: exponential, with random
+    jitter so parallel downloads hit by the same outage don't retry in lockstep.
+    """
+    delay = min(cap, base * 2 ** attempt)
+    return delay / 2 + random.uniform(0, delay / 2)
+
+
+def _request_backoff(n):
+    """yt-dlp retry_sleep_functions callback (n = retries made so far)."""
+    return backoff_delay(n, REQUEST_RETRY_BASE_DELAY, REQUEST_RETRY_MAX_DELAY)
+
+
+def is_transient_error(error):
+    """
+    True if a failed download is worth retrying: timeouts, dropped connections,
+    truncated transfers, HTTP 429 and 5xx. Unavailable videos, 403s,
+    certificate and encoder errors are not.
+    """
+    from yt_dlp.networking.exceptions import TransportError, HTTPError, CertificateVerifyError
+    from yt_dlp.utils import ContentTooShortError
+    if any(text in str(error) for text in TRANSIENT_MESSAGES):
+        return True
+    seen = set()
+    while error is not None and id(error) not in seen:
+        seen.add(id(error))
+        if isinstance(error, HTTPError):
+            return error.status in TRANSIENT_HTTP_STATUSES
+        if isinstance(error, CertificateVerifyError):
+            return False
+        if isinstance(error, (TransportError, ContentTooShortError, TimeoutError, ConnectionError)):
+            return True
+        # yt-dlp's DownloadError keeps the original exception in exc_info
+        exc_info = getattr(error, "exc_info", None)
+        error = (exc_info[1] if exc_info else None) or error.__cause__ or error.__context__
+    return False
+
+
+def friendly_error(error):
+    """Turns a yt-dlp error into a short message for the status line."""
+    error_message = str(error)
+    if "This video is unavailable" in error_message:
+        return "Video is unavailable"
+    if "Sign in" in error_message:
+        return "YouTube 'Bot' Block! Use 'Load Cookies.txt'."
+    # Get the first line of the error, clean it (yt-dlp may put a \r after 'ERROR:')
+    lines = [line for line in error_message.replace('ERROR: ', '').splitlines() if line.strip()]
+    return lines[0].strip() if lines else type(error).__name__
+
+
+def _cancellable_hook(progress_hook):
+    """
+    Wraps a progress hook so DownloadCancelled reaches yt-dlp as its own
+    cancel exception, which (unlike other errors) 'ignoreerrors' doesn't swallow.
+    """
+    from yt_dlp.utils import DownloadCancelled as YtDlpCancelled
+
+    def hook(d):
+        try:
+            progress_hook(d)
+        except DownloadCancelled as e:
+            raise YtDlpCancelled(str(e)) from e
+    return hook
+
+
+def download_item(item, progress_hook, cookie_file=None, journal=None, archive_file=None,
+                  cancel_event=None, on_retry=None):
+    """
+    Downloads one queue item ({'url', 'output_dir', 'type', 'resolution', 'playlist', 'stream'}).
+    Returns (status, final file path). Media already in the download library
+    (or finished downloads recorded in the journal) is skipped while its file
+    still exists; playlists are always synced, the archive and the library
+    decide which of their entries are new.
+    Transient errors are retried with backoff, resuming the partial files;
+    on_retry(attempt, error, delay) is called before each wait, and setting
+    cancel_event ends the wait with DownloadCancelled.
+    """
+    import yt_dlp
+    playlist = item.get("playlist", False)
+    options = item_journal_options(item)
+
+    if not playlist:
+        entry = find_in_library(item["url"], library_variant(item["type"], item["resolution"]), cookie_file)
+        if entry is not None:
+            return ITEM_SKIPPED, entry["path"]
+
+    job_id = None
+    if journal is not None:
+        if not playlist:
+            completed = journal.find_completed(KIND_DOWNLOAD, item["url"], item["output_dir"], options)
+            if completed is not None:
+                return ITEM_SKIPPED, completed["result"]
+        job_id = journal.add_job(KIND_DOWNLOAD, item["url"], item["output_dir"], options)
+        journal.mark_running(job_id)
+
+    # Partial and intermediate files live in the item's scratch folder until they are published
+    work_dir = download_work_dir(item["url"], item["output_dir"], encode_options(options))
+
+    # Paced to this download's share of the global bandwidth budget while it runs
+    with get_bandwidth_scheduler().share() as throttle:
+        hook = throttle.wrap_hook(progress_hook)
+        attempt = 0
+        while True:
+            try:
+                status, result = _run_download(item, _resume_hook(hook, partial_file_sizes(work_dir)),
+                                               cookie_file, archive_file, work_dir)
+                break
+            except (DownloadCancelled, yt_dlp.utils.DownloadCancelled):
+                raise
+            except Exception as e:
+                attempt += 1
+                if attempt >= DOWNLOAD_ATTEMPTS or not is_transient_error(e):
+                    if journal is not None:
+                        journal.mark_failed(job_id, e)
+                    raise
+                delay = backoff_delay(attempt - 1)
+                if on_retry: on_retry(attempt, e, delay)
+                if cancel_event is None:
+                    time.sleep(delay)
+                elif cancel_event.wait(delay):
+                    raise DownloadCancelled("Download cancelled by user.")
+
+    remove_work_dir(work_dir) # Failed or cancelled items keep theirs, so a later attempt resumes
+    if not playlist and result is None:
+        # yt-dlp finished without a file (e.g. it filtered the media out); not done, so it is tried again
+        if journal is not None:
+            journal.mark_failed(job_id, NO_FILE_ERROR)
+        raise yt_dlp.utils.DownloadError(NO_FILE_ERROR)
+    if journal is not None:
+        journal.mark_done(job_id, result=None if playlist else result)
+    return status, result
+
+
+def partial_file_sizes(work_dir):
+    """Returns {absolute path: size} of the .part files an earlier attempt left in work_dir."""
+    sizes = {}
+    for root, _, files in os.walk(work_dir):
+        for name in files:
+            if name.endswith(".part"):
+                path = os.path.join(root, name)
+                try:
+                    sizes[os.path.abspath(path)] = os.path.getsize(path)
+                except OSError:
+                    pass
+    return sizes
+
+
+def _resume_hook(progress_hook, part_sizes):
+    """
+    Returns progress_hook, adding 'resumed_bytes' to the first report of each
+    file: the size its .part file had before this attempt, or 0 if yt-dlp
+    had to start the file over (the report is then below that size).
+    """
+    lock = threading.Lock() # Fragments of one download report from several threads
+    reported = set()
+
+    def hook(d):
+        tmpfilename = d.get('tmpfilename')
+        if d['status'] == 'downloading' and tmpfilename:
+            with lock:
+                first = tmpfilename not in reported
+                reported.add(tmpfilename)
+            if first:
+                size = part_sizes.get(os.path.abspath(tmpfilename), 0)
+                d['resumed_bytes'] = size if (d.get('downloaded_bytes') or 0) >= size else 0
+        progress_hook(d)
+    return hook
+
+
+def find_in_library(url, variant, cookie_file=None):
+    """
+    Returns the library entry of the media at url, or None. The ID comes from
+    the URL itself, or from its cached info for sites yt-dlp can't tell from the URL.
+    """
+    key = url_media_key(url)
+    if key is None:
+        info = get_info_cache().get(url, cookie_file)
+        key = media_key(info) if info is not None and is_single_video(info) else None
+    return get_library().lookup(*key, variant) if key else None
+
+
+def _run_download(item, progress_hook, cookie_file, archive_file, work_dir):
+    """
+    Makes one attempt at downloading an item (see download_item) into work_dir,
+    publishing every finished file to the item's output folder. Returns (status, result).
+    """
+    import yt_dlp
+    playlist = item.get("playlist", False)
+    if not playlist and item["type"] == "audio" and item.get("stream", True):
+        result = _stream_audio(item, progress_hook, cookie_file, work_dir)
+        if result is not None:
+            return ITEM_DONE, result
+
+    finished_files = []
+    variant = library_variant(item["type"], item["resolution"])
+    ydl_opts = build_ydl_opts(item["type"], item["resolution"], work_dir, cookie_file,
+                              playlist=playlist, archive_file=archive_file)
+    ydl_opts['progress_hooks'] = [_cancellable_hook(progress_hook)]
+    if playlist:
+        ydl_opts['match_filter'] = _library_filter(variant) # Entries downloaded on their own before
+
+    with yt_dlp.YoutubeDL(ydl_opts) as ydl:
+        ydl.add_post_processor(_free_space_check(work_dir, item["output_dir"]), when='before_dl')
+        # Final (merged/converted) file: moved into place before yt-dlp records it in the archive
+        ydl.add_post_processor(_publish_step(work_dir, item["output_dir"], variant, finished_files),
+                               when='after_move')
+        if playlist:
+            ydl.download([item["url"]])
+        else:
+            _download_resolved(ydl, item["url"], cookie_file)
+
+    if playlist:
+        if not finished_files:
+            return ITEM_SKIPPED, "No new videos"
+        return ITEM_DONE, f"{len(finished_files)} new videos"
+    return ITEM_DONE, finished_files[-1] if finished_files else None
+
+
+def _publish_download(path, work_dir, output_dir):
+    """Moves a finished file from the item's scratch folder to the same place under output_dir."""
+    return publish(path, os.path.join(output_dir, os.path.relpath(path, work_dir)))
+
+
+def _publish_step(work_dir, output_dir, variant, finished_files):
+    """Returns a yt-dlp 'after_move' postprocessor that publishes each finished file and adds it to the library."""
+    from yt_dlp.postprocessor import PostProcessor
+
+    class PublishDownload(PostProcessor):
+        def run(self, info):
+            info['filepath'] = _publish_download(info['filepath'], work_dir, output_dir)
+            finished_files.append(info['filepath'])
+            record_download(info, info['filepath'], variant)
+            return [], info
+
+    return PublishDownload()
+
+
+def _library_filter(variant):
+    """Returns a yt-dlp match filter that skips entries whose file is already in the library."""
+    def match_filter(info, incomplete=False):
+        key = media_key(info)
+        if key is not None and get_library().lookup(*key, variant) is not None:
+            return f"{info.get('title') or info['id']} is already in the library"
+        return None
+    return match_filter
+
+
+def expected_download_size(info):
+    """Returns the size of the format(s) yt-dlp selected for info in bytes (0 if unknown)."""
+    formats = info.get("requested_formats") or [info]
+    return sum(f.get("filesize") or f.get("filesize_approx") or 0 for f in formats)
+
+
+def _free_space_check(work_dir, output_dir):
+    """Returns a yt-dlp 'before_dl' postprocessor that checks free space before each video is downloaded."""
+    from yt_dlp.postprocessor import PostProcessor
+
+    class FreeSpaceCheck(PostProcessor):
+        def run(self, info):
+            size = expected_download_size(info)
+            # Merging streams (or converting to MP3) needs the parts and the result side by side
+            ensure_free_space(work_dir, size * 2)
+            if not same_disk(work_dir, output_dir):
+                ensure_free_space(output_dir, size)
+            return [], info
+
+    return FreeSpaceCheck()
+
+
+def _stream_audio(item, progress_hook, cookie_file, work_dir):
+    """
+    Downloads an audio item by piping it straight into the MP3 encoder.
+    Returns the published output path, or None if the media can't be streamed.
+    """
+    import yt_dlp
+    ydl_opts = build_ydl_opts("audio", None, work_dir, cookie_file)
+    ydl_opts['format'] = STREAM_AUDIO_FORMAT
+    del ydl_opts['postprocessors'] # ffmpeg encodes while downloading
+
+    info_cache = get_info_cache()
+    for attempt in range(2):
+        cached = info_cache.get(item["url"], cookie_file) is not None
+        info = info_cache.resolve(item["url"], cookie_file)
+        if not is_single_video(info):
+            return None
+        expected_size = (info.get("duration") or 0) * MP3_BYTES_PER_SECOND
+        ensure_free_space(work_dir, expected_size)
+        if not same_disk(work_dir, item["output_dir"]):
+            ensure_free_space(item["output_dir"], expected_size)
+        try:
+            with yt_dlp.YoutubeDL(ydl_opts) as ydl:
+                path = _publish_download(stream_to_mp3(ydl, info, progress_hook), work_dir, item["output_dir"])
+            record_download(info, path, library_variant("audio"), format_name="mp3 (streamed)")
+            return path
+        except StreamUnavailable:
+            return None
+        except yt_dlp.networking.exceptions.HTTPError:
+            if not cached or attempt:
+                raise
+            info_cache.invalidate(item["url"], cookie_file) # Format URLs expired: extract again
+
+
+def _download_resolved(ydl, url, cookie_file):
+    """
+    Downloads a single URL from its cached info, skipping the extractor round
+    trip. If the cached format URLs have expired, the URL is extracted again.
+    """
+    import yt_dlp
+    info_cache = get_info_cache()
+    cached = info_cache.get(url, cookie_file) is not None
+    info = info_cache.resolve(url, cookie_file)
+    if not is_single_video(info):
+        ydl.download([url])
+        return
+
+    try:
+        ydl.process_ie_result(info, download=True)
+    except yt_dlp.utils.DownloadCancelled:
+        raise
+    except yt_dlp.utils.DownloadError:
+        if not cached:
+            raise
+        info_cache.invalidate(url, cookie_file)
+        ydl.download([url])
+
+
+def sync_playlist(url, output_dir, download_type="video", resolution="best", cookie_file=None,
+                  archive_file=None, progress_hook=None):
+    """
+    Headless playlist/channel sync: downloads the entries of url that are not
+    in the archive yet. Returns (status, message) like download_item.
+    """
+    item = {"url": url, "output_dir": output_dir, "type": download_type,
+            "resolution": resolution, "playlist": True}
+    return download_item(item, progress_hook or (lambda d: None), cookie_file,
+                         archive_file=archive_file)
+
+
+class DownloadQueue:
+    """
+    Downloads many URLs with a bounded number of concurrent yt-dlp workers.
+    Callbacks are invoked from worker threads; the caller must marshal them to the UI.
+    """
+    def __init__(self, items, max_workers=DEFAULT_PARALLEL_DOWNLOADS, cookie_file=None, journal=None,
+                 metrics=None, on_status=None, on_progress=None, on_throughput=None, on_finished=None):
+        self.items = list(items)
+        self.max_workers = max(1, min(max_workers, MAX_PARALLEL_DOWNLOADS))
+        self.cookie_file = cookie_file
+        self.journal = journal
+        self.metrics = metrics
+
+        self.on_status = on_status
+        self.on_progress = on_progress
+        self.on_throughput = on_throughput
+        self.on_finished = on_finished
+
+        self.cancel_event = threading.Event()
+        self.keep_resumable = False
+        self.lock = threading.Lock()
+        self.speeds = {} # index -> current bytes/s of running downloads
+        self.completed = 0
+        self.failed = 0
+
+        self.queued_at = None
+        self.records = {} # index -> JobRecord of the item's metrics
+        self.transferred = {} # index -> bytes actually downloaded (all attempts)
+        self.resumed = {} # index -> bytes reused from partial files instead of downloaded again
+        self.attempt_bytes = {} # index -> {file name: bytes at its last report in the current attempt}
+
+    def start(self):
+        """Starts the queue in a background thread and returns immediately."""
+        threading.Thread(target=self.run, daemon=True).start()
+
+    def cancel(self, keep_resumable=False):
+        """
+        Cancels queued and running downloads. With keep_resumable (window closed),
+        unfinished jobs stay queued in the journal so they can be resumed later.
+        """
+        self.keep_resumable = keep_resumable
+        self.cancel_event.set()
+
+    def run(self):
+        """(THREAD) Runs all downloads and blocks until the queue finishes."""
+        self.queued_at = time.time()
+        with ThreadPoolExecutor(max_workers=self.max_workers) as pool:
+            for index in range(len(self.items)):
+                pool.submit(self.run_item, index)
+
+        if self.on_finished:
+            self.on_finished(self.completed, self.failed, self.cancel_event.is_set())
+
+    def run_item(self, index):
+        """(WORKER) Downloads a single queue item."""
+        if self.metrics is not None:
+            self.records[index] = self.metrics.start_job(KIND_DOWNLOAD, self.items[index]["url"], self.queued_at)
+        self.transferred[index] = self.resumed[index] = 0
+        self.attempt_bytes[index] = {}
+        if self.cancel_event.is_set():
+            self._record(index, JOB_CANCELLED)
+            self._report(index, ITEM_CANCELLED, "")
+            return
+
+        self._report(index, ITEM_DOWNLOADING, "")
+        if index in self.records:
+            self.records[index].start()
+        try:
+            status, result = download_item(self.items[index], lambda d: self.progress_hook(index, d),
+                                           self.cookie_file, self.journal, cancel_event=self.cancel_event,
+                                           on_retry=lambda attempt, error, delay:
+                                               self.on_retry(index, attempt, error, delay))
+            self._record(index, JOB_SKIPPED if status == ITEM_SKIPPED else JOB_DONE, result)
+            self._finish(index, status, result or "")
+        except Exception as e:
+            if self.cancel_event.is_set():
+                self._cancelled(index)
+            else:
+                self._record(index, JOB_FAILED, error=e)
+                self._finish(index, ITEM_FAILED, friendly_error(e))
+        finally:
+            self._set_speed(index, 0)
+
+    def progress_hook(self, index, d):
+        """(WORKER) yt-dlp progress hook of one item."""
+        if self.cancel_event.is_set():
+            raise DownloadCancelled("Download cancelled by user.")
+
+        if d['status'] == 'downloading' and d.get('filename'):
+            self._count_bytes(index, d)
+        if d['status'] == 'downloading':
+            self._set_speed(index, d.get('speed') or 0)
+            if index in self.records:
+                self.records[index].sample_speed(d.get('speed'))
+        elif d['status'] == 'finished':
+            self._set_speed(index, 0)
+            self._report(index, ITEM_PROCESSING, "")
+
+        if self.on_progress:
+            self.on_progress(index, d)
+
+    def _count_bytes(self, index, d):
+        """
+        (WORKER) Adds the bytes downloaded since the last report. The first
+        report of a file in an attempt carries the bytes resumed from its
+        .part file (see _resume_hook); streamed MP3 always starts at 0.
+        """
+        downloaded = d.get('downloaded_bytes') or 0
+        seen = self.attempt_bytes[index]
+        if d['filename'] not in seen:
+            resumed = d.get('resumed_bytes') or 0
+            seen[d['filename']] = resumed
+            if resumed:
+                with self.lock:
+                    self.resumed[index] += resumed
+        self.transferred[index] += max(0, downloaded - seen[d['filename']])
+        seen[d['filename']] = downloaded
+
+    def on_retry(self, index, attempt, error, delay):
+        """(WORKER) Called by download_item before it waits to retry an item."""
+        self.attempt_bytes[index] = {}
+        self._set_speed(index, 0)
+        if index in self.records:
+            self.records[index].retries += 1
+        self._report(index, ITEM_RETRYING, f"#{attempt} in {delay:.0f}s: {friendly_error(error)}")
+
+    def total_resumed(self):
+        """Returns the bytes all items reused from partial files so far."""
+        with self.lock:
+            return sum(self.resumed.values())
+
+    def _set_speed(self, index, speed):
+        """Records the speed of one item and reports the aggregate throughput."""
+        with self.lock:
+            self.speeds[index] = speed
+            total = sum(self.speeds.values())
+        if self.on_throughput:
+            self.on_throughput(total, self.completed, len(self.items))
+
+    def _cancelled(self, index):
+        """Records a download interrupted by cancel()."""
+        if self.journal is not None:
+            options = item_journal_options(self.items[index])
+            job_id = self.journal.add_job(KIND_DOWNLOAD, self.items[index]["url"],
+                                          self.items[index]["output_dir"], options)
+            if self.keep_resumable:
+                self.journal.set_status(job_id, JOB_QUEUED)
+            else:
+                self.journal.mark_cancelled(job_id)
+        self._record(index, JOB_CANCELLED)
+        self._report(index, ITEM_CANCELLED, "")
+
+    def _record(self, index, status, result=None, error=None):
+        """Completes the metrics record of one item (status is a journal state or JOB_SKIPPED)."""
+        record = self.records.pop(index, None)
+        if record is None:
+            return
+        record.finish(status, bytes_in=self.transferred.get(index) or None,
+                      bytes_out=file_size(result) if status == JOB_DONE else None,
+                      bytes_resumed=self.resumed.get(index) or None, error=error)
+
+    def _report(self, index, status, message):
+        """Forwards a per-item status change to the caller."""
+        if self.on_status:
+            self.on_status(index, status, message)
+
+    def _finish(self, index, status, message):
+        """Records a finished item and reports it."""
+        with self.lock:
+            self.completed += 1
+            if status == ITEM_FAILED:
+                self.failed += 1
+        self._report(index, status, message)
@@ -0,0 +1,288 @@
+import os
+import re
+import json
+import time
+import shutil
+import argparse
+import tempfile
+import threading
+import subprocess
+
+from app_config import data_path
+from scratch import get_scratch_dir
+
+# --- Encoder Profiles ---
+# Named speed/quality trade-offs applied on top of a preset's codecs: the
+# speed preset and CRF (or quantizer) of the video encoder and the bitrate
+# of the lossy audio encoder. Streams that are copied are left alone, and
+# jobs without a profile keep the preset's own settings.
+# Profiles are listed from fastest to best quality.
+PROFILES = {
+    "fast_draft": {
+        "label": "Fast Draft",
+        "video": {"libx264": {"preset": "veryfast", "crf": 28}, "libxvid": {"q:v": 6}},
+        "audio_bitrate": {"libmp3lame": "128k", "aac": "128k", "libopus": "96k"},
+    },
+    "balanced": {
+        "label": "Balanced",
+        "video": {"libx264": {"preset": "medium", "crf": 23}, "libxvid": {"q:v": 4}},
+        "audio_bitrate": {"libmp3lame": "192k", "aac": "192k", "libopus": "128k"},
+    },
+    "archival": {
+        "label": "Archival",
+        "video": {"libx264": {"preset": "slow", "crf": 18}, "libxvid": {"q:v": 2}},
+        "audio_bitrate": {"libmp3lame": "320k", "aac": "256k", "libopus": "192k"},
+    },
+}
+DEFAULT_PROFILE = "balanced"
+SETTINGS_FILE = "encoder_profile.json"
+
+# --- Auto-Tune ---
+# A short calibration encode on this machine measures every profile's
+# speed, quality (SSIM against the source, 1.0 = identical) and bitrate,
+# then picks the fastest profile that meets the targets. The choice is
+# saved and becomes the default profile. Each profile is measured with
+# every video encoder it has settings for (x264 and Xvid), and judged by
+# the worst of them, so the pick holds whichever preset a job uses.
+# Encoders missing from the installed ffmpeg are skipped.
+# Profiles carry no thread count: how many threads an encode should get
+# depends on how many jobs run at once, so the runners set it (the batch
+# converter's share of the CPUs, the segment encoder per segment).
+# Usage:
+#   python encoder_profiles.py --min-ssim 0.95
+#   python encoder_profiles.py --sample lecture.mp4 --max-kbps 3000
+
+CALIBRATION_SECONDS = 5
+# Synthetic 720p source with film-like grain, so it doesn't compress unrealistically well
+CALIBRATION_SOURCE = "testsrc2=size=1280x720:rate=30,noise=alls=3"
+DEFAULT_MIN_SSIM = 0.95
+
+# Container each video encoder's calibration clip is written to
+CALIBRATION_CONTAINERS = {"libx264": ".mp4", "libxvid": ".avi"}
+
+_SSIM_PATTERN = re.compile(r"SSIM .*All:([\d.]+)")
+
+
+def apply_profile(options, profile_name):
+    """Returns a copy of ffmpeg options with the profile's settings for the encoders they use."""
+    options = dict(options)
+    if not profile_name:
+        return options
+    profile = PROFILES[profile_name]
+    options.update(profile["video"].get(options.get("vcodec"), {}))
+    bitrate = profile["audio_bitrate"].get(options.get("acodec"))
+    if bitrate:
+        options["audio_bitrate"] = bitrate
+    return options
+
+
+def profile_label(profile_name):
+    """Returns the display name of a profile ('Preset Defaults' for none)."""
+    return PROFILES[profile_name]["label"] if profile_name else "Preset Defaults"
+
+
+def make_reference(work_dir, sample_file=None, seconds=CALIBRATION_SECONDS):
+    """Writes the lossless reference clip every profile is encoded from; returns its path."""
+    import ffmpeg
+    from converter_core import run_ffmpeg
+    if sample_file:
+        source = ffmpeg.input(sample_file, t=seconds)
+    else:
+        source = ffmpeg.input(CALIBRATION_SOURCE, f="lavfi", t=seconds)
+    reference = os.path.join(work_dir, "reference.mkv")
+    run_ffmpeg(ffmpeg.output(source.video, reference, vcodec="libx264", qp=0, preset="ultrafast",
+                             pix_fmt="yuv420p"), reference)
+    return reference
+
+
+def measure_ssim(encoded_file, reference_file):
+    """Returns the SSIM of encoded_file against reference_file, or None if ffmpeg can't tell."""
+    import ffmpeg
+    stream = ffmpeg.filter([ffmpeg.input(encoded_file), ffmpeg.input(reference_file)], "ssim")
+    args = ffmpeg.compile(ffmpeg.output(stream, "-", f="null"))
+    log = subprocess.run(args + ["-nostdin"], capture_output=True, text=True, errors="replace").stderr
+    match = _SSIM_PATTERN.search(log)
+    return float(match.group(1)) if match else None
+
+
+def available_encoders():
+    """Returns the names of the encoders the installed ffmpeg has (empty if it can't be run)."""
+    try:
+        result = subprocess.run(["ffmpeg", "-hide_banner", "-encoders"], capture_output=True, text=True,
+                                errors="replace")
+    except OSError:
+        return set()
+    return {line.split()[1] for line in result.stdout.splitlines() if len(line.split()) > 1}
+
+
+def calibrate_encoder(profile_name, vcodec, reference_file, work_dir, seconds=CALIBRATION_SECONDS):
+    """Encodes the reference clip with one video encoder of a profile and returns its speed, bitrate and quality."""
+    import ffmpeg
+    from converter_core import run_ffmpeg
+    output_file = os.path.join(work_dir, f"{profile_name}_{vcodec}{CALIBRATION_CONTAINERS[vcodec]}")
+    options = apply_profile({"vcodec": vcodec, "pix_fmt": "yuv420p"}, profile_name)
+    started = time.perf_counter()
+    stats = run_ffmpeg(ffmpeg.output(ffmpeg.input(reference_file), output_file, **options), output_file)
+    encode_seconds = time.perf_counter() - started
+    return {
+        "encode_seconds": round(encode_seconds, 3),
+        "cpu_seconds": stats["cpu_seconds"],
+        "realtime_factor": round(seconds / encode_seconds, 2) if encode_seconds > 0 else None,
+        "kbps": round(os.path.getsize(output_file) * 8 / 1000 / seconds),
+        "ssim": measure_ssim(output_file, reference_file),
+    }
+
+
+def calibrate_profile(profile_name, reference_file, work_dir, seconds=CALIBRATION_SECONDS, encoders=None):
+    """
+    Encodes the reference clip with every video encoder the profile sets and
+    returns the worst case of them: total time, slowest speed, highest
+    bitrate and lowest quality. Per-encoder numbers are under "encoders".
+    """
+    if encoders is None:
+        encoders = available_encoders()
+    measured = {vcodec: calibrate_encoder(profile_name, vcodec, reference_file, work_dir, seconds)
+                for vcodec in PROFILES[profile_name]["video"] if vcodec in encoders}
+    if not measured:
+        raise RuntimeError("ffmpeg has none of the video encoders the profiles use")
+    results = list(measured.values())
+    speeds = [result["realtime_factor"] for result in results if result["realtime_factor"] is not None]
+    scores = [result["ssim"] for result in results if result["ssim"] is not None]
+    cpu_times = [result["cpu_seconds"] for result in results if result["cpu_seconds"] is not None]
+    return {
+        "profile": profile_name,
+        "encode_seconds": round(sum(result["encode_seconds"] for result in results), 3),
+        "cpu_seconds": round(sum(cpu_times), 3) if len(cpu_times) == len(results) else None,
+        "realtime_factor": min(speeds) if speeds else None,
+        "kbps": max(result["kbps"] for result in results),
+        # One encoder without a score makes the profile's quality unknown
+        "ssim": min(scores) if len(scores) == len(results) else None,
+        "encoders": measured,
+    }
+
+
+def pick_profile(results, min_ssim=None, max_kbps=None):
+    """
+    Returns the fastest profile of the calibration results that meets the
+    targets. If none does, the best-quality one (or the smallest, for a size-only target).
+    """
+    def meets_targets(result):
+        if min_ssim is not None and (result["ssim"] or 0) < min_ssim:
+            return False
+        return max_kbps is None or result["kbps"] <= max_kbps
+
+    for result in sorted(results, key=lambda result: result["encode_seconds"]):
+        if meets_targets(result):
+            return result["profile"]
+    if min_ssim is None and max_kbps is not None:
+        return min(results, key=lambda result: result["kbps"])["profile"]
+    return max(results, key=lambda result: result["ssim"] or 0)["profile"]
+
+
+def autotune(sample_file=None, min_ssim=DEFAULT_MIN_SSIM, max_kbps=None, seconds=CALIBRATION_SECONDS,
+             on_result=None):
+    """
+    Calibrates every profile on this machine, saves the pick as the default
+    profile and returns (profile name, calibration results).
+    on_result receives each profile's result as soon as it is measured.
+    """
+    work_dir = tempfile.mkdtemp(prefix="jb_autotune_", dir=get_scratch_dir())
+    try:
+        reference = make_reference(work_dir, sample_file, seconds)
+        encoders = available_encoders()
+        skipped = sorted(set(CALIBRATION_CONTAINERS) - encoders)
+        if skipped: print(f"Auto-tune: ffmpeg lacks {', '.join(skipped)}, not calibrating it")
+        results = []
+        for profile_name in PROFILES:
+            results.append(calibrate_profile(profile_name, reference, work_dir, seconds, encoders))
+            if on_result: on_result(results[-1])
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+    profile_name = pick_profile(results, min_ssim, max_kbps)
+    save_settings({"profile": profile_name, "calibrated_at": time.strftime("%Y-%m-%d %H:%M:%S"),
+                   "sample": sample_file, "min_ssim": min_ssim, "max_kbps": max_kbps, "results": results})
+    set_default_profile(profile_name, save=False)
+    return profile_name, results
+
+
+# --- Settings ---
+
+def load_settings(path=None):
+    """Returns the saved profile settings ({} if missing or broken)."""
+    try:
+        with open(path or data_path(SETTINGS_FILE), encoding="utf-8") as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return {}
+    except (OSError, ValueError) as e:
+        print(f"Encoder profile settings error: {e}")
+        return {}
+
+
+def save_settings(settings, path=None):
+    """Writes the profile settings (the chosen profile and the last calibration)."""
+    try:
+        with open(path or data_path(SETTINGS_FILE), "w", encoding="utf-8") as f:
+            json.dump(settings, f, indent=2)
+    except OSError as e:
+        print(f"Could not save encoder profile settings: {e}")
+
+
+# --- Shared Instance ---
+
+_default_profile = None
+_profile_lock = threading.Lock()
+
+
+def get_default_profile():
+    """Returns the profile used when none is chosen (the auto-tuned one, if any)."""
+    global _default_profile
+    with _profile_lock:
+        if _default_profile is None:
+            saved = load_settings().get("profile")
+            _default_profile = saved if saved in PROFILES else DEFAULT_PROFILE
+        return _default_profile
+
+
+def set_default_profile(profile_name, save=True):
+    """Makes profile_name the default (and stores it, keeping the last calibration)."""
+    global _default_profile
+    with _profile_lock:
+        _default_profile = profile_name
+        if save:
+            settings = load_settings()
+            settings["profile"] = profile_name
+            save_settings(settings)
+
+
+def print_result(result):
+    """Prints one calibration result, with a line per video encoder."""
+    _print_line(result["profile"], result)
+    for vcodec, encoder_result in result.get("encoders", {}).items():
+        _print_line(f"  {vcodec}", encoder_result)
+
+
+def _print_line(name, result):
+    ssim = f"{result['ssim']:.4f}" if result["ssim"] is not None else "n/a"
+    print(f"{name:12} {result['encode_seconds']:7.2f}s {result['realtime_factor'] or 0:6.1f}x "
+          f"{result['kbps']:8d} kbps  SSIM {ssim}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Pick the fastest encoder profile that meets a quality or size "
+                                                 "target on this machine.")
+    parser.add_argument("--sample", help="calibrate on the start of this video instead of a synthetic clip")
+    parser.add_argument("--seconds", type=int, default=CALIBRATION_SECONDS, help="length of the calibration clip")
+    parser.add_argument("--min-ssim", type=float, default=DEFAULT_MIN_SSIM,
+                        help=f"lowest acceptable SSIM (default {DEFAULT_MIN_SSIM}; 0 = no quality target)")
+    parser.add_argument("--max-kbps", type=int, help="highest acceptable video bitrate")
+    args = parser.parse_args()
+
+    profile_name, _ = autotune(args.sample, args.min_ssim or None, args.max_kbps, args.seconds,
+                               on_result=print_result)
+    print(f"Default profile: {profile_name} ({profile_label(profile_name)})")
+
+
+if __name__ == "__main__":
+    main()
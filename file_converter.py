@@ -1,9 +1,9 @@
 import ttkbootstrap as ttk
 from ttkbootstrap.constants import *
-from tkinter import filedialog
+from tkinter import filedialog, TclError
 import threading
+import json
 import os
-import sys
 
 # --- Library Change ---
 # Using 'ffmpeg-python' instead of moviepy/pydub for stability.
@@ -25,14 +25,26 @@ FFMPEG_ERROR_MESSAGE = """ERROR: 'ffmpeg-python' library or 'ffmpeg.exe' not fou
 1. Run: pip install ffmpeg-python
 2. Ensure 'ffmpeg' is installed on your system (e.g., via scoop or choco)."""
 
-# Import ICON_NAME from main.py config
-try:
-    from main import ICON_NAME
-except ImportError:
-    ICON_NAME = "favicon.ico" # Fallback
+from converter_core import (
+    PRESETS, SUCCESS_MESSAGES, BatchConverter,
+    STATUS_QUEUED, STATUS_RUNNING, STATUS_DONE, STATUS_SKIPPED, STATUS_FAILED,
+    NATIVE_AUDIO, NATIVE_AUDIO_LABEL, collect_batch_files, plan_batch_jobs,
+    get_open_types, get_preset_pattern, resolve_preset, default_worker_count, journal_options,
+    format_progress, convert_file, describe_conversion, finish_conversion_record, ConversionCancelled,
+    MULTI_OUTPUT_PRESET, MULTI_OUTPUT_TARGETS, plan_multi_outputs, multi_journal_options, convert_multi, format_eta,
+)
+from ui_window import AppWindowMixin, ScrollableFrame
+from job_journal import get_journal, KIND_CONVERT, JOB_DONE, JOB_FAILED, JOB_CANCELLED
+from job_metrics import get_metrics, file_size
+from conversion_cache import get_conversion_cache, format_cache_stats
+from encoder_profiles import PROFILES, get_default_profile, set_default_profile, autotune
+from audio_analysis import analyze_audio, format_analysis, AnalysisCancelled
+from watch_folder import FolderWatcher
+
+ANALYSIS_FILE_TYPES = [("Media Files", "*.wav;*.mp3;*.m4a;*.flac;*.ogg;*.opus;*.mp4;*.mkv;*.mov;*.webm;*.avi")]
 
 
-class FileConverter(ttk.Toplevel):
+class FileConverter(AppWindowMixin, ttk.Toplevel):
     """
     Toplevel window for converting various media files using ffmpeg.
     """
@@ -41,48 +53,56 @@ class FileConverter(ttk.Toplevel):
         self.main_app = main_app
         self.title("File Converter (ffmpeg-python)")
         
-        self.geometry("450x650") # Height for feedback bar
+        self.geometry("450x970") # Height for feedback bar, profiles and batch mode
         
-        self.center_window(450, 650)
-        self.resizable(False, False)
+        self.center_window(450, 970) # Shrinks to fit small screens; the options scroll
+        self.minsize(450, 300)
 
         self.is_closing = False
+        self.dispatcher = main_app.dispatcher # Applies UI updates posted by worker threads
         
         self.set_app_icon()
         self.create_widgets()
 
-    def set_app_icon(self):
-        """Sets the application icon for the window."""
-        try:
-            # Get the absolute path to the icon file
-            base_path = getattr(sys, '_MEIPASS', os.path.dirname(os.path.abspath(__file__)))
-            icon_path = os.path.join(base_path, ICON_NAME)
-            
-            if os.path.exists(icon_path):
-                self.iconbitmap(icon_path)
-            else:
-                print(f"Warning: Icon file not found at {icon_path}")
-        except Exception as e:
-            print(f"Error setting icon: {e}")
-
-    def center_window(self, width, height):
-        """Centers the window on the screen."""
-        screen_width = self.winfo_screenwidth()
-        screen_height = self.winfo_screenheight()
-        x_coordinate = (screen_width / 2) - (width / 2)
-        y_coordinate = (screen_height / 2) - (height / 2)
-        self.geometry(f"{width}x{height}+{int(x_coordinate)}+{int(y_coordinate)}")
-
     def create_widgets(self):
         """Creates and places all widgets in the converter window."""
-        main_frame = ttk.Frame(self, padding="20")
-        main_frame.pack(expand=True, fill="both")
+        # --- Navigation Buttons ---
+        # Packed first and outside the scroll area so they stay visible on small screens
+        button_frame = ttk.Frame(self, padding=(20, 10))
+        button_frame.pack(side="bottom", fill="x")
+
+        back_button = ttk.Button(button_frame, text="Back", command=self.go_back, bootstyle="secondary-outline")
+        back_button.pack(side="left", expand=True, padx=5)
+
+        exit_button = ttk.Button(button_frame, text="Exit App", command=self.exit_app, bootstyle="danger")
+        exit_button.pack(side="left", expand=True, padx=5)
+
+        scroll_frame = ScrollableFrame(self, padding=(20, 20, 20, 0))
+        scroll_frame.pack(expand=True, fill="both")
+        main_frame = scroll_frame.content
 
         label = ttk.Label(main_frame, text="File Converter", 
                           bootstyle="primary", font=("Segoe UI", 16, "bold"), 
                           anchor="center")
         label.pack(pady=10, fill="x")
 
+        # --- Encoder Profile ---
+        # Speed/quality trade-off for every conversion started from this window and its batch windows
+        self.profile_frame = ttk.Labelframe(main_frame, text="Encoder Profile", padding=15)
+        self.profile_frame.pack(pady=10, fill="x")
+
+        self.profile_names = {profile["label"]: name for name, profile in PROFILES.items()}
+        self.profile_var = ttk.StringVar(value=PROFILES[get_default_profile()]["label"])
+        profile_box = ttk.Combobox(self.profile_frame, textvariable=self.profile_var, state="readonly",
+                                   values=list(self.profile_names))
+        profile_box.grid(row=0, column=0, padx=5, pady=5, sticky="ew")
+        profile_box.bind("<<ComboboxSelected>>", self.on_profile_selected)
+        (ttk.Button(self.profile_frame, text="Auto-Tune", command=self.start_autotune,
+                    bootstyle="secondary-outline")
+            .grid(row=0, column=1, padx=5, pady=5, sticky="ew"))
+
+        self.profile_frame.grid_columnconfigure(0, weight=1)
+
         # --- Video Conversion ---
         self.video_frame = ttk.Labelframe(main_frame, text="Video Conversion", padding=15)
         self.video_frame.pack(pady=10, fill="x")
@@ -95,6 +115,12 @@ class FileConverter(ttk.Toplevel):
             .grid(row=1, column=0, padx=5, pady=5, sticky="ew"))
         (ttk.Button(self.video_frame, text="MP4 to MKV", command=self.start_mp4_to_mkv)
             .grid(row=1, column=1, padx=5, pady=5, sticky="ew"))
+
+        # Opt-in: split long videos at keyframes and encode the chunks in parallel
+        self.segment_var = ttk.BooleanVar(value=False)
+        (ttk.Checkbutton(self.video_frame, text="Parallel segments for long videos (10+ min)",
+                         variable=self.segment_var, bootstyle="round-toggle")
+            .grid(row=2, column=0, columnspan=2, padx=5, pady=5, sticky="w"))
         
         self.video_frame.grid_columnconfigure(0, weight=1)
         self.video_frame.grid_columnconfigure(1, weight=1)
@@ -111,6 +137,9 @@ class FileConverter(ttk.Toplevel):
             .grid(row=1, column=0, padx=5, pady=5, sticky="ew"))
         (ttk.Button(self.audio_frame, text='MP3 to M4A', command=self.start_mp3_to_m4a)
             .grid(row=1, column=1, padx=5, pady=5, sticky="ew"))
+        (ttk.Button(self.audio_frame, text="Analyze Audio (Waveform, Levels, Silence)...",
+                    command=self.open_analysis_window, bootstyle="info-outline")
+            .grid(row=2, column=0, columnspan=2, padx=5, pady=5, sticky="ew"))
 
         self.audio_frame.grid_columnconfigure(0, weight=1)
         self.audio_frame.grid_columnconfigure(1, weight=1)
@@ -119,10 +148,34 @@ class FileConverter(ttk.Toplevel):
         self.video_to_audio_frame = ttk.Labelframe(main_frame, text="Video to Audio", padding=15)
         self.video_to_audio_frame.pack(pady=10, fill="x")
 
+        # The audio stream is copied out as it is (AAC -> .m4a, Opus -> .opus, other -> .mka)
+        (ttk.Button(self.video_to_audio_frame, text="Extract Audio (Original Format, no re-encode)",
+                    command=self.start_video_to_native_audio, bootstyle="primary")
+            .pack(fill="x", padx=5, pady=5))
         (ttk.Button(self.video_to_audio_frame, text="Extract Audio (to MP3)", 
-                    command=self.start_video_to_audio, bootstyle="primary")
+                    command=self.start_video_to_audio, bootstyle="primary-outline")
             .pack(fill="x", padx=5, pady=5))
 
+        # --- Batch Conversion ---
+        self.batch_frame = ttk.Labelframe(main_frame, text="Batch Mode", padding=15)
+        self.batch_frame.pack(pady=10, fill="x")
+
+        (ttk.Button(self.batch_frame, text="Batch Convert Folder...", 
+                    command=self.open_batch_window, bootstyle="info-outline")
+            .pack(fill="x", padx=5, pady=5))
+        tools_row = ttk.Frame(self.batch_frame)
+        tools_row.pack(fill="x")
+        (ttk.Button(tools_row, text="Multi-Output (One Decode)...",
+                    command=self.open_multi_output_window, bootstyle="info-outline")
+            .pack(side="left", fill="x", expand=True, padx=5, pady=5))
+        (ttk.Button(tools_row, text="Watch Folder...",
+                    command=self.open_watch_window, bootstyle="info-outline")
+            .pack(side="left", fill="x", expand=True, padx=5, pady=5))
+
+        # Shown only when the journal holds jobs interrupted by a crash or close
+        self.resume_button = ttk.Button(self.batch_frame, text="Resume Unfinished Jobs",
+                                        command=self.resume_unfinished_jobs, bootstyle="warning-outline")
+
         # --- Feedback Widgets ---
         self.progress_bar = ttk.Progressbar(main_frame, orient='horizontal', 
                                             mode='indeterminate', 
@@ -133,6 +186,11 @@ class FileConverter(ttk.Toplevel):
         self.result_label = ttk.Label(main_frame, text="Waiting for conversion...", anchor="center")
         self.result_label.pack(pady=10)
 
+        self.cache_label = ttk.Label(main_frame, text="", anchor="center", font=("Segoe UI", 8),
+                                     bootstyle="secondary")
+        self.cache_label.pack(fill="x")
+        self.refresh_cache_stats()
+
         # --- Library Error Handling ---
         if not LIBS_OK:
             warning_label = ttk.Label(
@@ -143,22 +201,15 @@ class FileConverter(ttk.Toplevel):
                 wraplength=400 
             )
             warning_label.pack(pady=5, fill="x")
-            self.geometry("450x700") # Make window taller for the error
             
             # Disable all conversion buttons
+            self.disable_buttons(self.profile_frame)
             self.disable_buttons(self.video_frame)
             self.disable_buttons(self.audio_frame)
             self.disable_buttons(self.video_to_audio_frame)
-
-        # --- Navigation Buttons ---
-        button_frame = ttk.Frame(main_frame)
-        button_frame.pack(pady=10, fill="x")
-
-        back_button = ttk.Button(button_frame, text="Back", command=self.go_back, bootstyle="secondary-outline")
-        back_button.pack(side="left", expand=True, padx=5)
-
-        exit_button = ttk.Button(button_frame, text="Exit App", command=self.exit_app, bootstyle="danger")
-        exit_button.pack(side="left", expand=True, padx=5)
+            self.disable_buttons(self.batch_frame)
+        else:
+            self.refresh_resume_button()
 
     def disable_buttons(self, frame):
         """Disables all buttons within a given frame."""
@@ -172,7 +223,7 @@ class FileConverter(ttk.Toplevel):
             return
             
         state = "normal" if enable else "disabled"
-        for frame in [self.video_frame, self.audio_frame, self.video_to_audio_frame]:
+        for frame in [self.profile_frame, self.video_frame, self.audio_frame, self.video_to_audio_frame]:
             for child in frame.winfo_children():
                 if isinstance(child, ttk.Button):
                     child.config(state=state)
@@ -182,17 +233,41 @@ class FileConverter(ttk.Toplevel):
         if self.is_closing:
             return
         self.progress_bar.stop()
+        self.progress_bar.config(mode='indeterminate', value=0)
         self.progress_bar.pack_forget()
         self.toggle_conversion_buttons(enable=True)
+        self.refresh_cache_stats()
+        self.refresh_resume_button()
+
+    def refresh_cache_stats(self):
+        """Shows the conversion cache hit/miss counters."""
+        try:
+            self.cache_label.config(text=format_cache_stats(get_conversion_cache().stats()))
+        except Exception as e:
+            print(f"Conversion cache error: {e}")
+
+    def show_progress_safe(self, progress):
+        """Shows ffmpeg's progress; called from the conversion thread."""
+        if self.is_closing:
+            return
+        self.update_status_safe(format_progress(progress), style="info")
+        if progress["percent"] is not None:
+            self.dispatcher.post((self, "progress"), self.set_progress_value, progress["percent"])
+
+    def set_progress_value(self, percent):
+        """Switches the bar to determinate mode and sets its value (main thread only)."""
+        if self.is_closing:
+            return
+        if str(self.progress_bar.cget('mode')) != 'determinate':
+            self.progress_bar.stop()
+            self.progress_bar.config(mode='determinate', maximum=100)
+        self.progress_bar['value'] = percent
 
     def update_status_safe(self, message, style="success"):
         """Safely updates the status label from any thread."""
         if self.is_closing:
             return
-        try:
-            self.after(0, lambda: self.result_label.config(text=message, bootstyle=style))
-        except Exception as e:
-            print(f"UI update error: {e}")
+        self.dispatcher.post((self, "status"), self.result_label.config, text=message, bootstyle=style)
     
     def start_conversion_thread(self, target_function, input_file, output_file, **kwargs):
         """Safely starts the conversion function in a separate thread."""
@@ -216,7 +291,7 @@ class FileConverter(ttk.Toplevel):
         )
         conversion_thread.start()
 
-    def get_files_and_run(self, conversion_func, open_types, save_types, save_ext, **kwargs):
+    def get_files_and_run(self, preset_name):
         """
         Handles the file dialogs in the main thread before starting
         the conversion thread.
@@ -225,124 +300,225 @@ class FileConverter(ttk.Toplevel):
             self.update_status_safe(FFMPEG_ERROR_MESSAGE, style="danger")
             return
 
+        open_types = get_open_types(preset_name)
         input_file = filedialog.askopenfilename(title=f"Select {open_types[0][0]} File", filetypes=open_types)
         if not input_file:
             self.update_status_safe("Operation cancelled", "warning")
             return
 
-        output_file = filedialog.asksaveasfilename(title="Save As", filetypes=save_types, defaultextension=save_ext)
+        preset_name = resolve_preset(preset_name, input_file) # Picks the native container for NATIVE_AUDIO
+        preset = PRESETS[preset_name]
+        suggested_name = os.path.splitext(os.path.basename(input_file))[0] + preset["save_ext"]
+        output_file = filedialog.asksaveasfilename(title="Save As", filetypes=preset["save_types"],
+                                                   defaultextension=preset["save_ext"], initialfile=suggested_name)
         if not output_file:
             self.update_status_safe("Operation cancelled", "warning")
             return
-            
-        self.start_conversion_thread(conversion_func, input_file, output_file, **kwargs)
+
+        profile = self.selected_profile()
+        job_id = get_journal().add_job(KIND_CONVERT, input_file, output_file, journal_options(preset_name, profile))
+
+        conversion_funcs = {
+            "video": self.run_convert_video,
+            "audio": self.run_convert_audio,
+            "extract": self.run_extract_audio,
+        }
+        kwargs = {"preset_name": preset_name, "job_id": job_id, "profile": profile}
+        if preset["kind"] == "video":
+            kwargs["segment_parallel"] = self.segment_var.get()
+        self.start_conversion_thread(conversion_funcs[preset["kind"]], input_file, output_file, **kwargs)
+
+    def selected_profile(self):
+        """Returns the name of the chosen encoder profile (main thread only)."""
+        return self.profile_names[self.profile_var.get()]
+
+    def on_profile_selected(self, event=None):
+        """Remembers the chosen profile as the default for the next session."""
+        set_default_profile(self.selected_profile())
+
+    def start_autotune(self):
+        """Runs the encoder calibration in a background thread."""
+        if self.is_closing or not LIBS_OK:
+            return
+        self.progress_bar.pack(pady=5, fill="x")
+        self.progress_bar.start(10)
+        self.toggle_conversion_buttons(enable=False)
+        self.update_status_safe("Auto-tune: calibrating encoder profiles on this machine...", style="info")
+        threading.Thread(target=self.run_autotune, daemon=True).start()
+
+    def run_autotune(self):
+        """(THREAD) Calibrates the profiles and selects the fastest one meeting the quality target."""
+        try:
+            profile_name, results = autotune(on_result=lambda result: self.update_status_safe(
+                f"Auto-tune: {PROFILES[result['profile']]['label']} encodes at "
+                f"{result['realtime_factor'] or 0:.1f}x realtime...", style="info"))
+            if self.is_closing: return
+            self.dispatcher.post((self, "profile"), self.profile_var.set, PROFILES[profile_name]["label"])
+            speeds = ", ".join(f"{PROFILES[result['profile']]['label']} {result['realtime_factor'] or 0:.1f}x"
+                               for result in results)
+            self.update_status_safe(f"Auto-tune picked {PROFILES[profile_name]['label']} ({speeds})",
+                                    style="success")
+        except Exception as e:
+            if self.is_closing: return
+            self.update_status_safe(f"Auto-tune failed: {e}", style="danger")
+        finally:
+            if not self.is_closing:
+                self.dispatcher.post((self, "feedback"), self.stop_feedback_safe)
+
+    def open_batch_window(self):
+        """Opens the batch conversion window."""
+        if self.is_closing or not LIBS_OK:
+            self.update_status_safe(FFMPEG_ERROR_MESSAGE, style="danger")
+            return
+        BatchConversionWindow(self)
+
+    def open_analysis_window(self):
+        """Asks for a media file and opens its audio analysis."""
+        if self.is_closing or not LIBS_OK:
+            self.update_status_safe(FFMPEG_ERROR_MESSAGE, style="danger")
+            return
+        input_file = filedialog.askopenfilename(title="Select Media File", filetypes=ANALYSIS_FILE_TYPES)
+        if input_file:
+            AudioAnalysisWindow(self, input_file)
+
+    def open_multi_output_window(self):
+        """Opens the multi-output conversion window."""
+        if self.is_closing or not LIBS_OK:
+            self.update_status_safe(FFMPEG_ERROR_MESSAGE, style="danger")
+            return
+        MultiOutputWindow(self)
+
+    def open_watch_window(self):
+        """Opens the watch folder window."""
+        if self.is_closing or not LIBS_OK:
+            self.update_status_safe(FFMPEG_ERROR_MESSAGE, style="danger")
+            return
+        WatchFolderWindow(self)
+
+    def refresh_resume_button(self):
+        """Shows the resume button if the journal holds unfinished conversions."""
+        try:
+            pending = len(get_journal().unfinished(KIND_CONVERT))
+        except Exception as e:
+            print(f"Journal error: {e}")
+            pending = 0
+
+        if pending:
+            self.resume_button.config(text=f"Resume Unfinished Jobs ({pending})")
+            self.resume_button.pack(fill="x", padx=5, pady=5)
+        else:
+            self.resume_button.pack_forget()
+
+    def resume_unfinished_jobs(self):
+        """Continues the conversions left unfinished by the last session."""
+        jobs_by_profile = {} # Every job resumes with the encoder profile it was started with
+        multi_jobs = [] # Multi-output jobs resume in their own window
+        for row in get_journal().unfinished(KIND_CONVERT):
+            options = json.loads(row["options"])
+            preset_name, profile = options.get("preset"), options.get("profile")
+            if preset_name == MULTI_OUTPUT_PRESET:
+                targets = options.get("targets") or []
+                if (targets and all(name in MULTI_OUTPUT_TARGETS for name in targets)
+                        and (profile is None or profile in PROFILES) and os.path.exists(row["input"])):
+                    multi_jobs.append((row["input"], row["output"], targets, profile))
+                else:
+                    get_journal().mark_failed(row["id"], "Input file, outputs or profile no longer available")
+            elif preset_name in PRESETS and (profile is None or profile in PROFILES) and os.path.exists(row["input"]):
+                jobs_by_profile.setdefault(profile, []).append((preset_name, row["input"], row["output"]))
+            else:
+                get_journal().mark_failed(row["id"], "Input file, preset or profile no longer available")
+
+        self.resume_button.pack_forget()
+        if not jobs_by_profile and not multi_jobs:
+            self.update_status_safe("No resumable jobs left.", "warning")
+            return
+        for profile, jobs in jobs_by_profile.items():
+            BatchConversionWindow(self, resume_jobs=jobs, resume_profile=profile)
+        for input_file, output_folder, targets, profile in multi_jobs:
+            MultiOutputWindow(self).start_job(input_file, output_folder, targets, profile)
 
     # --- Conversion Starter Methods ---
 
     def start_mp4_to_avi(self):
-        self.get_files_and_run(self.run_convert_video, 
-                               [("MP4 Files", "*.mp4")], [("AVI Files", "*.avi")], ".avi", 
-                               vcodec='libxvid')
+        self.get_files_and_run("mp4_to_avi")
 
     def start_avi_to_mp4(self):
-        self.get_files_and_run(self.run_convert_video, 
-                               [("AVI Files", "*.avi")], [("MP4 Files", "*.mp4")], ".mp4", 
-                               vcodec='libx264')
+        self.get_files_and_run("avi_to_mp4")
 
     def start_mkv_to_mp4(self):
-        self.get_files_and_run(self.run_convert_video, 
-                               [("MKV Files", "*.mkv")], [("MP4 Files", "*.mp4")], ".mp4", 
-                               vcodec='libx264', acodec='copy')
+        self.get_files_and_run("mkv_to_mp4")
 
     def start_mp4_to_mkv(self):
-        self.get_files_and_run(self.run_convert_video, 
-                               [("MP4 Files", "*.mp4")], [("MKV Files", "*.mkv")], ".mkv", 
-                               vcodec='copy', acodec='copy')
+        self.get_files_and_run("mp4_to_mkv")
 
     def start_wav_to_mp3(self):
-        self.get_files_and_run(self.run_convert_audio, 
-                               [("WAV Files", "*.wav")], [("MP3 Files", "*.mp3")], ".mp3", 
-                               acodec='libmp3lame', audio_bitrate='192k')
+        self.get_files_and_run("wav_to_mp3")
 
     def start_mp3_to_wav(self):
-        self.get_files_and_run(self.run_convert_audio, 
-                               [("MP3 Files", "*.mp3")], [("WAV Files", "*.wav")], ".wav")
+        self.get_files_and_run("mp3_to_wav")
 
     def start_m4a_to_mp3(self):
-        self.get_files_and_run(self.run_convert_audio, 
-                               [("M4A Files", "*.m4a")], [("MP3 Files", "*.mp3")], ".mp3", 
-                               acodec='libmp3lame', audio_bitrate='192k')
+        self.get_files_and_run("m4a_to_mp3")
 
     def start_mp3_to_m4a(self):
-        self.get_files_and_run(self.run_convert_audio, 
-                               [("MP3 Files", "*.mp3")], [("M4A Files", "*.m4a")], ".m4a", 
-                               acodec='aac')
+        self.get_files_and_run("mp3_to_m4a")
 
     def start_video_to_audio(self):
-        self.get_files_and_run(self.run_extract_audio, 
-                               [("Video Files", "*.mp4;*.avi;*.mkv")], [("MP3 Files", "*.mp3")], ".mp3")
+        self.get_files_and_run("video_to_audio")
+
+    def start_video_to_native_audio(self):
+        self.get_files_and_run(NATIVE_AUDIO)
 
 
     # --- Core Conversion Functions (Threaded) ---
 
-    def run_convert_video(self, input_file, output_file, **kwargs):
+    def run_convert_video(self, input_file, output_file, preset_name, job_id=None, segment_parallel=False,
+                          profile=None):
         """(THREAD) Runs the video conversion."""
-        try:
-            import ffmpeg
-            stream = ffmpeg.input(input_file)
-            stream = ffmpeg.output(stream, output_file, **kwargs)
-            ffmpeg.run(stream, overwrite_output=True, quiet=True) 
-            
-            if self.is_closing: return
-            self.update_status_safe("Conversion Successful!", style="success")
-        except ImportError:
-             self.update_status_safe(FFMPEG_ERROR_MESSAGE, style="danger")
-        except Exception as e:
-            if self.is_closing: return
-            self.update_status_safe(f"Error: {e}", style="danger")
-        finally:
-            if not self.is_closing:
-                self.after(0, self.stop_feedback_safe)
+        self.run_conversion_job(input_file, output_file, preset_name, SUCCESS_MESSAGES["video"], job_id,
+                                segment_parallel=segment_parallel, profile=profile)
 
-    def run_convert_audio(self, input_file, output_file, **kwargs):
+    def run_convert_audio(self, input_file, output_file, preset_name, job_id=None, profile=None):
         """(THREAD) Runs the audio conversion."""
-        try:
-            import ffmpeg
-            stream = ffmpeg.input(input_file)
-            stream = ffmpeg.output(stream, output_file, **kwargs)
-            ffmpeg.run(stream, overwrite_output=True, quiet=True)
-            
-            if self.is_closing: return
-            self.update_status_safe("Conversion Successful!", style="success")
-        except ImportError:
-             self.update_status_safe(FFMPEG_ERROR_MESSAGE, style="danger")
-        except Exception as e:
-            if self.is_closing: return
-            self.update_status_safe(f"Error: {e}", style="danger")
-        finally:
-            if not self.is_closing:
-                self.after(0, self.stop_feedback_safe)
+        self.run_conversion_job(input_file, output_file, preset_name, SUCCESS_MESSAGES["audio"], job_id,
+                                profile=profile)
 
-    def run_extract_audio(self, input_file, output_file, **kwargs):
+    def run_extract_audio(self, input_file, output_file, preset_name, job_id=None, profile=None):
         """(THREAD) Runs the audio extraction."""
+        self.run_conversion_job(input_file, output_file, preset_name, SUCCESS_MESSAGES["extract"], job_id,
+                                profile=profile)
+
+    def run_conversion_job(self, input_file, output_file, preset_name, success_message, job_id=None,
+                           segment_parallel=False, profile=None):
+        """(THREAD) Runs a single ffmpeg job, journals it and reports the result."""
+        journal = get_journal() if job_id is not None else None
+        record = get_metrics().start_job(KIND_CONVERT, input_file)
+        record.profile = profile
         try:
-            import ffmpeg
-            stream = ffmpeg.input(input_file)
-            stream = ffmpeg.output(stream, output_file, 
-                                   vn=None, acodec='libmp3lame', audio_bitrate='192k', 
-                                   **kwargs)
-            ffmpeg.run(stream, overwrite_output=True, quiet=True)
-            
+            if journal: journal.mark_running(job_id)
+            record.start()
+            result = convert_file(preset_name, input_file, output_file, on_progress=self.show_progress_safe,
+                                  segment_parallel=segment_parallel, profile=profile)
+            if journal: journal.mark_done(job_id, result=output_file)
+            finish_conversion_record(record, JOB_DONE, input_file, output_file, result)
+
+            if self.is_closing: return
+            note = describe_conversion(result)
+            self.update_status_safe(f"{success_message} ({note})" if note else success_message, style="success")
+        except ImportError as e:
+            # Marked failed so the journal doesn't offer to resume it on every start
+            if journal: journal.mark_failed(job_id, e)
+            finish_conversion_record(record, JOB_FAILED, input_file, output_file, error=e)
             if self.is_closing: return
-            self.update_status_safe("Audio Extraction Successful!", style="success")
-        except ImportError:
-             self.update_status_safe(FFMPEG_ERROR_MESSAGE, style="danger")
+            self.update_status_safe(FFMPEG_ERROR_MESSAGE, style="danger")
         except Exception as e:
+            if journal: journal.mark_failed(job_id, e)
+            finish_conversion_record(record, JOB_FAILED, input_file, output_file, error=e)
             if self.is_closing: return
             self.update_status_safe(f"Error: {e}", style="danger")
         finally:
             if not self.is_closing:
-                self.after(0, self.stop_feedback_safe)
+                self.dispatcher.post((self, "feedback"), self.stop_feedback_safe)
 
     # --- Window Closing Methods ---
 
@@ -354,6 +530,7 @@ class FileConverter(ttk.Toplevel):
     def close_window(self):
         """Safely closes the window."""
         self.is_closing = True 
+        self.dispatcher.discard(self)
         self.destroy() 
 
     def exit_app(self):
@@ -361,6 +538,829 @@ class FileConverter(ttk.Toplevel):
         self.is_closing = True 
         self.main_app.exit_app()
 
+class BatchConversionWindow(AppWindowMixin, ttk.Toplevel):
+    """
+    Toplevel window for converting a whole folder (or glob) with one preset
+    on a bounded pool of ffmpeg processes.
+    """
+    def __init__(self, converter, resume_jobs=None, resume_profile=None):
+        super().__init__(converter)
+        self.converter = converter
+        self.title("Batch Conversion")
+
+        self.geometry("600x640")
+        self.center_window(600, 640)
+        self.resizable(False, False)
+
+        self.is_closing = False
+        self.dispatcher = converter.dispatcher
+        self.batch = None
+        self.row_ids = []
+        self.preset_names = {preset["label"]: name for name, preset in PRESETS.items()}
+        self.preset_names[NATIVE_AUDIO_LABEL] = NATIVE_AUDIO
+
+        self.set_app_icon()
+        self.create_widgets()
+        self.protocol("WM_DELETE_WINDOW", self.close_window)
+        self.bind("<Destroy>", self.on_destroy)
+
+        if resume_jobs:
+            self.start_jobs(resume_jobs, f"Resuming {len(resume_jobs)} unfinished jobs", resume_profile)
+
+    def create_widgets(self):
+        """Creates and places all widgets in the batch window."""
+        main_frame = ttk.Frame(self, padding="20")
+        main_frame.pack(expand=True, fill="both")
+
+        # --- Batch Settings ---
+        settings_frame = ttk.Labelframe(main_frame, text="Batch Settings", padding=10)
+        settings_frame.pack(pady=5, fill="x")
+
+        ttk.Label(settings_frame, text="Preset:").grid(row=0, column=0, padx=5, pady=5, sticky="w")
+        self.preset_var = ttk.StringVar(value=PRESETS["mkv_to_mp4"]["label"])
+        preset_box = ttk.Combobox(settings_frame, textvariable=self.preset_var, state="readonly",
+                                  values=list(self.preset_names))
+        preset_box.grid(row=0, column=1, columnspan=2, padx=5, pady=5, sticky="ew")
+        preset_box.bind("<<ComboboxSelected>>", self.on_preset_selected)
+
+        ttk.Label(settings_frame, text="Source folder:").grid(row=1, column=0, padx=5, pady=5, sticky="w")
+        self.source_entry = ttk.Entry(settings_frame)
+        self.source_entry.grid(row=1, column=1, padx=5, pady=5, sticky="ew")
+        (ttk.Button(settings_frame, text="Browse", command=self.browse_source, bootstyle="secondary-outline")
+            .grid(row=1, column=2, padx=5, pady=5))
+
+        ttk.Label(settings_frame, text="File pattern:").grid(row=2, column=0, padx=5, pady=5, sticky="w")
+        self.pattern_entry = ttk.Entry(settings_frame)
+        self.pattern_entry.grid(row=2, column=1, padx=5, pady=5, sticky="ew")
+        self.recursive_var = ttk.BooleanVar(value=False)
+        (ttk.Checkbutton(settings_frame, text="Subfolders", variable=self.recursive_var)
+            .grid(row=2, column=2, padx=5, pady=5))
+
+        ttk.Label(settings_frame, text="Output folder:").grid(row=3, column=0, padx=5, pady=5, sticky="w")
+        self.output_entry = ttk.Entry(settings_frame)
+        self.output_entry.grid(row=3, column=1, padx=5, pady=5, sticky="ew")
+        (ttk.Button(settings_frame, text="Browse", command=self.browse_output, bootstyle="secondary-outline")
+            .grid(row=3, column=2, padx=5, pady=5))
+
+        ttk.Label(settings_frame, text="Parallel jobs:").grid(row=4, column=0, padx=5, pady=5, sticky="w")
+        self.workers_var = ttk.IntVar(value=default_worker_count())
+        (ttk.Spinbox(settings_frame, from_=1, to=default_worker_count() * 2, width=5,
+                     textvariable=self.workers_var)
+            .grid(row=4, column=1, padx=5, pady=5, sticky="w"))
+
+        settings_frame.grid_columnconfigure(1, weight=1)
+        self.on_preset_selected()
+
+        # --- Per-File Status ---
+        list_frame = ttk.Frame(main_frame)
+        list_frame.pack(pady=5, fill="both", expand=True)
+
+        self.job_tree = ttk.Treeview(list_frame, columns=("file", "status"), show="headings", height=10)
+        self.job_tree.heading("file", text="File")
+        self.job_tree.heading("status", text="Status")
+        self.job_tree.column("file", width=360)
+        self.job_tree.column("status", width=160)
+        self.job_tree.pack(side="left", fill="both", expand=True)
+
+        scrollbar = ttk.Scrollbar(list_frame, orient="vertical", command=self.job_tree.yview)
+        scrollbar.pack(side="right", fill="y")
+        self.job_tree.configure(yscrollcommand=scrollbar.set)
+
+        # --- Aggregate Progress ---
+        self.progress_bar = ttk.Progressbar(main_frame, orient='horizontal', 
+                                            mode='determinate', 
+                                            bootstyle="success-striped")
+        self.progress_bar.pack(pady=5, fill="x")
+
+        self.summary_label = ttk.Label(main_frame, text="Select a folder to convert.", anchor="center")
+        self.summary_label.pack(pady=5, fill="x")
+
+        # --- Action Buttons ---
+        button_frame = ttk.Frame(main_frame)
+        button_frame.pack(pady=5, fill="x")
+
+        self.start_button = ttk.Button(button_frame, text="Start Batch", command=self.start_batch,
+                                       bootstyle="primary")
+        self.start_button.pack(side="left", expand=True, padx=5)
+
+        self.cancel_button = ttk.Button(button_frame, text="Cancel Batch", command=self.cancel_batch,
+                                        bootstyle="danger-outline", state="disabled")
+        self.cancel_button.pack(side="left", expand=True, padx=5)
+
+        (ttk.Button(button_frame, text="Close", command=self.close_window, bootstyle="secondary-outline")
+            .pack(side="left", expand=True, padx=5))
+
+    def on_preset_selected(self, event=None):
+        """Fills in the file pattern of the selected preset."""
+        preset_name = self.preset_names[self.preset_var.get()]
+        self.pattern_entry.delete(0, "end")
+        self.pattern_entry.insert(0, get_preset_pattern(preset_name))
+
+    def browse_source(self):
+        """Asks for the folder holding the input files."""
+        folder = filedialog.askdirectory(title="Select Source Folder", parent=self)
+        if folder:
+            self.source_entry.delete(0, "end")
+            self.source_entry.insert(0, folder)
+            if not self.output_entry.get():
+                self.output_entry.insert(0, folder)
+
+    def browse_output(self):
+        """Asks for the folder receiving the converted files."""
+        folder = filedialog.askdirectory(title="Select Output Folder", parent=self)
+        if folder:
+            self.output_entry.delete(0, "end")
+            self.output_entry.insert(0, folder)
+
+    def set_summary(self, message, style="info"):
+        """Updates the summary label (main thread only)."""
+        self.summary_label.config(text=message, bootstyle=style)
+
+    def run_on_ui(self, name, func, *args):
+        """
+        Schedules func on the Tk main thread, from any thread. Only the newest
+        pending update of each name is applied.
+        """
+        if self.is_closing:
+            return
+        self.dispatcher.post((self, name), func, *args)
+
+    def start_batch(self):
+        """Collects the matching files and starts the batch."""
+        if self.batch is not None:
+            return
+
+        source_folder = self.source_entry.get().strip()
+        output_folder = self.output_entry.get().strip()
+        if not os.path.isdir(source_folder):
+            self.set_summary("Please select a valid source folder.", "danger")
+            return
+        if not output_folder:
+            self.set_summary("Please select an output folder.", "danger")
+            return
+
+        preset_name = self.preset_names[self.preset_var.get()]
+        input_files = collect_batch_files(source_folder, self.pattern_entry.get(), self.recursive_var.get())
+        if not input_files:
+            self.set_summary("No matching files found.", "warning")
+            return
+
+        jobs = plan_batch_jobs(preset_name, input_files, source_folder, output_folder)
+        self.start_jobs(jobs, f"Converting {len(jobs)} files", self.converter.selected_profile())
+
+    def start_jobs(self, jobs, message, profile=None):
+        """Fills the job list and starts converting (preset, input, output) jobs with an encoder profile."""
+        self.job_tree.delete(*self.job_tree.get_children())
+        self.row_ids = [
+            self.job_tree.insert("", "end", values=(os.path.basename(input_file), STATUS_QUEUED))
+            for _, input_file, _ in jobs
+        ]
+        self.progress_bar.config(maximum=100, value=0, bootstyle="success-striped")
+
+        try:
+            workers = int(self.workers_var.get())
+        except (ValueError, TclError):
+            workers = default_worker_count()
+
+        self.batch = BatchConverter(jobs, max_workers=workers, journal=get_journal(), metrics=get_metrics(),
+                                    on_status=self.on_job_status,
+                                    on_progress=self.on_batch_progress,
+                                    on_finished=self.on_batch_finished, profile=profile)
+        self.set_summary(f"{message} with {self.batch.max_workers} parallel jobs...")
+        self.start_button.config(state="disabled")
+        self.cancel_button.config(state="normal")
+        self.batch.start()
+
+    def cancel_batch(self):
+        """Cancels the running batch."""
+        if self.batch is not None:
+            self.batch.cancel()
+            self.set_summary("Cancelling batch...", "warning")
+
+    # --- Batch Callbacks (called from worker threads) ---
+
+    def on_job_status(self, index, status, message):
+        """(WORKER) Shows the status of one file."""
+        text = f"{status}: {message}" if message else status
+        self.run_on_ui(("row", index), self.set_row_status, index, text)
+
+    def set_row_status(self, index, text):
+        """Updates one row of the job list (main thread only)."""
+        row_id = self.row_ids[index]
+        self.job_tree.set(row_id, "status", text)
+
+    def on_batch_progress(self, completed, total, failed, percent):
+        """(WORKER) Shows the aggregate batch progress."""
+        self.run_on_ui("progress", self.show_progress, completed, total, failed, percent)
+
+    def show_progress(self, completed, total, failed, percent):
+        """Updates the aggregate progress widgets (main thread only)."""
+        self.progress_bar['value'] = percent
+        self.set_summary(f"Converted {completed} / {total} files | Failed: {failed} | Total: {percent:.1f}%")
+
+    def on_batch_finished(self, completed, failed, cancelled):
+        """(WORKER) Called once every job of the batch has ended."""
+        self.run_on_ui("finished", self.show_finished, completed, failed, cancelled)
+
+    def show_finished(self, completed, failed, cancelled):
+        """Resets the buttons once the batch has ended (main thread only)."""
+        self.batch = None
+        self.start_button.config(state="normal")
+        self.cancel_button.config(state="disabled")
+        if cancelled:
+            self.set_summary(f"Batch cancelled after {completed} files | Failed: {failed}", "warning")
+        elif failed:
+            self.progress_bar.config(bootstyle="danger-striped")
+            self.set_summary(f"Batch finished: {completed - failed} converted, {failed} failed", "danger")
+        else:
+            self.set_summary(f"Batch finished: {completed} files converted!", "success")
+        if not self.converter.is_closing:
+            self.converter.refresh_resume_button()
+
+    # --- Window Closing Methods ---
+
+    def on_destroy(self, event):
+        """Stops the batch if the window is destroyed with its parent."""
+        if event.widget is self:
+            self.is_closing = True
+            self.dispatcher.discard(self)
+            if self.batch is not None:
+                self.batch.cancel()
+
+    def close_window(self):
+        """Cancels any running batch and closes the window."""
+        self.is_closing = True
+        if self.batch is not None:
+            self.batch.cancel()
+        self.dispatcher.discard(self)
+        self.destroy()
+
+class AudioAnalysisWindow(AppWindowMixin, ttk.Toplevel):
+    """
+    Toplevel window showing the waveform overview, peak/RMS levels and
+    silent spans of a file (see audio_analysis).
+    """
+    CANVAS_WIDTH = 560
+    CANVAS_HEIGHT = 180
+
+    def __init__(self, converter, input_file):
+        super().__init__(converter)
+        self.converter = converter
+        self.input_file = input_file
+        self.title(f"Audio Analysis - {os.path.basename(input_file)}")
+
+        self.geometry("620x470")
+        self.center_window(620, 470)
+        self.resizable(False, False)
+
+        self.is_closing = False
+        self.dispatcher = converter.dispatcher
+        self.cancel_event = threading.Event()
+
+        self.set_app_icon()
+        self.create_widgets()
+        self.protocol("WM_DELETE_WINDOW", self.close_window)
+        self.bind("<Destroy>", self.on_destroy)
+        threading.Thread(target=self.run_analysis, daemon=True).start()
+
+    def create_widgets(self):
+        """Creates and places all widgets in the analysis window."""
+        main_frame = ttk.Frame(self, padding="20")
+        main_frame.pack(expand=True, fill="both")
+
+        colors = ttk.Style().colors
+        self.canvas = ttk.Canvas(main_frame, width=self.CANVAS_WIDTH, height=self.CANVAS_HEIGHT,
+                                 background=colors.inputbg, highlightthickness=1,
+                                 highlightbackground=colors.border)
+        self.canvas.pack(pady=5)
+
+        self.progress_bar = ttk.Progressbar(main_frame, orient='horizontal', mode='indeterminate',
+                                            bootstyle="info-striped")
+        self.progress_bar.pack(pady=5, fill="x")
+        self.progress_bar.start(10)
+
+        self.summary_label = ttk.Label(main_frame, text="Analyzing...", anchor="center", wraplength=560)
+        self.summary_label.pack(pady=5, fill="x")
+
+        self.silence_list = ttk.Treeview(main_frame, columns=("start", "end", "length"), show="headings",
+                                         height=5)
+        for column, heading in (("start", "Silence from"), ("end", "to"), ("length", "Length")):
+            self.silence_list.heading(column, text=heading)
+            self.silence_list.column(column, width=180, anchor="center")
+        self.silence_list.pack(pady=5, fill="x")
+
+        (ttk.Button(main_frame, text="Close", command=self.close_window, bootstyle="secondary-outline")
+            .pack(pady=5))
+
+    def run_analysis(self):
+        """(THREAD) Analyzes the file (or loads the cached result) and shows it."""
+        try:
+            result = analyze_audio(self.input_file, self.cancel_event, on_progress=self.on_progress)
+            self.run_on_ui("result", self.show_result, result)
+        except AnalysisCancelled:
+            pass
+        except Exception as e:
+            self.run_on_ui("result", self.show_error, str(e))
+
+    def run_on_ui(self, name, func, *args):
+        """Schedules func on the Tk main thread, from any thread (newest update of each name wins)."""
+        if self.is_closing:
+            return
+        self.dispatcher.post((self, name), func, *args)
+
+    def on_progress(self, fraction):
+        """(THREAD) Shows how much of the file has been decoded."""
+        self.run_on_ui("progress", self.show_progress, fraction)
+
+    def show_progress(self, fraction):
+        """Updates the progress bar (main thread only)."""
+        if str(self.progress_bar.cget('mode')) != 'determinate':
+            self.progress_bar.stop()
+            self.progress_bar.config(mode='determinate', maximum=100)
+        self.progress_bar['value'] = fraction * 100
+
+    def show_result(self, result):
+        """Draws the waveform and silences and lists the levels (main thread only)."""
+        self.progress_bar.stop()
+        self.progress_bar.config(mode='determinate', value=100)
+        self.summary_label.config(text=format_analysis(result), bootstyle="success")
+        self.draw_waveform(result)
+        for start, end in result["silences"]:
+            self.silence_list.insert("", "end", values=(format_eta(start), format_eta(end), f"{end - start:.1f}s"))
+
+    def show_error(self, message):
+        """Shows why the analysis failed (main thread only)."""
+        self.progress_bar.stop()
+        self.progress_bar.config(mode='determinate', value=0)
+        self.summary_label.config(text=f"Error: {message}", bootstyle="danger")
+
+    def draw_waveform(self, result):
+        """Draws the min/max overview, one vertical line per pixel, over shaded silent spans."""
+        colors = ttk.Style().colors
+        width, height = self.CANVAS_WIDTH, self.CANVAS_HEIGHT
+        middle = height / 2
+        duration = result["duration"] or 1
+        for start, end in result["silences"]:
+            self.canvas.create_rectangle(start / duration * width, 0, end / duration * width, height,
+                                         fill=colors.warning, outline="", stipple="gray25")
+        self.canvas.create_line(0, middle, width, middle, fill=colors.border)
+
+        waveform = result["waveform"]
+        if not waveform:
+            return
+        for x in range(width):
+            first = x * len(waveform) // width
+            last = max(first + 1, (x + 1) * len(waveform) // width)
+            low = min(point[0] for point in waveform[first:last])
+            high = max(point[1] for point in waveform[first:last])
+            # At least one pixel tall, so quiet passages stay visible
+            self.canvas.create_line(x, middle - high * middle, x, middle - low * middle + 1, fill=colors.primary)
+
+    # --- Window Closing Methods ---
+
+    def on_destroy(self, event):
+        """Stops the analysis if the window is destroyed with its parent."""
+        if event.widget is self:
+            self.is_closing = True
+            self.dispatcher.discard(self)
+            self.cancel_event.set()
+
+    def close_window(self):
+        """Cancels a running analysis and closes the window."""
+        self.is_closing = True
+        self.cancel_event.set()
+        self.dispatcher.discard(self)
+        self.destroy()
+
+class MultiOutputWindow(AppWindowMixin, ttk.Toplevel):
+    """
+    Toplevel window for converting one file to several outputs at once
+    (e.g. MP3 + WAV + M4A, or 1080p + 720p MP4) with a single ffmpeg decode.
+    """
+    def __init__(self, converter):
+        super().__init__(converter)
+        self.converter = converter
+        self.title("Multi-Output Conversion")
+
+        self.geometry("500x520")
+        self.center_window(500, 520)
+        self.resizable(False, False)
+
+        self.is_closing = False
+        self.dispatcher = converter.dispatcher
+        self.cancel_event = None
+
+        self.set_app_icon()
+        self.create_widgets()
+        self.protocol("WM_DELETE_WINDOW", self.close_window)
+        self.bind("<Destroy>", self.on_destroy)
+
+    def create_widgets(self):
+        """Creates and places all widgets in the multi-output window."""
+        main_frame = ttk.Frame(self, padding="20")
+        main_frame.pack(expand=True, fill="both")
+
+        # --- Source and Destination ---
+        files_frame = ttk.Labelframe(main_frame, text="Files", padding=10)
+        files_frame.pack(pady=5, fill="x")
+
+        ttk.Label(files_frame, text="Source file:").grid(row=0, column=0, padx=5, pady=5, sticky="w")
+        self.source_entry = ttk.Entry(files_frame)
+        self.source_entry.grid(row=0, column=1, padx=5, pady=5, sticky="ew")
+        (ttk.Button(files_frame, text="Browse", command=self.browse_source, bootstyle="secondary-outline")
+            .grid(row=0, column=2, padx=5, pady=5))
+
+        ttk.Label(files_frame, text="Output folder:").grid(row=1, column=0, padx=5, pady=5, sticky="w")
+        self.output_entry = ttk.Entry(files_frame)
+        self.output_entry.grid(row=1, column=1, padx=5, pady=5, sticky="ew")
+        (ttk.Button(files_frame, text="Browse", command=self.browse_output, bootstyle="secondary-outline")
+            .grid(row=1, column=2, padx=5, pady=5))
+
+        files_frame.grid_columnconfigure(1, weight=1)
+
+        # --- Outputs ---
+        targets_frame = ttk.Labelframe(main_frame, text="Outputs", padding=10)
+        targets_frame.pack(pady=5, fill="x")
+
+        self.target_vars = {}
+        for index, (name, target) in enumerate(MULTI_OUTPUT_TARGETS.items()):
+            self.target_vars[name] = ttk.BooleanVar(value=name in ("mp3", "wav", "m4a"))
+            (ttk.Checkbutton(targets_frame, text=target["label"], variable=self.target_vars[name])
+                .grid(row=index // 2, column=index % 2, padx=5, pady=3, sticky="w"))
+
+        targets_frame.grid_columnconfigure(0, weight=1)
+        targets_frame.grid_columnconfigure(1, weight=1)
+
+        # --- Feedback Widgets ---
+        self.progress_bar = ttk.Progressbar(main_frame, orient='horizontal',
+                                            mode='determinate',
+                                            bootstyle="success-striped")
+        self.progress_bar.pack(pady=5, fill="x")
+
+        self.summary_label = ttk.Label(main_frame, text="Select a file and its outputs.", anchor="center",
+                                       wraplength=440)
+        self.summary_label.pack(pady=5, fill="x")
+
+        # --- Action Buttons ---
+        button_frame = ttk.Frame(main_frame)
+        button_frame.pack(pady=5, fill="x")
+
+        self.start_button = ttk.Button(button_frame, text="Convert", command=self.start_conversion,
+                                       bootstyle="primary")
+        self.start_button.pack(side="left", expand=True, padx=5)
+
+        self.cancel_button = ttk.Button(button_frame, text="Cancel", command=self.cancel_conversion,
+                                        bootstyle="danger-outline", state="disabled")
+        self.cancel_button.pack(side="left", expand=True, padx=5)
+
+        (ttk.Button(button_frame, text="Close", command=self.close_window, bootstyle="secondary-outline")
+            .pack(side="left", expand=True, padx=5))
+
+    def browse_source(self):
+        """Asks for the file to convert."""
+        input_file = filedialog.askopenfilename(title="Select Source File", parent=self,
+                                                filetypes=[("Media Files", "*.mp4;*.mkv;*.mov;*.webm;*.avi;"
+                                                            "*.wav;*.mp3;*.m4a;*.flac")])
+        if input_file:
+            self.source_entry.delete(0, "end")
+            self.source_entry.insert(0, input_file)
+            if not self.output_entry.get():
+                self.output_entry.insert(0, os.path.dirname(input_file))
+
+    def browse_output(self):
+        """Asks for the folder receiving the outputs."""
+        folder = filedialog.askdirectory(title="Select Output Folder", parent=self)
+        if folder:
+            self.output_entry.delete(0, "end")
+            self.output_entry.insert(0, folder)
+
+    def set_summary(self, message, style="info"):
+        """Updates the summary label (main thread only)."""
+        self.summary_label.config(text=message, bootstyle=style)
+
+    def run_on_ui(self, name, func, *args):
+        """Schedules func on the Tk main thread, from any thread (newest update of each name wins)."""
+        if self.is_closing:
+            return
+        self.dispatcher.post((self, name), func, *args)
+
+    def start_conversion(self):
+        """Plans the outputs and starts the single-decode conversion."""
+        if self.cancel_event is not None:
+            return
+
+        input_file = self.source_entry.get().strip()
+        output_folder = self.output_entry.get().strip()
+        target_names = [name for name, var in self.target_vars.items() if var.get()]
+        if not os.path.isfile(input_file):
+            self.set_summary("Please select a valid source file.", "danger")
+            return
+        if not output_folder:
+            self.set_summary("Please select an output folder.", "danger")
+            return
+        if not target_names:
+            self.set_summary("Please select at least one output.", "warning")
+            return
+
+        self.start_job(input_file, output_folder, target_names, self.converter.selected_profile())
+
+    def start_job(self, input_file, output_folder, target_names, profile=None):
+        """Journals the conversion and runs it in a background thread (also used to resume one)."""
+        self.source_entry.delete(0, "end")
+        self.source_entry.insert(0, input_file)
+        self.output_entry.delete(0, "end")
+        self.output_entry.insert(0, output_folder)
+        for name, var in self.target_vars.items():
+            var.set(name in target_names)
+
+        outputs = plan_multi_outputs(input_file, target_names, output_folder)
+        job_id = get_journal().add_job(KIND_CONVERT, input_file, output_folder,
+                                       multi_journal_options(target_names, profile))
+        self.cancel_event = threading.Event()
+        self.progress_bar.config(value=0, bootstyle="success-striped")
+        self.set_summary(f"Converting '{os.path.basename(input_file)}' to {len(outputs)} outputs...")
+        self.start_button.config(state="disabled")
+        self.cancel_button.config(state="normal")
+        threading.Thread(target=self.run_conversion, args=(input_file, outputs, self.cancel_event, profile, job_id),
+                         daemon=True).start()
+
+    def cancel_conversion(self):
+        """Stops the running conversion."""
+        if self.cancel_event is not None:
+            self.cancel_event.set()
+            self.set_summary("Cancelling...", "warning")
+
+    def run_conversion(self, input_file, outputs, cancel_event, profile=None, job_id=None):
+        """(THREAD) Runs the conversion, journals it and reports the result."""
+        journal = get_journal() if job_id is not None else None
+        record = get_metrics().start_job(KIND_CONVERT, input_file)
+        record.profile = profile
+        try:
+            if journal: journal.mark_running(job_id)
+            os.makedirs(os.path.dirname(outputs[0][1]) or ".", exist_ok=True)
+            record.start()
+            result = convert_multi(input_file, outputs, cancel_event, on_progress=self.on_progress, profile=profile)
+            if journal: journal.mark_done(job_id, result=outputs[-1][1])
+            record.finish(JOB_DONE, bytes_in=file_size(input_file),
+                          bytes_out=sum(file_size(output_file) or 0 for _, output_file in outputs),
+                          media_seconds=result["duration"], child_cpu_seconds=result["cpu_seconds"])
+            notes = [f"{os.path.basename(output_file)}: {describe_conversion(output_result) or 'encoded'}"
+                     for output_file, output_result in result["outputs"].items()]
+            self.run_on_ui("finished", self.show_finished, "\n".join(["Done!"] + notes), "success")
+        except ConversionCancelled:
+            if journal: journal.mark_cancelled(job_id)
+            record.finish(JOB_CANCELLED)
+            self.run_on_ui("finished", self.show_finished, "Conversion cancelled.", "warning")
+        except Exception as e:
+            if journal: journal.mark_failed(job_id, e)
+            record.finish(JOB_FAILED, bytes_in=file_size(input_file), error=e)
+            self.run_on_ui("finished", self.show_finished, f"Error: {e}", "danger")
+
+    def on_progress(self, progress):
+        """(THREAD) Shows ffmpeg's progress of the shared run."""
+        self.run_on_ui("progress", self.show_progress, progress)
+
+    def show_progress(self, progress):
+        """Updates the progress widgets (main thread only)."""
+        if progress["percent"] is not None:
+            self.progress_bar['value'] = progress["percent"]
+        self.set_summary(format_progress(progress))
+
+    def show_finished(self, message, style):
+        """Resets the buttons once the conversion has ended (main thread only)."""
+        self.cancel_event = None
+        self.progress_bar['value'] = 100 if style == "success" else 0
+        self.start_button.config(state="normal")
+        self.cancel_button.config(state="disabled")
+        self.set_summary(message, style)
+        self.converter.refresh_cache_stats()
+        if not self.converter.is_closing:
+            self.converter.refresh_resume_button()
+
+    # --- Window Closing Methods ---
+
+    def on_destroy(self, event):
+        """Stops the conversion if the window is destroyed with its parent."""
+        if event.widget is self:
+            self.is_closing = True
+            self.dispatcher.discard(self)
+            if self.cancel_event is not None:
+                self.cancel_event.set()
+
+    def close_window(self):
+        """Cancels any running conversion and closes the window."""
+        self.is_closing = True
+        if self.cancel_event is not None:
+            self.cancel_event.set()
+        self.dispatcher.discard(self)
+        self.destroy()
+
+class WatchFolderWindow(AppWindowMixin, ttk.Toplevel):
+    """
+    Toplevel window for watching a folder: every file dropped into it is
+    converted with one preset once it has finished copying.
+    """
+    def __init__(self, converter):
+        super().__init__(converter)
+        self.converter = converter
+        self.title("Watch Folder")
+
+        self.geometry("600x620")
+        self.center_window(600, 620)
+        self.resizable(False, False)
+
+        self.is_closing = False
+        self.dispatcher = converter.dispatcher
+        self.watcher = None
+        self.row_ids = {} # Input path -> job list row
+        self.preset_names = {preset["label"]: name for name, preset in PRESETS.items()}
+        self.preset_names[NATIVE_AUDIO_LABEL] = NATIVE_AUDIO
+
+        self.set_app_icon()
+        self.create_widgets()
+        self.protocol("WM_DELETE_WINDOW", self.close_window)
+        self.bind("<Destroy>", self.on_destroy)
+
+    def create_widgets(self):
+        """Creates and places all widgets in the watch folder window."""
+        main_frame = ttk.Frame(self, padding="20")
+        main_frame.pack(expand=True, fill="both")
+
+        # --- Watch Settings ---
+        settings_frame = ttk.Labelframe(main_frame, text="Watch Settings", padding=10)
+        settings_frame.pack(pady=5, fill="x")
+
+        ttk.Label(settings_frame, text="Preset:").grid(row=0, column=0, padx=5, pady=5, sticky="w")
+        self.preset_var = ttk.StringVar(value=PRESETS["mkv_to_mp4"]["label"])
+        (ttk.Combobox(settings_frame, textvariable=self.preset_var, state="readonly",
+                      values=list(self.preset_names))
+            .grid(row=0, column=1, columnspan=2, padx=5, pady=5, sticky="ew"))
+
+        ttk.Label(settings_frame, text="Watch folder:").grid(row=1, column=0, padx=5, pady=5, sticky="w")
+        self.source_entry = ttk.Entry(settings_frame)
+        self.source_entry.grid(row=1, column=1, padx=5, pady=5, sticky="ew")
+        (ttk.Button(settings_frame, text="Browse", command=self.browse_source, bootstyle="secondary-outline")
+            .grid(row=1, column=2, padx=5, pady=5))
+
+        ttk.Label(settings_frame, text="Output folder:").grid(row=2, column=0, padx=5, pady=5, sticky="w")
+        self.output_entry = ttk.Entry(settings_frame)
+        self.output_entry.grid(row=2, column=1, padx=5, pady=5, sticky="ew")
+        (ttk.Button(settings_frame, text="Browse", command=self.browse_output, bootstyle="secondary-outline")
+            .grid(row=2, column=2, padx=5, pady=5))
+
+        ttk.Label(settings_frame, text="Parallel jobs:").grid(row=3, column=0, padx=5, pady=5, sticky="w")
+        self.workers_var = ttk.IntVar(value=max(1, default_worker_count() // 2))
+        (ttk.Spinbox(settings_frame, from_=1, to=default_worker_count() * 2, width=5,
+                     textvariable=self.workers_var)
+            .grid(row=3, column=1, padx=5, pady=5, sticky="w"))
+        self.recursive_var = ttk.BooleanVar(value=False)
+        (ttk.Checkbutton(settings_frame, text="Subfolders", variable=self.recursive_var)
+            .grid(row=3, column=2, padx=5, pady=5))
+
+        settings_frame.grid_columnconfigure(1, weight=1)
+
+        # --- Per-File Status ---
+        list_frame = ttk.Frame(main_frame)
+        list_frame.pack(pady=5, fill="both", expand=True)
+
+        self.job_tree = ttk.Treeview(list_frame, columns=("file", "status"), show="headings", height=10)
+        self.job_tree.heading("file", text="File")
+        self.job_tree.heading("status", text="Status")
+        self.job_tree.column("file", width=360)
+        self.job_tree.column("status", width=160)
+        self.job_tree.pack(side="left", fill="both", expand=True)
+
+        scrollbar = ttk.Scrollbar(list_frame, orient="vertical", command=self.job_tree.yview)
+        scrollbar.pack(side="right", fill="y")
+        self.job_tree.configure(yscrollcommand=scrollbar.set)
+
+        self.summary_label = ttk.Label(main_frame, text="Select a folder to watch.", anchor="center",
+                                       wraplength=540)
+        self.summary_label.pack(pady=5, fill="x")
+
+        # --- Action Buttons ---
+        button_frame = ttk.Frame(main_frame)
+        button_frame.pack(pady=5, fill="x")
+
+        self.start_button = ttk.Button(button_frame, text="Start Watching", command=self.start_watching,
+                                       bootstyle="primary")
+        self.start_button.pack(side="left", expand=True, padx=5)
+
+        self.stop_button = ttk.Button(button_frame, text="Stop Watching", command=self.stop_watching,
+                                      bootstyle="danger-outline", state="disabled")
+        self.stop_button.pack(side="left", expand=True, padx=5)
+
+        (ttk.Button(button_frame, text="Close", command=self.close_window, bootstyle="secondary-outline")
+            .pack(side="left", expand=True, padx=5))
+
+    def browse_source(self):
+        """Asks for the folder to watch."""
+        folder = filedialog.askdirectory(title="Select Watch Folder", parent=self)
+        if folder:
+            self.source_entry.delete(0, "end")
+            self.source_entry.insert(0, folder)
+            if not self.output_entry.get():
+                self.output_entry.insert(0, folder)
+
+    def browse_output(self):
+        """Asks for the folder receiving the converted files."""
+        folder = filedialog.askdirectory(title="Select Output Folder", parent=self)
+        if folder:
+            self.output_entry.delete(0, "end")
+            self.output_entry.insert(0, folder)
+
+    def set_summary(self, message, style="info"):
+        """Updates the summary label (main thread only)."""
+        self.summary_label.config(text=message, bootstyle=style)
+
+    def run_on_ui(self, name, func, *args):
+        """Schedules func on the Tk main thread, from any thread (newest update of each name wins)."""
+        if self.is_closing:
+            return
+        self.dispatcher.post((self, name), func, *args)
+
+    def start_watching(self):
+        """Starts converting files dropped into the folder."""
+        if self.watcher is not None:
+            return
+
+        source_folder = self.source_entry.get().strip()
+        output_folder = self.output_entry.get().strip() or source_folder
+        if not os.path.isdir(source_folder):
+            self.set_summary("Please select a valid folder to watch.", "danger")
+            return
+
+        try:
+            workers = int(self.workers_var.get())
+        except (ValueError, TclError):
+            workers = default_worker_count()
+
+        self.job_tree.delete(*self.job_tree.get_children())
+        self.row_ids = {}
+        self.watcher = FolderWatcher(source_folder, self.preset_names[self.preset_var.get()], output_folder,
+                                     self.recursive_var.get(), workers, self.converter.selected_profile(),
+                                     on_event=self.on_file_event)
+        self.watcher.start()
+        self.start_button.config(state="disabled")
+        self.stop_button.config(state="normal")
+        self.show_counts()
+
+    def stop_watching(self):
+        """Stops the watcher; files it was converting are picked up again next time."""
+        if self.watcher is None:
+            return
+        self.watcher.stop()
+        self.watcher = None
+        self.start_button.config(state="normal")
+        self.stop_button.config(state="disabled")
+        self.set_summary("Stopped watching.", "warning")
+
+    # --- Watcher Callbacks (called from worker threads) ---
+
+    def on_file_event(self, path, status, message):
+        """(WORKER) Shows the status of one file and the running totals."""
+        text = f"{status}: {message}" if message else status
+        self.run_on_ui(("row", path), self.set_row_status, path, text)
+        if status != STATUS_RUNNING:
+            self.run_on_ui("counts", self.show_counts)
+
+    def set_row_status(self, path, text):
+        """Updates (or adds) the row of one file (main thread only)."""
+        row_id = self.row_ids.get(path)
+        if row_id is None:
+            row_id = self.row_ids[path] = self.job_tree.insert("", "end", values=(os.path.basename(path), text))
+            self.job_tree.see(row_id)
+        else:
+            self.job_tree.set(row_id, "status", text)
+
+    def show_counts(self):
+        """Shows what the watcher has done so far (main thread only)."""
+        watcher = self.watcher
+        if watcher is None:
+            return
+        counts = watcher.counts
+        self.set_summary(f"Watching ({watcher.mode()}) | Converted: {counts[STATUS_DONE]} | "
+                         f"Skipped: {counts[STATUS_SKIPPED]} | Failed: {counts[STATUS_FAILED]}",
+                         "danger" if counts[STATUS_FAILED] else "info")
+
+    # --- Window Closing Methods ---
+
+    def on_destroy(self, event):
+        """Stops the watcher if the window is destroyed with its parent."""
+        if event.widget is self:
+            self.is_closing = True
+            self.dispatcher.discard(self)
+            if self.watcher is not None:
+                self.watcher.stop()
+
+    def close_window(self):
+        """Stops watching and closes the window."""
+        self.is_closing = True
+        if self.watcher is not None:
+            self.watcher.stop()
+        self.dispatcher.discard(self)
+        self.destroy()
+
 if __name__ == "__main__":
     print("ERROR: This file cannot be run directly.")
     print("Please run 'main.py' instead.")
\ No newline at end of file
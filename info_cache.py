@@ -0,0 +1,166 @@
+import copy
+import time
+import threading
+from collections import OrderedDict
+
+# --- URL Info Cache ---
+# yt-dlp's info extraction (the extractor round trip that lists a video's
+# formats) is done once per URL and kept in memory, so the resolution list,
+# retries, Video/Audio switches and repeated queue items reuse it. Entries
+# expire after a while because the format URLs YouTube hands out expire too.
+
+INFO_TTL_SECONDS = 30 * 60
+MAX_INFO_ENTRIES = 256
+SIZE_RESOLUTIONS = (("1080p", 1080), ("720p", 720), ("480p", 480))
+
+
+def extract_info(url, cookie_file=None):
+    """Runs yt-dlp's extractor for url without downloading or selecting formats."""
+    import yt_dlp
+    ydl_opts = {'quiet': True, 'no_warnings': True}
+    if cookie_file:
+        ydl_opts['cookiefile'] = cookie_file
+    with yt_dlp.YoutubeDL(ydl_opts) as ydl:
+        return ydl.extract_info(url, download=False, process=False)
+
+
+def is_single_video(info):
+    """True for a resolved single video (playlists and redirects are not cached)."""
+    return info.get("_type", "video") == "video" and bool(info.get("formats"))
+
+
+class InfoCache:
+    """
+    Thread-safe TTL/LRU cache of extracted video info, keyed by URL and cookie file.
+    Concurrent resolves of the same URL share a single extraction.
+    """
+    def __init__(self, ttl=INFO_TTL_SECONDS, max_entries=MAX_INFO_ENTRIES):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.entries = OrderedDict() # (url, cookie_file) -> (expires, info)
+        self.inflight = {} # (url, cookie_file) -> Event set when the extraction ends
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, url, cookie_file=None):
+        """Returns a copy of the cached info of url, or None."""
+        with self.lock:
+            info = self._get((url, cookie_file))
+        return copy.deepcopy(info) if info is not None else None
+
+    def resolve(self, url, cookie_file=None):
+        """Returns a copy of the info of url, extracting it if it isn't cached."""
+        key = (url, cookie_file)
+        while True:
+            with self.lock:
+                info = self._get(key)
+                if info is not None:
+                    self.hits += 1
+                    return copy.deepcopy(info)
+                event = self.inflight.get(key)
+                if event is None:
+                    event = self.inflight[key] = threading.Event()
+                    self.misses += 1
+                    break
+            event.wait() # Another thread is extracting the same URL
+
+        try:
+            info = extract_info(url, cookie_file)
+            if is_single_video(info):
+                self.put(url, cookie_file, info)
+            return copy.deepcopy(info)
+        finally:
+            with self.lock:
+                del self.inflight[key]
+            event.set()
+
+    def put(self, url, cookie_file, info):
+        """Caches the info of url."""
+        with self.lock:
+            self.entries[(url, cookie_file)] = (time.monotonic() + self.ttl, info)
+            self.entries.move_to_end((url, cookie_file))
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+
+    def invalidate(self, url, cookie_file=None):
+        """Drops the cached info of url (e.g. after its format URLs expired)."""
+        with self.lock:
+            self.entries.pop((url, cookie_file), None)
+
+    def _get(self, key):
+        """Returns the unexpired cached info of key (lock must be held)."""
+        entry = self.entries.get(key)
+        if entry is None:
+            return None
+        if entry[0] < time.monotonic():
+            del self.entries[key]
+            return None
+        self.entries.move_to_end(key)
+        return entry[1]
+
+
+# --- Format Summary ---
+
+def _format_size(fmt, duration):
+    """Returns the (estimated) size of one format in bytes, or None."""
+    size = fmt.get("filesize") or fmt.get("filesize_approx")
+    if not size and duration and fmt.get("tbr"):
+        size = fmt["tbr"] * 1000 / 8 * duration
+    return size
+
+
+def estimate_sizes(info):
+    """
+    Returns [(label, size in bytes or None)] for the downloader's resolution
+    choices available in info, plus the best audio-only format.
+    """
+    formats = info.get("formats") or []
+    duration = info.get("duration")
+
+    audio_formats = [f for f in formats if f.get("vcodec") == "none" and f.get("acodec") not in (None, "none")]
+    best_audio = max(audio_formats, key=lambda f: f.get("abr") or f.get("tbr") or 0, default=None)
+    audio_size = _format_size(best_audio, duration) if best_audio else None
+
+    video_formats = [f for f in formats if f.get("vcodec") not in (None, "none") and f.get("height")]
+    sizes = []
+    for label, limit in (("Best", None),) + SIZE_RESOLUTIONS:
+        candidates = [f for f in video_formats if limit is None or f["height"] <= limit]
+        if not candidates:
+            continue
+        best = max(candidates, key=lambda f: (f["height"], f.get("ext") == "mp4", f.get("tbr") or 0))
+        size = _format_size(best, duration)
+        if size and best.get("acodec") in (None, "none") and audio_size:
+            size += audio_size # Video-only format: the audio track is merged in
+        if limit is None:
+            label = f"Best ({best['height']}p)"
+        elif best["height"] < limit:
+            continue # Same file as a lower choice
+        sizes.append((label, size))
+
+    if best_audio:
+        sizes.append(("Audio", audio_size))
+    return sizes
+
+
+def describe_formats(info):
+    """Formats the available resolutions and sizes of info for a status label."""
+    parts = []
+    for label, size in estimate_sizes(info):
+        parts.append(f"{label} ~{size / 1024 ** 2:.0f} MB" if size else f"{label} (size unknown)")
+    return " | ".join(parts) if parts else "No downloadable formats found"
+
+
+# --- Shared Instance ---
+
+_info_cache = None
+_info_cache_lock = threading.Lock()
+
+
+def get_info_cache():
+    """Returns the shared URL info cache."""
+    global _info_cache
+    with _info_cache_lock:
+        if _info_cache is None:
+            _info_cache = InfoCache()
+        return _info_cache
@@ -0,0 +1,156 @@
+import os
+import json
+import time
+import sqlite3
+import threading
+
+from app_config import data_path
+
+# --- Job Journal ---
+# On-disk (SQLite) record of every conversion and download job, so an
+# interrupted batch can be resumed after the app is closed or crashes.
+
+JOURNAL_FILE = "jobs.sqlite3"
+
+KIND_CONVERT = "convert"
+KIND_DOWNLOAD = "download"
+
+JOB_QUEUED = "queued"
+JOB_RUNNING = "running"
+JOB_DONE = "done"
+JOB_FAILED = "failed"
+JOB_CANCELLED = "cancelled"
+
+UNFINISHED_STATES = (JOB_QUEUED, JOB_RUNNING)
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    kind TEXT NOT NULL,
+    status TEXT NOT NULL,
+    input TEXT NOT NULL,
+    output TEXT NOT NULL,
+    options TEXT NOT NULL,
+    result TEXT,
+    error TEXT,
+    created REAL NOT NULL,
+    updated REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS jobs_key ON jobs (kind, input, output, options);
+CREATE INDEX IF NOT EXISTS jobs_status ON jobs (kind, status);
+"""
+
+
+def encode_options(options):
+    """Serializes job options into a stable JSON string (used as part of the job key)."""
+    return json.dumps(options, sort_keys=True)
+
+
+class JobJournal:
+    """
+    Thread-safe SQLite journal of queued, running and finished jobs.
+    Every status change is committed immediately (WAL mode), so the
+    journal reflects the last known state even after a crash.
+    """
+    def __init__(self, path=None):
+        self.path = path or data_path(JOURNAL_FILE)
+        self.lock = threading.Lock()
+        self.conn = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None)
+        self.conn.row_factory = sqlite3.Row
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.executescript(_SCHEMA)
+
+    def add_job(self, kind, input_path, output_path, options):
+        """
+        Records a queued job and returns its id.
+        An unfinished job with the same key is reused instead of duplicated.
+        """
+        encoded = encode_options(options)
+        now = time.time()
+        with self.lock:
+            row = self.conn.execute(
+                "SELECT id FROM jobs WHERE kind=? AND input=? AND output=? AND options=? "
+                "AND status IN (?, ?) ORDER BY id DESC LIMIT 1",
+                (kind, input_path, output_path, encoded) + UNFINISHED_STATES).fetchone()
+            if row:
+                return row["id"]
+            cursor = self.conn.execute(
+                "INSERT INTO jobs (kind, status, input, output, options, created, updated) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (kind, JOB_QUEUED, input_path, output_path, encoded, now, now))
+            return cursor.lastrowid
+
+    def set_status(self, job_id, status, error=None, result=None):
+        """Updates the status of a job (and optionally its error or result path)."""
+        with self.lock:
+            self.conn.execute(
+                "UPDATE jobs SET status=?, error=COALESCE(?, error), result=COALESCE(?, result), updated=? "
+                "WHERE id=?",
+                (status, error, result, time.time(), job_id))
+
+    def mark_running(self, job_id):
+        self.set_status(job_id, JOB_RUNNING)
+
+    def mark_done(self, job_id, result=None):
+        self.set_status(job_id, JOB_DONE, result=result)
+
+    def mark_failed(self, job_id, error):
+        self.set_status(job_id, JOB_FAILED, error=str(error))
+
+    def mark_cancelled(self, job_id):
+        self.set_status(job_id, JOB_CANCELLED)
+
+    def find_completed(self, kind, input_path, output_path, options):
+        """
+        Returns the finished job with the same key whose result file still
+        exists, or None if the work has to be done (again). Jobs without a
+        result file (playlist syncs) never count as completed.
+        """
+        with self.lock:
+            rows = self.conn.execute(
+                "SELECT * FROM jobs WHERE kind=? AND input=? AND output=? AND options=? AND status=? "
+                "ORDER BY id DESC",
+                (kind, input_path, output_path, encode_options(options), JOB_DONE)).fetchall()
+        for row in rows:
+            if row["result"] and os.path.exists(row["result"]):
+                return row
+        return None
+
+    def unfinished(self, kind):
+        """Returns the queued or interrupted jobs of one kind, oldest first."""
+        with self.lock:
+            return self.conn.execute(
+                "SELECT * FROM jobs WHERE kind=? AND status IN (?, ?) ORDER BY id",
+                (kind,) + UNFINISHED_STATES).fetchall()
+
+    def recover(self):
+        """
+        Requeues jobs that were running when the app last stopped.
+        Their half-written files are in the scratch folder (see scratch.py), so
+        whatever is at an output path is a complete file and is left alone;
+        partial downloads stay there so yt-dlp can continue them.
+        """
+        with self.lock:
+            rows = self.conn.execute("SELECT id FROM jobs WHERE status=?", (JOB_RUNNING,)).fetchall()
+        for row in rows:
+            self.set_status(row["id"], JOB_QUEUED)
+        return len(rows)
+
+
+# --- Shared Instance ---
+
+_journal = None
+_journal_lock = threading.Lock()
+
+
+def get_journal():
+    """Returns the shared journal, recovering interrupted jobs on first use."""
+    global _journal
+    with _journal_lock:
+        if _journal is None:
+            _journal = JobJournal()
+            recovered = _journal.recover()
+            if recovered:
+                print(f"Journal: {recovered} interrupted job(s) requeued.")
+        return _journal
@@ -0,0 +1,241 @@
+import os
+import json
+import time
+import threading
+
+from app_config import data_path
+from job_journal import KIND_DOWNLOAD, JOB_DONE, JOB_FAILED, JOB_CANCELLED
+
+# --- Job Metrics ---
+# Every conversion and download writes one structured record (queue wait,
+# wall/CPU time, bytes in/out and resumed, speed, retries) to a rotating JSONL log, and
+# running totals to a Prometheus text-format file. Point a node exporter's
+# textfile collector at the metrics folder (or set JOHNNY_BRAVO_METRICS_DIR
+# to its --collector.textfile.directory) to scrape throughput per machine.
+# The GUI, the job server and a watch folder can run side by side, so each
+# mode keeps its own log and textfile (jobs_serve.jsonl, johnny_bravo_serve.prom)
+# and labels its samples with mode="serve"; no process rewrites or rotates
+# another one's files.
+
+METRICS_DIR_NAME = "metrics"
+METRICS_DIR_ENV = "JOHNNY_BRAVO_METRICS_DIR" # Optional: where the .prom file is written
+JSONL_FILE = "jobs_{mode}.jsonl"
+JSONL_MAX_BYTES = 5 * 1024 ** 2
+JSONL_BACKUPS = 3
+TEXTFILE_NAME = "johnny_bravo_{mode}.prom"
+
+MODE_GUI = "gui"
+MODE_SERVE = "serve"
+MODE_WATCH = "watch"
+
+# Job outcomes recorded in the metrics (journal states plus skipped)
+JOB_SKIPPED = "skipped"
+RESULT_STATES = (JOB_DONE, JOB_FAILED, JOB_CANCELLED, JOB_SKIPPED)
+
+SPEED_SAMPLE_INTERVAL = 1.0 # Seconds between recorded download speed samples
+MAX_SPEED_SAMPLES = 600
+
+# Prometheus metrics written to the textfile: (name, type, help)
+PROMETHEUS_METRICS = (
+    ("johnny_bravo_jobs_total", "counter", "Finished jobs by kind and status."),
+    ("johnny_bravo_job_wall_seconds_total", "counter", "Wall time spent running jobs."),
+    ("johnny_bravo_job_cpu_seconds_total", "counter", "CPU time used by jobs (including ffmpeg)."),
+    ("johnny_bravo_job_queue_wait_seconds_total", "counter", "Time jobs waited in the queue before starting."),
+    ("johnny_bravo_job_bytes_in_total", "counter", "Bytes read (conversions) or downloaded (downloads)."),
+    ("johnny_bravo_job_bytes_out_total", "counter", "Bytes of finished output files."),
+    ("johnny_bravo_job_bytes_resumed_total", "counter",
+     "Bytes reused from partial downloads instead of downloaded again."),
+    ("johnny_bravo_job_retries_total", "counter", "Retries made by jobs."),
+    ("johnny_bravo_job_last_speed", "gauge",
+     "Speed of the last finished job: x realtime for conversions, bytes/s for downloads."),
+    ("johnny_bravo_job_last_finished_timestamp_seconds", "gauge", "Unix time the last job finished."),
+)
+
+
+def file_size(path):
+    """Returns the size of a file, or None if it doesn't exist."""
+    try:
+        return os.path.getsize(path) if path else None
+    except OSError:
+        return None
+
+
+def _format_value(value):
+    """Formats a sample value without losing precision on large byte counts."""
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(round(value, 6))
+
+
+class JobRecord:
+    """Collects the measurements of one job; call start() when it leaves the queue and finish() at the end."""
+    def __init__(self, sink, kind, name, queued_at=None):
+        self.sink = sink
+        self.kind = kind
+        self.name = name
+        self.queued_at = queued_at or time.time()
+        self.started_at = None
+        self.started_perf = None
+        self.started_cpu = None
+        self.retries = 0
+        self.profile = None # Encoder profile of a conversion (see encoder_profiles)
+        self.speed_samples = [] # [seconds since start, bytes/s]
+        self.last_sample = 0.0
+
+    def start(self):
+        """(WORKER) Marks the job as running; must be called from the thread that runs it."""
+        self.started_at = time.time()
+        self.started_perf = time.perf_counter()
+        self.started_cpu = time.thread_time()
+
+    def sample_speed(self, bytes_per_second):
+        """Records the current download speed, at most once per SPEED_SAMPLE_INTERVAL."""
+        if self.started_perf is None or not bytes_per_second:
+            return
+        elapsed = time.perf_counter() - self.started_perf
+        if elapsed - self.last_sample < SPEED_SAMPLE_INTERVAL or len(self.speed_samples) >= MAX_SPEED_SAMPLES:
+            return
+        self.last_sample = elapsed
+        self.speed_samples.append([round(elapsed, 1), round(bytes_per_second)])
+
+    def finish(self, status, bytes_in=None, bytes_out=None, media_seconds=None, child_cpu_seconds=None,
+               bytes_resumed=None, error=None):
+        """
+        (WORKER) Completes the record and writes it to the metrics log.
+        media_seconds (conversions) gives the encode speed in x realtime;
+        child_cpu_seconds is CPU used by helper processes (ffmpeg) on top of this thread's;
+        bytes_resumed (downloads) is what partial files saved from being downloaded again.
+        """
+        finished_at = time.time()
+        if self.started_at is None: # Cancelled or skipped before it ran
+            wall = cpu = 0.0
+            queue_wait = finished_at - self.queued_at
+        else:
+            wall = time.perf_counter() - self.started_perf
+            cpu = time.thread_time() - self.started_cpu + (child_cpu_seconds or 0.0)
+            queue_wait = self.started_at - self.queued_at
+
+        speed = None
+        if wall > 0 and media_seconds:
+            speed = round(media_seconds / wall, 3)
+        elif wall > 0 and bytes_in and self.kind == KIND_DOWNLOAD:
+            speed = round(bytes_in / wall)
+
+        entry = {
+            "kind": self.kind,
+            "name": self.name,
+            "status": status,
+            "queued_at": self.queued_at,
+            "finished_at": finished_at,
+            "queue_wait_seconds": round(queue_wait, 3),
+            "wall_seconds": round(wall, 3),
+            "cpu_seconds": round(cpu, 3),
+            "bytes_in": bytes_in,
+            "bytes_out": bytes_out,
+            "bytes_resumed": bytes_resumed,
+            "speed": speed,
+            "retries": self.retries,
+            "profile": self.profile,
+            "speed_samples": self.speed_samples,
+            "error": str(error) if error else None,
+        }
+        self.sink.record(entry)
+        return entry
+
+
+class MetricsLog:
+    """Thread-safe writer of job records (rotating JSONL) and Prometheus totals (textfile)."""
+    def __init__(self, metrics_dir=None, textfile_dir=None, mode=MODE_GUI):
+        self.mode = mode
+        self.metrics_dir = metrics_dir or data_path(METRICS_DIR_NAME)
+        os.makedirs(self.metrics_dir, exist_ok=True)
+        self.jsonl_path = os.path.join(self.metrics_dir, JSONL_FILE.format(mode=mode))
+        self.textfile_path = os.path.join(textfile_dir or os.environ.get(METRICS_DIR_ENV) or self.metrics_dir,
+                                          TEXTFILE_NAME.format(mode=mode))
+        self.lock = threading.Lock()
+        self.totals = {} # (metric name, (("kind", ...), ...)) -> value
+
+    def start_job(self, kind, name, queued_at=None):
+        """Returns a new JobRecord that reports to this log."""
+        return JobRecord(self, kind, name, queued_at)
+
+    def record(self, entry):
+        """Appends a finished job to the JSONL log and updates the Prometheus file."""
+        try:
+            with self.lock:
+                self._append_jsonl(entry)
+                self._add_totals(entry)
+                self._write_textfile()
+        except OSError as e:
+            print(f"Metrics error: {e}")
+
+    def _append_jsonl(self, entry):
+        """Writes one JSON line, rotating the log once it exceeds JSONL_MAX_BYTES (lock must be held)."""
+        if os.path.exists(self.jsonl_path) and os.path.getsize(self.jsonl_path) >= JSONL_MAX_BYTES:
+            for index in range(JSONL_BACKUPS - 1, 0, -1):
+                older = f"{self.jsonl_path}.{index}"
+                if os.path.exists(older):
+                    os.replace(older, f"{self.jsonl_path}.{index + 1}")
+            os.replace(self.jsonl_path, f"{self.jsonl_path}.1")
+        with open(self.jsonl_path, "a", encoding="utf-8") as f:
+            f.write(json.dumps(entry) + "\n")
+
+    def _add_totals(self, entry):
+        """Adds a finished job to the running Prometheus totals (lock must be held)."""
+        kind = (("kind", entry["kind"]), ("mode", self.mode))
+        counters = (
+            ("johnny_bravo_jobs_total", kind + (("status", entry["status"]),), 1),
+            ("johnny_bravo_job_wall_seconds_total", kind, entry["wall_seconds"]),
+            ("johnny_bravo_job_cpu_seconds_total", kind, entry["cpu_seconds"]),
+            ("johnny_bravo_job_queue_wait_seconds_total", kind, entry["queue_wait_seconds"]),
+            ("johnny_bravo_job_bytes_in_total", kind, entry["bytes_in"] or 0),
+            ("johnny_bravo_job_bytes_out_total", kind, entry["bytes_out"] or 0),
+            ("johnny_bravo_job_bytes_resumed_total", kind, entry["bytes_resumed"] or 0),
+            ("johnny_bravo_job_retries_total", kind, entry["retries"]),
+        )
+        for name, labels, value in counters:
+            self.totals[(name, labels)] = self.totals.get((name, labels), 0) + value
+        if entry["speed"] is not None:
+            self.totals[("johnny_bravo_job_last_speed", kind)] = entry["speed"]
+        self.totals[("johnny_bravo_job_last_finished_timestamp_seconds", kind)] = entry["finished_at"]
+
+    def _write_textfile(self):
+        """Atomically rewrites the Prometheus textfile (lock must be held)."""
+        lines = []
+        for name, metric_type, help_text in PROMETHEUS_METRICS:
+            samples = sorted((labels, value) for (metric, labels), value in self.totals.items() if metric == name)
+            if not samples:
+                continue
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} {metric_type}")
+            for labels, value in samples:
+                label_text = ",".join(f'{key}="{label}"' for key, label in labels)
+                lines.append(f"{name}{{{label_text}}} {_format_value(value)}")
+
+        temp_path = self.textfile_path + ".tmp" # The collector must never read a half-written file
+        with open(temp_path, "w", encoding="utf-8") as f:
+            f.write("\n".join(lines) + "\n")
+        os.replace(temp_path, self.textfile_path)
+
+
+# --- Shared Instance ---
+
+_metrics = None
+_metrics_mode = MODE_GUI
+_metrics_lock = threading.Lock()
+
+
+def set_metrics_mode(mode):
+    """Names the files (and mode label) of this process's metrics; call before the first job."""
+    global _metrics_mode
+    with _metrics_lock:
+        _metrics_mode = mode
+
+
+def get_metrics():
+    """Returns the shared metrics log."""
+    global _metrics
+    with _metrics_lock:
+        if _metrics is None:
+            _metrics = MetricsLog(mode=_metrics_mode)
+        return _metrics
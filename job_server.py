@@ -0,0 +1,538 @@
+import os
+import hmac
+import json
+import time
+import secrets
+import ipaddress
+import itertools
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+from app_config import SERVER_HOST, SERVER_PORT, SERVER_TOKEN_ENV, data_path
+from converter_core import (
+    PRESETS, NATIVE_AUDIO, NATIVE_AUDIO_LABEL, BatchConverter, default_worker_count, resolve_preset,
+    STATUS_RUNNING, STATUS_DONE, STATUS_FAILED, STATUS_CANCELLED, STATUS_SKIPPED,
+)
+from downloader_core import (
+    DownloadQueue, ITEM_DOWNLOADING, ITEM_PROCESSING, ITEM_RETRYING, ITEM_DONE, ITEM_SKIPPED, ITEM_FAILED,
+    ITEM_CANCELLED,
+)
+from job_journal import (
+    get_journal, KIND_CONVERT, KIND_DOWNLOAD, JOB_QUEUED, JOB_RUNNING, JOB_DONE, JOB_FAILED, JOB_CANCELLED,
+)
+from job_metrics import get_metrics, JOB_SKIPPED
+from bandwidth import get_bandwidth_scheduler, parse_rate
+from encoder_profiles import PROFILES, get_default_profile
+
+# --- Headless Job Server ---
+# Local HTTP/JSON API for render boxes and scripts (started with
+# "python main.py --serve"). Jobs run on a shared worker pool through the same
+# BatchConverter / DownloadQueue code as the GUI, so they are journaled,
+# measured and skipped when already done exactly like GUI jobs.
+#
+#   GET  /health                    -> {"status": "ok"}
+#   GET  /presets                   -> conversion presets
+#   GET  /jobs                      -> all jobs
+#   POST /jobs/convert              {"preset", "input", "output"?, "profile"?}
+#                                   (preset "video_to_native_audio" copies the audio out in its own format)
+#   POST /jobs/download             {"url", "output_dir", "type"?, "resolution"?, "playlist"?,
+#                                    "stream"?, "cookie_file"?}
+#   GET  /jobs/<id>                 -> one job
+#   GET  /jobs/<id>/events          -> Server-Sent Events with the job on every change
+#   POST /jobs/<id>/cancel          (or DELETE /jobs/<id>)
+#
+# Every request needs "Authorization: Bearer <token>"; the token is generated
+# on first start and saved in the app data folder (server_token.txt). POST
+# bodies must be sent as application/json and the Host header must name the
+# address the server listens on, so web pages can neither post "simple"
+# cross-site requests nor reach the API through DNS rebinding. Without a
+# token (--no-token) the server only listens on loopback addresses.
+
+EVENT_KEEPALIVE_SECONDS = 15
+TOKEN_FILE = "server_token.txt"
+MAX_FINISHED_JOBS = 500 # Older finished jobs are dropped from /jobs (the journal keeps them)
+LOOPBACK_NAMES = ("localhost", "127.0.0.1", "[::1]")
+
+FINAL_STATES = (JOB_DONE, JOB_FAILED, JOB_CANCELLED, JOB_SKIPPED)
+
+# Batch/queue item states -> job states
+CONVERT_STATES = {
+    STATUS_RUNNING: JOB_RUNNING, STATUS_DONE: JOB_DONE, STATUS_FAILED: JOB_FAILED,
+    STATUS_CANCELLED: JOB_CANCELLED, STATUS_SKIPPED: JOB_SKIPPED,
+}
+DOWNLOAD_STATES = {
+    ITEM_DOWNLOADING: JOB_RUNNING, ITEM_PROCESSING: JOB_RUNNING, ITEM_RETRYING: JOB_RUNNING,
+    ITEM_DONE: JOB_DONE, ITEM_SKIPPED: JOB_SKIPPED, ITEM_FAILED: JOB_FAILED, ITEM_CANCELLED: JOB_CANCELLED,
+}
+
+
+class JobRequestError(Exception):
+    """Raised for invalid job requests; reported to the client as HTTP 400."""
+
+
+class ServerJob:
+    """State of one submitted job, as reported by the API."""
+    def __init__(self, job_id, kind, params):
+        self.id = job_id
+        self.kind = kind
+        self.params = params
+        self.status = JOB_QUEUED
+        self.message = ""
+        self.percent = None
+        self.speed = None
+        self.eta = None
+        self.result = None
+        self.created = time.time()
+        self.updated = self.created
+        self.version = 0 # Increases on every change, for the event stream
+        self.runner = None # BatchConverter or DownloadQueue while running
+
+    def to_dict(self):
+        return {
+            "id": self.id,
+            "kind": self.kind,
+            "params": self.params,
+            "status": self.status,
+            "message": self.message,
+            "percent": self.percent,
+            "speed": self.speed,
+            "eta": self.eta,
+            "result": self.result,
+            "created": self.created,
+            "updated": self.updated,
+        }
+
+
+class JobServer:
+    """Accepts jobs, runs them on a shared worker pool and tracks their state."""
+    def __init__(self, max_workers=None):
+        self.max_workers = max_workers or default_worker_count()
+        # Each conversion is a one-job batch; together they share the CPUs instead of each using all of them
+        self.threads = max(1, default_worker_count() // self.max_workers)
+        self.pool = ThreadPoolExecutor(max_workers=self.max_workers)
+        self.jobs = OrderedDict()
+        self.ids = itertools.count(1)
+        self.lock = threading.Lock()
+        self.changed = threading.Condition(self.lock)
+
+    # --- Submitting ---
+
+    def submit_conversion(self, params):
+        """Validates and queues a conversion job."""
+        preset_name = params.get("preset")
+        input_file = params.get("input")
+        profile = params.get("profile") or get_default_profile()
+        if preset_name not in PRESETS and preset_name != NATIVE_AUDIO:
+            raise JobRequestError(f"Unknown preset '{preset_name}'")
+        if profile not in PROFILES:
+            raise JobRequestError(f"Unknown profile '{profile}' (use one of {', '.join(PROFILES)})")
+        if not input_file or not os.path.isfile(input_file):
+            raise JobRequestError(f"Input file not found: '{input_file}'")
+        preset_name = resolve_preset(preset_name, input_file)
+        output_file = params.get("output") or os.path.splitext(input_file)[0] + PRESETS[preset_name]["save_ext"]
+        if os.path.abspath(output_file) == os.path.abspath(input_file):
+            raise JobRequestError("Output file must differ from the input file")
+        return self._submit(KIND_CONVERT, {"preset": preset_name, "input": input_file, "output": output_file,
+                                           "profile": profile})
+
+    def submit_download(self, params):
+        """Validates and queues a download job."""
+        if not params.get("url"):
+            raise JobRequestError("Missing 'url'")
+        if not params.get("output_dir"):
+            raise JobRequestError("Missing 'output_dir'")
+        download_type = params.get("type", "video")
+        if download_type not in ("video", "audio"):
+            raise JobRequestError("'type' must be 'video' or 'audio'")
+        item = {
+            "url": params["url"],
+            "output_dir": params["output_dir"],
+            "type": download_type,
+            "resolution": str(params.get("resolution", "best")) if download_type == "video" else None,
+            "playlist": bool(params.get("playlist", False)),
+            "stream": bool(params.get("stream", True)),
+            "cookie_file": params.get("cookie_file"),
+        }
+        return self._submit(KIND_DOWNLOAD, item)
+
+    def _submit(self, kind, params):
+        """Registers a job and hands it to the worker pool."""
+        with self.lock:
+            job = ServerJob(next(self.ids), kind, params)
+            self.jobs[job.id] = job
+            self._prune()
+        self.pool.submit(self.run_job, job)
+        return job
+
+    def _prune(self):
+        """Forgets the oldest finished jobs beyond MAX_FINISHED_JOBS (lock must be held)."""
+        finished = [job_id for job_id, job in self.jobs.items() if job.status in FINAL_STATES]
+        for job_id in finished[:max(0, len(finished) - MAX_FINISHED_JOBS)]:
+            del self.jobs[job_id]
+
+    # --- Queries and Cancelling ---
+
+    def get(self, job_id):
+        with self.lock:
+            return self.jobs.get(job_id)
+
+    def snapshot(self, job):
+        """Returns a consistent copy of a job's state and its version."""
+        with self.lock:
+            return job.to_dict(), job.version
+
+    def list_jobs(self):
+        with self.lock:
+            return [job.to_dict() for job in self.jobs.values()]
+
+    def cancel(self, job):
+        """Cancels a queued or running job."""
+        with self.lock:
+            runner = job.runner
+            if job.status == JOB_QUEUED and runner is None:
+                self._set(job, status=JOB_CANCELLED)
+                return
+        if runner is not None:
+            runner.cancel()
+
+    def cancel_all(self, keep_resumable=True):
+        """Cancels every running job (used on shutdown); downloads stay resumable in the journal."""
+        with self.lock:
+            runners = [job.runner for job in self.jobs.values() if job.runner is not None]
+        for runner in runners:
+            if isinstance(runner, DownloadQueue):
+                runner.cancel(keep_resumable=keep_resumable)
+            else:
+                runner.cancel()
+
+    def wait_for_change(self, job, version, timeout):
+        """Blocks until the job changes after version, or timeout seconds pass."""
+        with self.changed:
+            self.changed.wait_for(lambda: job.version != version, timeout)
+
+    def update(self, job, **fields):
+        """Changes fields of a job and wakes up event streams."""
+        with self.lock:
+            self._set(job, **fields)
+
+    def _set(self, job, **fields):
+        """Changes fields of a job (lock must be held)."""
+        for name, value in fields.items():
+            setattr(job, name, value)
+        job.updated = time.time()
+        job.version += 1
+        self.changed.notify_all()
+
+    # --- Running ---
+
+    def run_job(self, job):
+        """(WORKER) Runs one job through a single-item BatchConverter or DownloadQueue."""
+        with self.lock:
+            if job.status != JOB_QUEUED:
+                return # Cancelled while queued
+            job.runner = self._make_runner(job)
+            self._set(job, status=JOB_RUNNING)
+        try:
+            job.runner.run()
+        except Exception as e:
+            self.update(job, status=JOB_FAILED, message=str(e))
+        finally:
+            with self.lock:
+                job.runner = None
+
+    def _make_runner(self, job):
+        """Builds the GUI's batch/queue runner for a job, with callbacks that update it."""
+        if job.kind == KIND_CONVERT:
+            params = job.params
+            return BatchConverter(
+                [(params["preset"], params["input"], params["output"])], max_workers=1,
+                journal=get_journal(), metrics=get_metrics(),
+                on_status=lambda index, status, message: self._convert_status(job, status, message),
+                on_progress=lambda completed, total, failed, percent: self.update(job, percent=percent),
+                profile=params["profile"], threads=self.threads)
+
+        item = dict(job.params)
+        cookie_file = item.pop("cookie_file")
+        return DownloadQueue(
+            [item], max_workers=1, cookie_file=cookie_file, journal=get_journal(), metrics=get_metrics(),
+            on_status=lambda index, status, message: self._download_status(job, status, message),
+            on_progress=lambda index, d: self._download_progress(job, d))
+
+    def _convert_status(self, job, status, message):
+        """(WORKER) Maps a BatchConverter status to the job."""
+        fields = {"status": CONVERT_STATES.get(status, JOB_RUNNING), "message": message}
+        if status in (STATUS_DONE, STATUS_SKIPPED):
+            fields.update(percent=100.0, result=job.params["output"])
+        self.update(job, **fields)
+
+    def _download_status(self, job, status, message):
+        """(WORKER) Maps a DownloadQueue status to the job."""
+        fields = {"status": DOWNLOAD_STATES.get(status, JOB_RUNNING), "message": status}
+        if status in (ITEM_DONE, ITEM_SKIPPED):
+            fields.update(percent=100.0, result=message, speed=None, eta=None)
+        elif status == ITEM_FAILED:
+            fields["message"] = message
+        elif status == ITEM_RETRYING:
+            fields["message"] = f"{status} {message}"
+        self.update(job, **fields)
+
+    def _download_progress(self, job, d):
+        """(WORKER) Copies yt-dlp progress into the job."""
+        if d.get("status") != "downloading":
+            return
+        total = d.get("total_bytes") or d.get("total_bytes_estimate")
+        percent = (d.get("downloaded_bytes") or 0) / total * 100 if total else None
+        self.update(job, percent=percent, speed=d.get("speed"), eta=d.get("eta"))
+
+    def shutdown(self):
+        """Cancels running jobs and stops the worker pool."""
+        self.cancel_all()
+        self.pool.shutdown(wait=False, cancel_futures=True)
+
+
+# --- HTTP API ---
+
+class JobRequestHandler(BaseHTTPRequestHandler):
+    """JSON API over a JobServer (self.server.job_server)."""
+    server_version = "JohnnyBravoJobServer/1.0"
+
+    def do_GET(self):
+        if not self.check_request():
+            return
+        parts = self.path_parts()
+        if parts == ["health"]:
+            self.send_json({"status": "ok"})
+        elif parts == ["presets"]:
+            presets = {name: {"label": preset["label"], "kind": preset["kind"], "save_ext": preset["save_ext"]}
+                       for name, preset in PRESETS.items()}
+            presets[NATIVE_AUDIO] = {"label": NATIVE_AUDIO_LABEL, "kind": "extract", "save_ext": None}
+            self.send_json(presets)
+        elif parts == ["jobs"]:
+            self.send_json(self.server.job_server.list_jobs())
+        elif len(parts) == 2 and parts[0] == "jobs":
+            job = self.find_job(parts[1])
+            if job:
+                self.send_json(self.server.job_server.snapshot(job)[0])
+        elif len(parts) == 3 and parts[0] == "jobs" and parts[2] == "events":
+            job = self.find_job(parts[1])
+            if job:
+                self.stream_events(job)
+        else:
+            self.send_error_json(404, "Not found")
+
+    def do_POST(self):
+        if not self.check_request() or not self.check_json_body():
+            return
+        parts = self.path_parts()
+        job_server = self.server.job_server
+        if len(parts) == 3 and parts[0] == "jobs" and parts[2] == "cancel":
+            job = self.find_job(parts[1])
+            if job:
+                job_server.cancel(job)
+                self.send_json(job_server.snapshot(job)[0])
+            return
+        if parts not in (["jobs", "convert"], ["jobs", "download"]):
+            self.send_error_json(404, "Not found")
+            return
+
+        params = self.read_json()
+        if params is None:
+            return
+        try:
+            if parts[1] == "convert":
+                job = job_server.submit_conversion(params)
+            else:
+                job = job_server.submit_download(params)
+        except JobRequestError as e:
+            self.send_error_json(400, str(e))
+            return
+        self.send_json(job_server.snapshot(job)[0], status=201)
+
+    def do_DELETE(self):
+        if not self.check_request():
+            return
+        parts = self.path_parts()
+        if len(parts) == 2 and parts[0] == "jobs":
+            job = self.find_job(parts[1])
+            if job:
+                self.server.job_server.cancel(job)
+                self.send_json(self.server.job_server.snapshot(job)[0])
+        else:
+            self.send_error_json(404, "Not found")
+
+    # --- Helpers ---
+
+    def path_parts(self):
+        return [part for part in self.path.split("?")[0].split("/") if part]
+
+    def check_request(self):
+        """Rejects the request if its Host header is foreign or the API token is missing or wrong."""
+        allowed = self.server.allowed_hosts
+        if allowed is not None and (self.headers.get("Host") or "").lower() not in allowed:
+            self.send_error_json(403, "Unexpected Host header")
+            return False
+        token = self.server.token
+        presented = self.headers.get("Authorization") or ""
+        if token and not hmac.compare_digest(presented.encode(), f"Bearer {token}".encode()):
+            self.send_error_json(401, "Missing or wrong API token")
+            return False
+        return True
+
+    def check_json_body(self):
+        """Rejects POSTs not sent as application/json (browsers can't send those cross-site without CORS)."""
+        content_type = (self.headers.get("Content-Type") or "").split(";")[0].strip().lower()
+        if content_type != "application/json":
+            self.send_error_json(415, "Content-Type must be application/json")
+            return False
+        return True
+
+    def find_job(self, raw_id):
+        """Returns the job with the given id, or sends a 404 and returns None."""
+        job = self.server.job_server.get(int(raw_id)) if raw_id.isdigit() else None
+        if job is None:
+            self.send_error_json(404, f"No job '{raw_id}'")
+        return job
+
+    def read_json(self):
+        """Returns the JSON object of the request body, or sends a 400 and returns None."""
+        try:
+            length = int(self.headers.get("Content-Length") or 0)
+            params = json.loads(self.rfile.read(length) or b"{}")
+        except (ValueError, json.JSONDecodeError):
+            params = None
+        if not isinstance(params, dict):
+            self.send_error_json(400, "Request body must be a JSON object")
+            return None
+        return params
+
+    def send_json(self, data, status=200):
+        body = json.dumps(data).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def send_error_json(self, status, message):
+        self.send_json({"error": message}, status=status)
+
+    def stream_events(self, job):
+        """Sends the job as a Server-Sent Event on every change until it ends."""
+        job_server = self.server.job_server
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Cache-Control", "no-cache")
+        self.end_headers()
+        last_version = None
+        try:
+            while True:
+                data, version = job_server.snapshot(job)
+                if version != last_version:
+                    self.wfile.write(f"data: {json.dumps(data)}\n\n".encode())
+                    last_version = version
+                else:
+                    self.wfile.write(b": keepalive\n\n")
+                self.wfile.flush()
+                if data["status"] in FINAL_STATES:
+                    return
+                job_server.wait_for_change(job, version, EVENT_KEEPALIVE_SECONDS)
+        except (BrokenPipeError, ConnectionResetError):
+            pass # Client went away
+
+    def log_message(self, format, *args):
+        print(f"[job server] {self.address_string()} {format % args}")
+
+
+def is_loopback(host):
+    """True if host (a bind address or name) only accepts connections from this machine."""
+    if host.strip("[]").lower() == "localhost":
+        return True
+    try:
+        return ipaddress.ip_address(host.strip("[]")).is_loopback
+    except ValueError:
+        return False
+
+
+def allowed_hosts(host, port):
+    """
+    Returns the Host header values that name a server bound to host:port,
+    or None (any) for wildcard binds, which the token alone protects.
+    """
+    try:
+        if ipaddress.ip_address(host.strip("[]")).is_unspecified:
+            return None
+    except ValueError:
+        if not host:
+            return None
+    name = f"[{host}]" if ":" in host and not host.startswith("[") else host
+    names = {name.lower()} | (set(LOOPBACK_NAMES) if is_loopback(host) else set())
+    hosts = {f"{name}:{port}" for name in names}
+    if port == 80:
+        hosts |= names
+    return hosts
+
+
+def load_token(path=None):
+    """Returns the API token saved in the data folder, creating a random one on first use."""
+    path = path or data_path(TOKEN_FILE)
+    try:
+        with open(path, encoding="utf-8") as f:
+            token = f.read().strip()
+        if token:
+            return token
+    except FileNotFoundError:
+        pass
+    token = secrets.token_urlsafe(32)
+    # Readable by the current user only
+    with os.fdopen(os.open(path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600), "w", encoding="utf-8") as f:
+        f.write(token + "\n")
+    return token
+
+
+def make_server(host=SERVER_HOST, port=SERVER_PORT, max_workers=None, token=None):
+    """
+    Returns the (not yet serving) HTTP server. token None requires no token,
+    which is only allowed on loopback addresses (raises ValueError otherwise).
+    """
+    if not token and not is_loopback(host):
+        raise ValueError(f"Refusing to listen on {host} without an API token")
+    httpd = ThreadingHTTPServer((host, port), JobRequestHandler)
+    httpd.daemon_threads = True
+    httpd.job_server = JobServer(max_workers)
+    httpd.token = token
+    httpd.allowed_hosts = allowed_hosts(host, httpd.server_address[1])
+    return httpd
+
+
+def serve(host=SERVER_HOST, port=SERVER_PORT, max_workers=None, token=None, limit_rate=None, require_token=True):
+    """
+    Runs the job server until interrupted (Ctrl+C). limit_rate (e.g. "2M") overrides the bandwidth budget.
+    The token comes from token, the environment or the token file; require_token=False (loopback only) drops it.
+    """
+    if limit_rate is not None:
+        get_bandwidth_scheduler().set_limit(parse_rate(limit_rate))
+    token = token or os.environ.get(SERVER_TOKEN_ENV)
+    if not token and require_token:
+        token = load_token()
+        print(f"API token (saved in {data_path(TOKEN_FILE)}): {token}")
+    try:
+        httpd = make_server(host, port, max_workers, token)
+    except ValueError as e:
+        print(f"ERROR: {e}. Drop --no-token or listen on 127.0.0.1.")
+        return
+    print(f"Job server listening on http://{host}:{httpd.server_address[1]} "
+          f"({httpd.job_server.max_workers} workers)")
+    try:
+        httpd.serve_forever()
+    except KeyboardInterrupt:
+        print("Stopping job server...")
+    finally:
+        httpd.job_server.shutdown()
+        httpd.server_close()
+
+
+if __name__ == "__main__":
+    print("ERROR: This file cannot be run directly.")
+    print("Please run 'main.py --serve' instead.")
@@ -0,0 +1,181 @@
+import ttkbootstrap as ttk
+from ttkbootstrap.constants import *
+import threading
+import subprocess
+import importlib
+import time
+import sys
+
+from app_config import APP_NAME, APP_GEOMETRY
+from ui_dispatcher import UIDispatcher
+from ui_window import AppWindowMixin
+
+# --- Startup Prewarming ---
+# Only what the main menu needs is imported before the first paint. The heavy
+# libraries and the tool windows are imported in a background thread right
+# after it, so the first click on a tool doesn't freeze the UI.
+PREWARM_DELAY_MS = 200
+PREWARM_MODULES = ("yt_dlp", "ffmpeg", "youtube_downloader", "file_converter")
+
+
+def prewarm_modules(modules=PREWARM_MODULES):
+    """
+    Imports modules (and builds yt-dlp's extractor list) ahead of use.
+    Returns the seconds each step took; failures are left to the tool windows to report.
+    """
+    timings = {}
+    for name in modules:
+        started = time.perf_counter()
+        try:
+            module = importlib.import_module(name)
+            if name == "yt_dlp":
+                module.extractor.gen_extractor_classes()
+        except Exception as e:
+            print(f"Prewarm of '{name}' failed: {e}")
+        timings[name] = time.perf_counter() - started
+    return timings
+
+class MainApplication(AppWindowMixin, ttk.Window):
+    """
+    The main application window that serves as the entry point and menu.
+    """
+    def __init__(self):
+        super().__init__(themename="darkly", title=APP_NAME)
+        
+        width, height = [int(d) for d in APP_GEOMETRY.split('x')]
+        self.geometry(APP_GEOMETRY)
+        self.center_window(width, height)
+        self.resizable(False, False)
+        self.set_app_icon()
+
+        # Shared by all windows: worker threads post UI updates, the main loop applies them
+        self.dispatcher = UIDispatcher(self)
+        self.dispatcher.start()
+
+        self.prewarm_done = threading.Event()
+        self.prewarm_times = {}
+
+        self.create_widgets()
+        self.after(PREWARM_DELAY_MS, self.start_prewarm_thread)
+    
+    def create_widgets(self):
+        """Creates and places all widgets in the main window."""
+        main_frame = ttk.Frame(self, padding="20")
+        main_frame.pack(expand=True, fill="both")
+
+        label = ttk.Label(main_frame, text=APP_NAME, 
+                          bootstyle="primary", 
+                          font=("Segoe UI", 18, "bold"), anchor="center")
+        label.pack(pady=10, fill="x")
+        
+        youtube_button = ttk.Button(main_frame, text="YouTube Downloader", 
+                                    command=self.open_youtube_downloader, 
+                                    bootstyle="primary", padding=10)
+        youtube_button.pack(pady=10, fill="x")
+
+        file_converter_button = ttk.Button(main_frame, text="File Converter", 
+                                           command=self.open_file_converter, 
+                                           bootstyle="success", padding=10)
+        file_converter_button.pack(pady=10, fill="x")
+
+        update_button = ttk.Button(main_frame, text="Update yt-dlp", 
+                                   command=self.start_update_thread, 
+                                   bootstyle="info-outline", padding=10)
+        update_button.pack(pady=10, fill="x")
+        
+        self.update_label = ttk.Label(main_frame, text="", anchor="center", font=("Segoe UI", 9), wraplength=350)
+        self.update_label.pack(pady=5)
+
+        exit_button = ttk.Button(main_frame, text="Exit", 
+                                 command=self.exit_app, 
+                                 bootstyle="danger", padding=10)
+        exit_button.pack(pady=10, fill="x")
+
+    def open_youtube_downloader(self):
+        """Hides the main window and opens the YouTubeDownloader window."""
+        self.withdraw()
+        try:
+            from youtube_downloader import YouTubeDownloader
+            youtube_app = YouTubeDownloader(self) 
+            youtube_app.protocol("WM_DELETE_WINDOW", lambda: self.show_main_window(youtube_app))
+        except Exception as e:
+            error_msg = f"Error (Downloader): {type(e).__name__}: {e}"
+            print(error_msg)
+            self.update_label.config(text=error_msg, bootstyle="danger")
+            self.show_main_window(None)
+
+    def open_file_converter(self):
+        """Hides the main window and opens the FileConverter window."""
+        self.withdraw()
+        try:
+            from file_converter import FileConverter
+            file_converter_app = FileConverter(self)
+            file_converter_app.protocol("WM_DELETE_WINDOW", lambda: self.show_main_window(file_converter_app))
+        except Exception as e:
+            error_msg = f"Error (Converter): {type(e).__name__}: {e}"
+            print(error_msg)
+            self.update_label.config(text=error_msg, bootstyle="danger")
+            self.show_main_window(None)
+
+    def show_main_window(self, window_to_destroy=None):
+        """Shows the main window again and destroys the child window."""
+        if window_to_destroy:
+            # Ensure child window cleanup logic runs
+            if hasattr(window_to_destroy, 'close_window'):
+                window_to_destroy.close_window()
+            else:
+                window_to_destroy.destroy()
+        self.deiconify() # Show the main window
+    
+    def exit_app(self):
+        """Closes the application."""
+        self.dispatcher.stop()
+        self.quit()
+        self.destroy()
+
+    # --- Startup Prewarming ---
+
+    def start_prewarm_thread(self):
+        """Starts importing the heavy modules once the main menu is on screen."""
+        threading.Thread(target=self.run_prewarm, daemon=True).start()
+
+    def run_prewarm(self):
+        """(THREAD) Imports the tool modules in the background."""
+        self.prewarm_times = prewarm_modules()
+        self.prewarm_done.set()
+
+    # --- yt-dlp Updater ---
+
+    def update_status_safe(self, message, style="success"):
+        """Safely updates the status label from any thread."""
+        self.dispatcher.post((self, "status"), self.update_label.config, text=message, bootstyle=style)
+
+    def clear_status_later(self):
+        """Clears the status label after 5 seconds (main thread only)."""
+        self.after(5000, lambda: self.update_label.config(text=""))
+
+    def start_update_thread(self):
+        """Starts the yt-dlp update process in a separate thread."""
+        self.update_status_safe("Checking for updates...", style="info")
+        update_thread = threading.Thread(target=self.run_update, daemon=True)
+        update_thread.start()
+
+    def run_update(self):
+        """Runs the 'pip install --upgrade yt-dlp' command."""
+        try:
+            # Ensure we use the Python executable that's running the script
+            subprocess.check_output([sys.executable, "-m", "pip", "install", "--upgrade", "yt-dlp"], 
+                                    stderr=subprocess.STDOUT)
+            self.update_status_safe("yt-dlp is up to date!", style="success")
+        except subprocess.CalledProcessError as e:
+            output = e.output.decode().splitlines()[-1] # Get the last line of the error
+            self.update_status_safe(f"Update failed: {output}", style="danger")
+        except Exception as e:
+            self.update_status_safe(f"Error: {e}", style="danger")
+        
+        # Clear the message after 5 seconds
+        self.dispatcher.post((self, "clear_status"), self.clear_status_later)
+        
+if __name__ == "__main__":
+    print("ERROR: This file cannot be run directly.")
+    print("Please run 'main.py' instead.")
\ No newline at end of file
@@ -0,0 +1,201 @@
+import os
+import json
+import time
+import sqlite3
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+from app_config import data_path
+
+# --- Media Probe Cache ---
+# Shared ffprobe layer: results are cached in memory (LRU) and persisted in
+# SQLite, keyed by absolute path and invalidated when size or mtime change.
+# Re-opening a batch of 1,000 files therefore costs no new ffprobe runs.
+# Audio analyses (see audio_analysis) are kept in the same database.
+
+PROBE_CACHE_FILE = "probe_cache.sqlite3"
+MEMORY_CACHE_SIZE = 4096 # Entries kept in memory
+PROBE_WORKERS = 8 # Concurrent ffprobe processes for folder scans
+
+MEDIA_EXTENSIONS = (".mp4", ".mkv", ".avi", ".mov", ".webm", ".m4v",
+                    ".mp3", ".wav", ".m4a", ".aac", ".flac", ".ogg", ".opus", ".wma")
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS probes (
+    path TEXT PRIMARY KEY,
+    size INTEGER NOT NULL,
+    mtime_ns INTEGER NOT NULL,
+    info TEXT NOT NULL,
+    probed REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS analyses (
+    path TEXT PRIMARY KEY,
+    size INTEGER NOT NULL,
+    mtime_ns INTEGER NOT NULL,
+    params TEXT NOT NULL,
+    result TEXT NOT NULL,
+    analyzed REAL NOT NULL
+);
+"""
+
+
+def file_signature(path):
+    """Returns (absolute path, size, mtime_ns) of a file, or None if it doesn't exist."""
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return None
+    return os.path.abspath(path), stat.st_size, stat.st_mtime_ns
+
+
+class MediaProbeCache:
+    """
+    Thread-safe cache of ffprobe results.
+    Lookups go memory -> SQLite -> ffprobe; stale entries are re-probed.
+    """
+    def __init__(self, path=None, max_entries=MEMORY_CACHE_SIZE):
+        self.path = path or data_path(PROBE_CACHE_FILE)
+        self.max_entries = max_entries
+        self.memory = OrderedDict() # abs path -> (size, mtime_ns, info)
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+        self.conn = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.executescript(_SCHEMA)
+
+    def probe(self, input_file):
+        """Returns ffprobe's JSON description of input_file, or None if probing fails."""
+        signature = file_signature(input_file)
+        if signature is None:
+            return None
+
+        info = self.lookup(signature)
+        if info is not None:
+            return info
+        return self.run_ffprobe(signature)
+
+    def run_ffprobe(self, signature):
+        """Runs ffprobe for a file signature and caches the result."""
+        import ffmpeg
+        try:
+            info = ffmpeg.probe(signature[0])
+        except Exception as e:
+            print(f"Probe failed for '{signature[0]}': {e}")
+            return None
+
+        self.store(signature, info)
+        return info
+
+    def lookup(self, signature):
+        """Returns the cached probe data for a file signature, or None on a miss."""
+        path, size, mtime_ns = signature
+        with self.lock:
+            entry = self.memory.get(path)
+            if entry is not None and entry[:2] == (size, mtime_ns):
+                self.memory.move_to_end(path)
+                self.hits += 1
+                return entry[2]
+
+            row = self.conn.execute(
+                "SELECT info FROM probes WHERE path=? AND size=? AND mtime_ns=?",
+                (path, size, mtime_ns)).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+
+            info = json.loads(row[0])
+            self._remember(path, size, mtime_ns, info)
+            self.hits += 1
+            return info
+
+    def store(self, signature, info):
+        """Caches probe data in memory and on disk."""
+        path, size, mtime_ns = signature
+        with self.lock:
+            self._remember(path, size, mtime_ns, info)
+            self.conn.execute(
+                "INSERT OR REPLACE INTO probes (path, size, mtime_ns, info, probed) VALUES (?, ?, ?, ?, ?)",
+                (path, size, mtime_ns, json.dumps(info), time.time()))
+
+    def _remember(self, path, size, mtime_ns, info):
+        """Adds an entry to the in-memory LRU (lock must be held)."""
+        self.memory[path] = (size, mtime_ns, info)
+        self.memory.move_to_end(path)
+        while len(self.memory) > self.max_entries:
+            self.memory.popitem(last=False)
+
+    def invalidate(self, input_file):
+        """Drops the cached entries of a file."""
+        path = os.path.abspath(input_file)
+        with self.lock:
+            self.memory.pop(path, None)
+            self.conn.execute("DELETE FROM probes WHERE path=?", (path,))
+            self.conn.execute("DELETE FROM analyses WHERE path=?", (path,))
+
+    def lookup_analysis(self, signature, params):
+        """Returns the cached audio analysis of a file signature made with params, or None."""
+        path, size, mtime_ns = signature
+        with self.lock:
+            row = self.conn.execute(
+                "SELECT result FROM analyses WHERE path=? AND size=? AND mtime_ns=? AND params=?",
+                (path, size, mtime_ns, params)).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def store_analysis(self, signature, params, result):
+        """Caches the audio analysis of a file signature."""
+        path, size, mtime_ns = signature
+        with self.lock:
+            self.conn.execute(
+                "INSERT OR REPLACE INTO analyses (path, size, mtime_ns, params, result, analyzed) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (path, size, mtime_ns, params, json.dumps(result), time.time()))
+
+    def probe_many(self, input_files, max_workers=PROBE_WORKERS):
+        """
+        Probes many files, running ffprobe concurrently for cache misses only.
+        Returns a dict of path -> probe data (None for files that failed).
+        """
+        results = {}
+        misses = []
+        for input_file in input_files:
+            signature = file_signature(input_file)
+            info = self.lookup(signature) if signature else None
+            if info is None and signature is not None:
+                misses.append((input_file, signature))
+            results[input_file] = info
+
+        if misses:
+            with ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(misses)))) as pool:
+                probed = pool.map(self.run_ffprobe, [signature for _, signature in misses])
+                for (input_file, _), info in zip(misses, probed):
+                    results[input_file] = info
+        return results
+
+    def probe_folder(self, folder, recursive=False, extensions=MEDIA_EXTENSIONS):
+        """Probes every media file in a folder concurrently."""
+        media_files = []
+        for root, dirs, files in os.walk(folder):
+            media_files.extend(os.path.join(root, name) for name in sorted(files)
+                               if name.lower().endswith(extensions))
+            if not recursive:
+                break
+        return self.probe_many(media_files)
+
+
+# --- Shared Instance ---
+
+_probe_cache = None
+_probe_cache_lock = threading.Lock()
+
+
+def get_probe_cache():
+    """Returns the shared probe cache."""
+    global _probe_cache
+    with _probe_cache_lock:
+        if _probe_cache is None:
+            _probe_cache = MediaProbeCache()
+        return _probe_cache
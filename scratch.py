@@ -0,0 +1,167 @@
+import os
+import time
+import errno
+import shutil
+import hashlib
+import tempfile
+import threading
+from contextlib import contextmanager
+
+from app_config import data_path
+
+# --- Scratch Directory ---
+# Conversions and downloads write all in-progress and intermediate files
+# (ffmpeg output, segments, .part files, unmerged streams) to a scratch folder
+# and only move the finished file into place, atomically. Point it at a fast
+# local disk or tmpfs with JOHNNY_BRAVO_SCRATCH_DIR to keep slow or network
+# shares out of the encode path; a failed or cancelled job never leaves a
+# half-written file at its destination.
+
+SCRATCH_DIR_NAME = "scratch"
+SCRATCH_DIR_ENV = "JOHNNY_BRAVO_SCRATCH_DIR" # Optional override (e.g. an SSD or tmpfs mount)
+DOWNLOADS_DIR_NAME = "downloads" # Per-item folders, kept between attempts so .part files resume
+STALE_SECONDS = 7 * 24 * 3600 # Leftovers of crashed or abandoned jobs are removed after a week
+SPACE_RESERVE = 100 * 1024 ** 2 # Bytes always left free on a disk
+
+
+class InsufficientSpaceError(OSError):
+    """Raised before a job starts if a disk it writes to can't hold its output."""
+
+
+def _existing_parent(path):
+    """Returns path or its closest existing parent folder."""
+    path = os.path.abspath(path)
+    while not os.path.exists(path) and os.path.dirname(path) != path:
+        path = os.path.dirname(path)
+    return path
+
+
+def ensure_free_space(path, needed_bytes):
+    """Raises InsufficientSpaceError if the disk holding path has less than needed_bytes (+ a reserve) free."""
+    if not needed_bytes:
+        return
+    folder = _existing_parent(path)
+    free = shutil.disk_usage(folder).free - SPACE_RESERVE
+    if free < needed_bytes:
+        raise InsufficientSpaceError(f"Not enough free space in '{folder}': {needed_bytes / 1024 ** 2:.0f} MiB "
+                                     f"needed, {max(0, free) / 1024 ** 2:.0f} MiB free")
+
+
+def same_disk(path, other_path):
+    """True if both paths (or their closest existing parents) are on the same filesystem."""
+    try:
+        return os.stat(_existing_parent(path)).st_dev == os.stat(_existing_parent(other_path)).st_dev
+    except OSError:
+        return False
+
+
+def publish(staged_file, output_file):
+    """
+    Moves a finished file from scratch to output_file so it appears there
+    complete or not at all. Across disks it is copied next to the target
+    under a temporary name first, then renamed.
+    """
+    output_dir = os.path.dirname(os.path.abspath(output_file))
+    os.makedirs(output_dir, exist_ok=True)
+    try:
+        os.replace(staged_file, output_file)
+        return output_file
+    except OSError as e:
+        if e.errno != errno.EXDEV:
+            raise
+
+    temp_file = os.path.join(output_dir, f".{os.path.basename(output_file)}.publishing")
+    try:
+        shutil.copy2(staged_file, temp_file)
+        os.replace(temp_file, output_file)
+    except BaseException:
+        if os.path.exists(temp_file):
+            os.remove(temp_file)
+        raise
+    os.remove(staged_file)
+    return output_file
+
+
+@contextmanager
+def staged_output(output_file, expected_bytes=None):
+    """
+    Yields a scratch path to write output_file to. If the block succeeds the
+    file is published to output_file; the scratch folder is removed either way.
+    Free space for expected_bytes is checked on both disks first.
+    """
+    scratch_dir = get_scratch_dir()
+    ensure_free_space(scratch_dir, expected_bytes)
+    if not same_disk(scratch_dir, output_file):
+        ensure_free_space(os.path.dirname(os.path.abspath(output_file)), expected_bytes)
+
+    work_dir = tempfile.mkdtemp(prefix="job_", dir=scratch_dir)
+    try:
+        staged_file = os.path.join(work_dir, os.path.basename(output_file))
+        yield staged_file
+        publish(staged_file, output_file)
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+
+def download_work_dir(*key_parts):
+    """
+    Returns (and creates) the scratch folder of a download. The same item
+    always gets the same folder, so a later attempt resumes its .part files.
+    """
+    key = hashlib.sha1("\n".join(str(part) for part in key_parts).encode("utf-8")).hexdigest()[:16]
+    work_dir = os.path.join(get_scratch_dir(), DOWNLOADS_DIR_NAME, key)
+    os.makedirs(work_dir, exist_ok=True)
+    return work_dir
+
+
+def remove_work_dir(work_dir):
+    """Deletes the scratch folder of a finished job."""
+    shutil.rmtree(work_dir, ignore_errors=True)
+
+
+def clean_stale(scratch_dir, max_age=STALE_SECONDS):
+    """Removes job folders that haven't been touched for max_age seconds. Returns how many."""
+    removed = 0
+    cutoff = time.time() - max_age
+    for parent in (scratch_dir, os.path.join(scratch_dir, DOWNLOADS_DIR_NAME)):
+        try:
+            entries = list(os.scandir(parent))
+        except OSError:
+            continue
+        for entry in entries:
+            if entry.name == DOWNLOADS_DIR_NAME or not entry.is_dir(follow_symlinks=False):
+                continue
+            try:
+                if entry.stat().st_mtime < cutoff:
+                    shutil.rmtree(entry.path)
+                    removed += 1
+            except OSError as e:
+                print(f"Could not remove stale scratch folder '{entry.path}': {e}")
+    return removed
+
+
+# --- Shared Instance ---
+
+_scratch_dir = None
+_scratch_lock = threading.Lock()
+
+
+def set_scratch_dir(path):
+    """Uses path as the scratch folder from now on (e.g. from a command line option)."""
+    global _scratch_dir
+    with _scratch_lock:
+        os.makedirs(path, exist_ok=True)
+        _scratch_dir = os.path.abspath(path)
+
+
+def get_scratch_dir():
+    """Returns (and creates) the scratch folder, removing stale leftovers on first use."""
+    global _scratch_dir
+    with _scratch_lock:
+        if _scratch_dir is None:
+            _scratch_dir = os.path.abspath(os.environ.get(SCRATCH_DIR_ENV) or data_path(SCRATCH_DIR_NAME))
+            os.makedirs(_scratch_dir, exist_ok=True)
+            removed = clean_stale(_scratch_dir)
+            if removed:
+                print(f"Scratch: {removed} stale job folder(s) removed.")
+        return _scratch_dir
@@ -0,0 +1,191 @@
+import os
+import math
+import time
+import shutil
+import tempfile
+import threading
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_EXCEPTION
+
+from converter_core import (
+    run_ffmpeg, first_stream, default_worker_count, ConversionCancelled,
+    AUDIO_ENCODE_OPTIONS, DEFAULT_ENCODERS,
+)
+from scratch import get_scratch_dir
+
+# --- Segment-Parallel Encoding ---
+# Long videos are cut into time ranges that parallel ffmpeg workers encode
+# straight from the input, and the results are joined with the concat
+# demuxer. Each worker seeks a little before its range and trims on the
+# decoded timestamps, so every frame lands in exactly one chunk: no stream
+# copy step that fails on AVI packets without timestamps, and no frames lost
+# to open-GOP B-frames at the cuts. Audio is encoded once, in one piece,
+# alongside the video chunks so no encoder priming gaps appear at the cuts.
+
+SEGMENT_MIN_DURATION = 10 * 60 # Only inputs at least this long (seconds) are split
+SEGMENTS_PER_WORKER = 3 # More chunks than workers keeps the pool busy until the end
+MIN_SEGMENT_SECONDS = 30
+THREADS_PER_SEGMENT = 2
+SEEK_MARGIN_SECONDS = 2 # Workers seek this far before their range, then trim exactly
+
+
+def segment_worker_count():
+    """Returns the number of parallel segment encoders."""
+    return max(2, default_worker_count() // THREADS_PER_SEGMENT)
+
+
+def _relay_cancel(source, target, done):
+    """(THREAD) Sets target once source is set, until done is set."""
+    while not done.is_set():
+        if source.wait(0.5):
+            target.set()
+            return
+
+
+def segment_ranges(duration, segment_seconds):
+    """Returns (start, end) times covering 0..duration; the last end is None (to the end)."""
+    count = max(1, math.ceil(duration / segment_seconds - 1e-6))
+    bounds = [round(index * segment_seconds, 3) for index in range(count)]
+    return list(zip(bounds, bounds[1:] + [None]))
+
+
+def _trim_filter(start, end, start_time):
+    """Returns the trim filter selecting one range on the input's own timestamps (-copyts)."""
+    parts = []
+    if start > 0:
+        parts.append(f"start={start_time + start:.6f}")
+    if end is not None:
+        parts.append(f"end={start_time + end:.6f}")
+    return f"trim={':'.join(parts)},setpts=PTS-STARTPTS" if parts else "setpts=PTS-STARTPTS"
+
+
+def _concat_line(path):
+    """Returns one line of a concat demuxer list, quoting the path."""
+    return "file '" + path.replace("'", "'\\''") + "'\n"
+
+
+class SegmentProgress:
+    """
+    Combines the progress of parallel segment encoders into one
+    progress dict in the format produced by converter_core.run_ffmpeg.
+    """
+    def __init__(self, duration, on_progress):
+        self.duration = duration
+        self.on_progress = on_progress
+        self.lock = threading.Lock()
+        self.segment_times = {}
+        self.started = time.monotonic()
+
+    def update(self, segment, progress):
+        """(WORKER) Records the progress of one segment and reports the total."""
+        if not self.on_progress:
+            return
+        with self.lock:
+            if progress["out_time"] is not None:
+                self.segment_times[segment] = progress["out_time"]
+            done = min(sum(self.segment_times.values()), self.duration)
+
+        elapsed = time.monotonic() - self.started
+        speed = done / elapsed if elapsed > 0 else None
+        self.on_progress({
+            "out_time": done,
+            "duration": self.duration,
+            "percent": done / self.duration * 100,
+            "speed": speed,
+            "fps": None,
+            "bitrate": "N/A",
+            "eta": (self.duration - done) / speed if speed else None,
+            "finished": False,
+        })
+
+
+def encode_segmented(input_file, output_file, options, media_info, save_ext,
+                     cancel_event=None, on_progress=None):
+    """
+    Encodes input_file into output_file with the given (planned) ffmpeg options,
+    cutting the video into time ranges and encoding them in parallel.
+    """
+    import ffmpeg
+    duration = float(media_info["format"]["duration"])
+    start_time = float(media_info["format"].get("start_time") or 0)
+    workers = segment_worker_count()
+    segment_seconds = max(MIN_SEGMENT_SECONDS, duration / (workers * SEGMENTS_PER_WORKER))
+    ranges = segment_ranges(duration, segment_seconds)
+    has_audio = first_stream(media_info, "audio") is not None
+    work_dir = tempfile.mkdtemp(prefix="jb_segments_", dir=get_scratch_dir())
+
+    # Workers share a private stop event, so one failed chunk stops the others
+    # without cancelling whatever else the caller's cancel_event controls
+    stop_event = threading.Event()
+    finished = threading.Event()
+    if cancel_event is not None:
+        threading.Thread(target=_relay_cancel, args=(cancel_event, stop_event, finished), daemon=True).start()
+
+    try:
+        # 1. Encode the video ranges (and the whole audio track) in parallel
+        audio_keys = ("acodec",) + AUDIO_ENCODE_OPTIONS
+        video_options = {key: value for key, value in options.items() if key not in audio_keys and key != "vtag"}
+        video_options.update({"an": None, "threads": THREADS_PER_SEGMENT})
+
+        audio_options = {key: value for key, value in options.items() if key in AUDIO_ENCODE_OPTIONS}
+        audio_options["acodec"] = options.get("acodec") or DEFAULT_ENCODERS.get(save_ext, {}).get("acodec", "aac")
+        audio_options["vn"] = None
+
+        progress = SegmentProgress(duration, on_progress)
+        encoded = [os.path.join(work_dir, f"enc_{index:05d}.mkv") for index in range(len(ranges))]
+        audio_file = os.path.join(work_dir, "audio.mka")
+
+        def encode_segment(index):
+            start, end = ranges[index]
+            input_options = {"copyts": None}
+            seek = start - SEEK_MARGIN_SECONDS
+            if seek > 0:
+                input_options["ss"] = f"{seek:.3f}"
+            if end is not None:
+                input_options["t"] = f"{end - max(seek, 0) + SEEK_MARGIN_SECONDS:.3f}"
+            segment_options = dict(video_options)
+            trim = _trim_filter(start, end, start_time)
+            segment_options["vf"] = f"{trim},{video_options['vf']}" if video_options.get("vf") else trim
+            stream = ffmpeg.output(ffmpeg.input(input_file, **input_options)["v:0"],
+                                   encoded[index], **segment_options)
+            run_ffmpeg(stream, encoded[index], cancel_event=stop_event,
+                       on_progress=lambda p: progress.update(index, p))
+
+        def encode_audio():
+            stream = ffmpeg.output(ffmpeg.input(input_file)["a:0"], audio_file, **audio_options)
+            run_ffmpeg(stream, audio_file, cancel_event=stop_event)
+
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            futures = []
+            if has_audio:
+                futures.append(pool.submit(encode_audio))
+            futures.extend(pool.submit(encode_segment, index) for index in range(len(ranges)))
+            done, _ = wait(futures, return_when=FIRST_EXCEPTION)
+            failures = [future.exception() for future in done if future.exception() is not None]
+            if failures:
+                stop_event.set()
+
+        if cancel_event is not None and cancel_event.is_set():
+            raise ConversionCancelled("Conversion cancelled")
+        if failures:
+            raise failures[0]
+
+        # 2. Join the chunks losslessly and mux in the audio track
+        list_file = os.path.join(work_dir, "segments.txt")
+        with open(list_file, "w", encoding="utf-8") as f:
+            f.writelines(_concat_line(path) for path in encoded)
+
+        video = ffmpeg.input(list_file, f="concat", safe=0)
+        streams = [video.video]
+        if has_audio:
+            streams.append(ffmpeg.input(audio_file).audio)
+        mux_options = {"c": "copy"}
+        if "vtag" in options:
+            mux_options["vtag"] = options["vtag"]
+        run_ffmpeg(ffmpeg.output(*streams, output_file, **mux_options), output_file,
+                   duration, stop_event, on_progress=None)
+    finally:
+        finished.set()
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+    if cancel_event is not None and cancel_event.is_set():
+        raise ConversionCancelled("Conversion cancelled")
@@ -0,0 +1,91 @@
+import argparse
+import json
+import statistics
+import subprocess
+import sys
+import time
+
+# --- Startup Benchmark ---
+# Measures, in fresh interpreters (cold imports), how long it takes until the
+# main menu is on screen and how long each tool window takes to open.
+# Needs a display. Usage:
+#   python startup_benchmark.py --runs 5
+#   python startup_benchmark.py --runs 5 --prewarm   # open tools after prewarming
+#   python startup_benchmark.py --json startup.json
+
+TOOLS = (("youtube_downloader", "open_youtube_downloader"), ("file_converter", "open_file_converter"))
+
+
+def measure_child(wait_for_prewarm):
+    """Runs inside the child interpreter: opens the app and each tool, returns timings."""
+    import main_window
+    app = main_window.MainApplication()
+    while not app.winfo_ismapped():
+        app.update()
+    timings = {"first_window": time.time()}
+
+    if wait_for_prewarm:
+        while not app.prewarm_done.wait(0.05):
+            app.update()
+        timings["prewarm"] = app.prewarm_times
+
+    for name, opener in TOOLS:
+        started = time.perf_counter()
+        getattr(app, opener)()
+        app.update()
+        timings[name] = time.perf_counter() - started
+        for window in app.winfo_children():
+            if isinstance(window, main_window.ttk.Toplevel):
+                app.show_main_window(window)
+        app.update()
+
+    app.exit_app()
+    return timings
+
+
+def run_once(wait_for_prewarm):
+    """Starts one child interpreter and returns its timings (seconds)."""
+    command = [sys.executable, __file__, "--child"]
+    if wait_for_prewarm:
+        command.append("--prewarm")
+    started = time.time()
+    output = subprocess.run(command, capture_output=True, text=True, check=True).stdout
+    timings = json.loads(output.strip().splitlines()[-1])
+    timings["first_window"] -= started # Includes interpreter startup
+    return timings
+
+
+def summarize(runs):
+    """Returns the median, min and max of every measured step."""
+    summary = {}
+    for key in ("first_window",) + tuple(name for name, _ in TOOLS):
+        values = [run[key] for run in runs]
+        summary[key] = {"median": statistics.median(values), "min": min(values), "max": max(values)}
+    return summary
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure time-to-first-window and tool open times.")
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--prewarm", action="store_true", help="open the tools only after prewarming finished")
+    parser.add_argument("--json", help="save the raw runs and summary to this file")
+    parser.add_argument("--child", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        print(json.dumps(measure_child(args.prewarm)))
+        return
+
+    runs = [run_once(args.prewarm) for _ in range(args.runs)]
+    summary = summarize(runs)
+    for key, values in summary.items():
+        print(f"{key:20} median {values['median'] * 1000:8.1f} ms | "
+              f"min {values['min'] * 1000:8.1f} ms | max {values['max'] * 1000:8.1f} ms")
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump({"prewarm": args.prewarm, "runs": runs, "summary": summary}, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
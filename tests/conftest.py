@@ -0,0 +1,157 @@
+import os
+import sys
+import shutil
+import tempfile
+import threading
+import subprocess
+from http.server import ThreadingHTTPServer, SimpleHTTPRequestHandler
+
+import pytest
+
+# The app is a flat set of modules in the repository root
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+# Journals, caches, archives and scratch files of the tests stay out of the user's data folder
+os.environ["JOHNNY_BRAVO_DATA_DIR"] = tempfile.mkdtemp(prefix="jb_test_data_")
+os.environ.pop("JOHNNY_BRAVO_SCRATCH_DIR", None)
+
+# Shared instances (module, attribute) that keep state in the data folder
+SHARED_INSTANCES = [
+    ("bandwidth", "_scheduler"), ("conversion_cache", "_conversion_cache"), ("download_library", "_library"),
+    ("info_cache", "_info_cache"), ("job_journal", "_journal"), ("job_metrics", "_metrics"),
+    ("media_probe", "_probe_cache"), ("scratch", "_scratch_dir"), ("watch_folder", "_watch_state"),
+]
+
+
+@pytest.fixture(autouse=True)
+def data_dir(tmp_path, monkeypatch):
+    """Gives every test its own empty data folder (library, archive, journal, caches)."""
+    path = tmp_path / "data"
+    path.mkdir()
+    monkeypatch.setenv("JOHNNY_BRAVO_DATA_DIR", str(path))
+    for module_name, attribute in SHARED_INSTANCES:
+        if module_name in sys.modules:
+            monkeypatch.setattr(sys.modules[module_name], attribute, None)
+    return path
+
+
+def has_encoder(name):
+    """Returns True if ffmpeg is installed and has the encoder."""
+    if not shutil.which("ffmpeg"):
+        return False
+    result = subprocess.run(["ffmpeg", "-hide_banner", "-encoders"], capture_output=True, text=True)
+    return f" {name} " in result.stdout
+
+
+def make_media(path, seconds=2, video=True):
+    """Writes a small test file (video + audio, or audio only) with ffmpeg."""
+    args = ["ffmpeg", "-hide_banner", "-loglevel", "error", "-y"]
+    if video:
+        args += ["-f", "lavfi", "-i", f"testsrc=size=160x120:rate=25:duration={seconds}"]
+    args += ["-f", "lavfi", "-i", f"sine=frequency=440:duration={seconds}", str(path)]
+    subprocess.run(args, check=True)
+    return path
+
+
+# --- Local Media Server ---
+
+class MediaServer(ThreadingHTTPServer):
+    """Serves a folder over HTTP with Range support, recording what was requested."""
+    daemon_threads = True
+
+    def __init__(self, folder):
+        super().__init__(("127.0.0.1", 0), MediaRequestHandler)
+        self.folder = str(folder)
+        self.lock = threading.Lock()
+        self.requests = [] # (path, Range header or None)
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self.delays = {} # file suffix -> seconds to wait before answering
+        self.drop_after = {} # path -> bytes sent before the connection is dropped (until removed)
+        self.ranges = True # False: answer Range requests with the whole file, like some CDNs
+
+    def url(self, name):
+        return f"http://127.0.0.1:{self.server_address[1]}/{name}"
+
+    def hits(self, name):
+        """Returns how many times /name was requested."""
+        with self.lock:
+            return sum(1 for path, _ in self.requests if path == "/" + name)
+
+
+class MediaRequestHandler(SimpleHTTPRequestHandler):
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, directory=args[2].folder, **kwargs)
+
+    def log_message(self, format, *args):
+        pass
+
+    def do_GET(self):
+        server = self.server
+        with server.lock:
+            server.requests.append((self.path, self.headers.get("Range")))
+            server.in_flight += 1
+            server.max_in_flight = max(server.max_in_flight, server.in_flight)
+        try:
+            for suffix, delay in server.delays.items():
+                if self.path.endswith(suffix):
+                    threading.Event().wait(delay)
+            self.send_media()
+        except (BrokenPipeError, ConnectionResetError):
+            pass # Clients (yt-dlp's extractor) may read only the start of a file
+        finally:
+            with server.lock:
+                server.in_flight -= 1
+
+    def send_media(self):
+        path = self.translate_path(self.path)
+        if not os.path.isfile(path):
+            super().do_GET()
+            return
+        size = os.path.getsize(path)
+        start, end = 0, size - 1
+        byte_range = self.headers.get("Range")
+        if byte_range and byte_range.startswith("bytes=") and self.server.ranges:
+            first, _, last = byte_range[len("bytes="):].partition("-")
+            start = int(first or 0)
+            end = min(int(last), size - 1) if last else size - 1
+            if start >= size:
+                self.send_response(416)
+                self.send_header("Content-Range", f"bytes */{size}")
+                self.end_headers()
+                return
+            self.send_response(206)
+            self.send_header("Content-Range", f"bytes {start}-{end}/{size}")
+        else:
+            self.send_response(200)
+        self.send_header("Content-Type", self.guess_type(path))
+        self.send_header("Content-Length", str(end - start + 1))
+        self.send_header("Accept-Ranges", "bytes")
+        self.end_headers()
+
+        with self.server.lock:
+            limit = self.server.drop_after.get(self.path)
+        with open(path, "rb") as f:
+            f.seek(start)
+            data = f.read(end - start + 1)
+        if limit is not None:
+            self.wfile.write(data[:limit])
+            self.wfile.flush()
+            self.close_connection = True
+            self.connection.shutdown(2)
+            return
+        self.wfile.write(data)
+
+
+@pytest.fixture
+def media_server(tmp_path):
+    """A MediaServer on a free local port, serving tmp_path/www."""
+    folder = tmp_path / "www"
+    folder.mkdir()
+    server = MediaServer(folder)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    yield server
+    server.shutdown()
+    server.server_close()
@@ -0,0 +1,107 @@
+import os
+import shutil
+import time
+
+import pytest
+
+from conftest import make_media
+
+pytest.importorskip("yt_dlp")
+pytest.importorskip("ffmpeg")
+pytestmark = pytest.mark.skipif(not shutil.which("ffmpeg"), reason="ffmpeg not installed")
+
+from audio_stream import stream_to_mp3, STREAM_AUDIO_FORMAT, STREAM_READ_SIZE
+from converter_core import ConversionError
+from downloader_core import download_item, build_ydl_opts, item_journal_options, DownloadCancelled, ITEM_DONE
+from download_library import get_library
+from yt_dlp.utils import ContentTooShortError
+
+
+def streaming_ydl(output_dir):
+    """Returns a YoutubeDL set up the way downloader_core streams audio."""
+    import yt_dlp
+    ydl_opts = build_ydl_opts("audio", None, str(output_dir))
+    ydl_opts["format"] = STREAM_AUDIO_FORMAT
+    del ydl_opts["postprocessors"]
+    ydl_opts["quiet"] = True
+    return yt_dlp.YoutubeDL(ydl_opts)
+
+
+def stream(url, output_dir, progress_hook=lambda d: None):
+    """Streams url into an MP3 in output_dir; returns its path."""
+    with streaming_ydl(output_dir) as ydl:
+        info = ydl.extract_info(url, download=False, process=False)
+        return stream_to_mp3(ydl, info, progress_hook)
+
+
+def leftovers(folder):
+    return [name for _, _, files in os.walk(folder) for name in files]
+
+
+def test_audio_item_is_encoded_while_downloading(media_server, tmp_path):
+    source = make_media(f"{media_server.folder}/song.wav", seconds=20, video=False)
+    assert os.path.getsize(source) > 4 * STREAM_READ_SIZE
+    output = tmp_path / "out"
+    seen_files = []
+
+    def progress_hook(d):
+        if d["status"] == "downloading" and d["downloaded_bytes"] < d["total_bytes"]:
+            time.sleep(0.05) # Gives ffmpeg time to write what it got so far
+            seen_files.append(leftovers(os.path.dirname(d["filename"])))
+
+    item = {"url": media_server.url("song.wav"), "output_dir": str(output), "type": "audio", "resolution": None}
+    status, path = download_item(item, progress_hook)
+
+    assert status == ITEM_DONE
+    assert path.startswith(str(output)) and path.endswith(".mp3") and os.path.getsize(path) > 0
+    assert leftovers(output) == [os.path.basename(path)]
+    # Only the growing MP3 exists while downloading: no intermediate copy of the source
+    assert any(files for files in seen_files)
+    assert all(all(name.endswith(".mp3.part") for name in files) for files in seen_files)
+    assert all(path == "/song.wav" for path, _ in media_server.requests)
+    entries = get_library().search("")
+    assert [(entry["path"], entry["format"]) for entry in entries] == [(path, "mp3 (streamed)")]
+
+
+def test_part_file_is_renamed_on_success(media_server, tmp_path):
+    make_media(f"{media_server.folder}/clip.wav", seconds=3, video=False)
+    path = stream(media_server.url("clip.wav"), tmp_path / "out")
+    assert os.path.isfile(path) and not os.path.exists(path + ".part")
+    assert leftovers(tmp_path / "out") == [os.path.basename(path)]
+
+
+def test_part_file_is_removed_when_download_is_cancelled(media_server, tmp_path):
+    make_media(f"{media_server.folder}/long.wav", seconds=20, video=False)
+
+    def progress_hook(d):
+        if d["downloaded_bytes"] >= 2 * STREAM_READ_SIZE:
+            raise DownloadCancelled("Download cancelled by user.")
+
+    with pytest.raises(DownloadCancelled):
+        stream(media_server.url("long.wav"), tmp_path / "out", progress_hook)
+    assert leftovers(tmp_path / "out") == []
+
+
+def test_part_file_is_removed_when_connection_drops(media_server, tmp_path):
+    make_media(f"{media_server.folder}/cut.wav", seconds=20, video=False)
+    media_server.drop_after["/cut.wav"] = 3 * STREAM_READ_SIZE
+
+    with pytest.raises(ContentTooShortError):
+        stream(media_server.url("cut.wav"), tmp_path / "out")
+    assert leftovers(tmp_path / "out") == []
+
+
+def test_part_file_is_removed_when_ffmpeg_fails(media_server, tmp_path):
+    with open(f"{media_server.folder}/broken.mp3", "wb") as f:
+        f.write(os.urandom(STREAM_READ_SIZE))
+
+    with pytest.raises(ConversionError):
+        stream(media_server.url("broken.mp3"), tmp_path / "out")
+    assert leftovers(tmp_path / "out") == []
+
+
+def test_streaming_off_is_kept_in_the_journal():
+    item = {"url": "https://example.com/a", "output_dir": "out", "type": "audio", "resolution": None}
+    assert "stream" not in item_journal_options(dict(item, stream=True))
+    assert item_journal_options(dict(item, stream=False))["stream"] is False
+    assert "stream" not in item_journal_options(dict(item, stream=False, playlist=True)) # Playlists never stream
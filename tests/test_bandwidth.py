@@ -0,0 +1,138 @@
+import os
+import time
+import threading
+
+import pytest
+
+import bandwidth
+from bandwidth import BandwidthScheduler, DownloadThrottle, parse_rate, parse_clock, load_settings, MIN_SHARE
+
+KIB = 1024
+
+
+def at(hour, minute):
+    """Returns the epoch time of today at hour:minute (local time)."""
+    local = time.localtime()
+    return time.mktime((local.tm_year, local.tm_mon, local.tm_mday, hour, minute, 0, 0, 0, -1))
+
+
+def test_parse_rate_and_clock():
+    assert parse_rate("500K") == 500 * KIB
+    assert parse_rate("1.5M") == int(1.5 * KIB * KIB)
+    assert parse_rate(0) is None and parse_rate("") is None and parse_rate(None) is None
+    with pytest.raises(ValueError):
+        parse_rate("fast")
+    assert parse_clock("09:30") == 9 * 60 + 30
+
+
+def test_schedule_windows():
+    scheduler = BandwidthScheduler(limit=4 * KIB * KIB, schedule=[
+        (parse_clock("09:00"), parse_clock("18:00"), KIB * KIB), # Office hours
+        (parse_clock("22:00"), parse_clock("06:00"), None), # Unlimited overnight, across midnight
+    ])
+    assert scheduler.current_limit(at(8, 59)) == 4 * KIB * KIB
+    assert scheduler.current_limit(at(9, 0)) == KIB * KIB
+    assert scheduler.current_limit(at(17, 59)) == KIB * KIB
+    assert scheduler.current_limit(at(18, 0)) == 4 * KIB * KIB
+    assert scheduler.current_limit(at(23, 30)) is None
+    assert scheduler.current_limit(at(3, 0)) is None
+    assert scheduler.current_limit(at(6, 0)) == 4 * KIB * KIB
+
+
+def test_running_downloads_follow_a_new_schedule_window(monkeypatch):
+    scheduler = BandwidthScheduler(limit=800 * KIB, schedule=[(0, 1, 100 * KIB)])
+    window = {"limit": 800 * KIB}
+    monkeypatch.setattr(scheduler, "current_limit", lambda now=None: window["limit"])
+    monkeypatch.setattr(bandwidth, "SCHEDULE_CHECK_INTERVAL", 0)
+    with scheduler.share(), scheduler.share():
+        assert scheduler.share_rate == 400 * KIB
+        window["limit"] = 100 * KIB # A window starts while both download
+        scheduler.refresh()
+        assert scheduler.share_rate == 50 * KIB
+    assert scheduler.share_rate is None
+
+
+def test_budget_is_split_across_running_downloads():
+    scheduler = BandwidthScheduler(limit=300 * KIB)
+    with scheduler.share():
+        assert scheduler.share_rate == 300 * KIB
+        with scheduler.share(), scheduler.share():
+            assert scheduler.share_rate == 100 * KIB
+        assert scheduler.share_rate == 300 * KIB
+        scheduler.set_limit(KIB) # Tiny budgets still keep every download moving
+        assert scheduler.share_rate == MIN_SHARE
+        scheduler.set_limit(None)
+        assert scheduler.share_rate is None
+
+
+def test_token_bucket_paces_to_the_share():
+    scheduler = BandwidthScheduler(limit=100 * KIB)
+    with scheduler.share():
+        throttle = DownloadThrottle(scheduler)
+        assert throttle.consume("a", 0) == 0.0 # First report only sets the baseline
+        assert throttle.consume("a", 50 * KIB) == pytest.approx(0.5, abs=0.05) # 50 KiB of debt at 100 KiB/s
+        assert throttle.consume("a", 100 * KIB) == pytest.approx(1.0, abs=0.05)
+        assert throttle.consume("b", 500 * KIB) == pytest.approx(1.0, abs=0.05) # Resumed file: baseline only
+
+        throttle.tokens = 0.0
+        throttle.refilled_at -= 5 # Idle for 5 s: at most one second of burst builds up
+        assert throttle.consume("a", 200 * KIB) == pytest.approx(0.0, abs=0.05)
+        assert throttle.consume("a", 250 * KIB) == pytest.approx(0.5, abs=0.05)
+
+
+def test_settings_file(tmp_path):
+    path = tmp_path / "bandwidth.json"
+    path.write_text('{"limit": "2M", "schedule": [{"start": "09:00", "end": "18:00", "limit": "500K"}]}')
+    assert load_settings(str(path)) == (2 * KIB * KIB, [(9 * 60, 18 * 60, 500 * KIB)])
+    path.write_text("not json")
+    assert load_settings(str(path)) == (None, [])
+
+
+# --- Throttled downloads from a local server ---
+
+pytest.importorskip("yt_dlp")
+
+from downloader_core import DownloadQueue, download_item, ITEM_DONE
+
+
+def serve_file(media_server, name, size):
+    with open(os.path.join(media_server.folder, name), "wb") as f:
+        f.write(os.urandom(size))
+    return media_server.url(name)
+
+
+def test_download_is_paced_to_the_budget(media_server, tmp_path):
+    url = serve_file(media_server, "paced.mp4", 1536 * KIB)
+    bandwidth.get_bandwidth_scheduler().set_limit(512 * KIB)
+
+    started = time.monotonic()
+    item = {"url": url, "output_dir": str(tmp_path / "out"), "type": "video", "resolution": "best"}
+    status, path = download_item(item, lambda d: None)
+    elapsed = time.monotonic() - started
+
+    assert status == ITEM_DONE and os.path.getsize(path) == 1536 * KIB
+    # 1.5 MiB at 512 KiB/s (the bucket starts empty): about 3 s
+    assert 2.5 < elapsed < 10
+
+
+def test_concurrent_downloads_share_the_budget(media_server, tmp_path):
+    scheduler = bandwidth.get_bandwidth_scheduler()
+    scheduler.set_limit(512 * KIB)
+    items = [{"url": serve_file(media_server, f"shared{index}.mp4", 1024 * KIB),
+              "output_dir": str(tmp_path / "out"), "type": "video", "resolution": "best"} for index in range(2)]
+    shares = set()
+    lock = threading.Lock()
+
+    def on_progress(index, d):
+        with lock:
+            shares.add(scheduler.share_rate)
+
+    started = time.monotonic()
+    queue = DownloadQueue(items, max_workers=2, on_progress=on_progress)
+    queue.run()
+    elapsed = time.monotonic() - started
+
+    assert queue.completed == 2 and queue.failed == 0
+    assert 256 * KIB in shares # Each of the two running downloads got half the budget
+    # 2 MiB at 512 KiB/s in total: about 4 s
+    assert 3.5 < elapsed < 15
@@ -0,0 +1,20 @@
+from conversion_benchmark import compare_results
+
+
+def result(wall_seconds, profile=None):
+    return {"case": f"mkv_to_mp4/640x360/10s/{profile or 'preset'}", "preset": "mkv_to_mp4",
+            "resolution": "640x360", "duration": 10, "profile": profile, "wall_seconds": wall_seconds}
+
+
+def test_compare_only_matches_runs_with_the_same_profile(capsys):
+    baseline = {"results": [result(10.0, "archival")]}
+    assert compare_results([result(2.0, "fast_draft")], baseline) == []
+    assert "No case of the baseline matches" in capsys.readouterr().out
+
+    assert compare_results([result(12.0, "archival")], baseline) == ["mkv_to_mp4/640x360/10s/archival"]
+
+
+def test_compare_reads_baselines_saved_before_the_profile_was_in_the_case_name():
+    old = dict(result(10.0), case="mkv_to_mp4/640x360/10s")
+    assert compare_results([result(9.0)], {"results": [old]}) == []
+    assert compare_results([result(12.0)], {"results": [old]}) == ["mkv_to_mp4/640x360/10s/preset"]
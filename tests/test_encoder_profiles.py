@@ -0,0 +1,45 @@
+import shutil
+
+import pytest
+
+from conftest import has_encoder
+
+pytest.importorskip("ffmpeg")
+pytestmark = pytest.mark.skipif(not shutil.which("ffmpeg"), reason="ffmpeg not installed")
+
+from encoder_profiles import available_encoders, calibrate_profile, make_reference, pick_profile
+
+SECONDS = 1
+
+
+@pytest.mark.skipif(not (has_encoder("libx264") and has_encoder("libxvid")), reason="needs libx264 and libxvid")
+def test_calibration_measures_every_encoder_of_the_profile(tmp_path):
+    reference = make_reference(str(tmp_path), seconds=SECONDS)
+    result = calibrate_profile("fast_draft", reference, str(tmp_path), SECONDS)
+
+    assert set(result["encoders"]) == {"libx264", "libxvid"}
+    assert (tmp_path / "fast_draft_libxvid.avi").exists()
+    encoders = result["encoders"].values()
+    assert result["kbps"] == max(encoder["kbps"] for encoder in encoders)
+    assert result["ssim"] == min(encoder["ssim"] for encoder in encoders)
+    assert result["realtime_factor"] == min(encoder["realtime_factor"] for encoder in encoders)
+
+
+def test_calibration_skips_encoders_ffmpeg_lacks(tmp_path):
+    if not has_encoder("libx264"):
+        pytest.skip("needs libx264")
+    assert "libx264" in available_encoders()
+    reference = make_reference(str(tmp_path), seconds=SECONDS)
+    result = calibrate_profile("fast_draft", reference, str(tmp_path), SECONDS, encoders={"libx264"})
+    assert list(result["encoders"]) == ["libx264"]
+
+
+def test_pick_takes_the_fastest_profile_meeting_the_targets():
+    results = [
+        {"profile": "fast_draft", "encode_seconds": 1, "kbps": 900, "ssim": 0.93},
+        {"profile": "balanced", "encode_seconds": 2, "kbps": 1500, "ssim": 0.96},
+        {"profile": "archival", "encode_seconds": 4, "kbps": 3000, "ssim": 0.98},
+    ]
+    assert pick_profile(results, min_ssim=0.95) == "balanced"
+    assert pick_profile(results, min_ssim=0.99) == "archival"
+    assert pick_profile(results, min_ssim=None, max_kbps=500) == "fast_draft"
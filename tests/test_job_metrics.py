@@ -0,0 +1,36 @@
+from job_journal import KIND_CONVERT, JOB_DONE
+from job_metrics import MetricsLog, MODE_GUI, MODE_SERVE
+
+
+def read_samples(path):
+    """Returns {sample line without value: value} of a Prometheus textfile."""
+    samples = {}
+    for line in path.read_text(encoding="utf-8").splitlines():
+        if line and not line.startswith("#"):
+            name, value = line.rsplit(" ", 1)
+            samples[name] = float(value)
+    return samples
+
+
+def finish_jobs(log, count):
+    for index in range(count):
+        record = log.start_job(KIND_CONVERT, f"clip{index}.mkv")
+        record.start()
+        record.finish(JOB_DONE, bytes_in=1000, bytes_out=500)
+
+
+def test_processes_of_different_modes_keep_their_own_files(tmp_path):
+    gui = MetricsLog(str(tmp_path), mode=MODE_GUI)
+    server = MetricsLog(str(tmp_path), mode=MODE_SERVE)
+    finish_jobs(gui, 2)
+    finish_jobs(server, 3)
+    finish_jobs(gui, 1) # Must not overwrite the server's counters
+
+    gui_samples = read_samples(tmp_path / "johnny_bravo_gui.prom")
+    server_samples = read_samples(tmp_path / "johnny_bravo_serve.prom")
+    assert gui_samples['johnny_bravo_jobs_total{kind="convert",mode="gui",status="done"}'] == 3
+    assert server_samples['johnny_bravo_jobs_total{kind="convert",mode="serve",status="done"}'] == 3
+    assert server_samples['johnny_bravo_job_bytes_in_total{kind="convert",mode="serve"}'] == 3000
+
+    assert len((tmp_path / "jobs_gui.jsonl").read_text(encoding="utf-8").splitlines()) == 3
+    assert len((tmp_path / "jobs_serve.jsonl").read_text(encoding="utf-8").splitlines()) == 3
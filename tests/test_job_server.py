@@ -0,0 +1,106 @@
+import os
+import json
+import threading
+import http.client
+
+import pytest
+
+import job_server
+from job_server import JobServer, ServerJob, make_server, allowed_hosts, is_loopback, load_token
+from job_journal import KIND_CONVERT, KIND_DOWNLOAD, JOB_DONE, JOB_QUEUED, JOB_RUNNING
+from converter_core import default_worker_count
+
+TOKEN = "test-token"
+
+
+@pytest.fixture
+def server():
+    httpd = make_server("127.0.0.1", 0, max_workers=1, token=TOKEN)
+    threading.Thread(target=httpd.serve_forever, daemon=True).start()
+    yield httpd
+    httpd.shutdown()
+    httpd.job_server.shutdown()
+    httpd.server_close()
+
+
+def request(server, method, path, body=None, headers=None):
+    """Sends a request and returns (status, decoded JSON body)."""
+    port = server.server_address[1]
+    connection = http.client.HTTPConnection("127.0.0.1", port, timeout=10)
+    all_headers = {"Authorization": f"Bearer {TOKEN}", "Content-Type": "application/json"}
+    all_headers.update(headers or {})
+    connection.request(method, path, body=body, headers={k: v for k, v in all_headers.items() if v is not None})
+    response = connection.getresponse()
+    data = json.loads(response.read() or b"null")
+    connection.close()
+    return response.status, data
+
+
+def test_token_is_required(server):
+    assert request(server, "GET", "/health")[0] == 200
+    assert request(server, "GET", "/health", headers={"Authorization": None})[0] == 401
+    assert request(server, "GET", "/health", headers={"Authorization": "Bearer wrong"})[0] == 401
+
+
+def test_foreign_host_header_is_rejected(server):
+    # A DNS-rebound page reaches the server with its own name in the Host header
+    port = server.server_address[1]
+    assert request(server, "GET", "/jobs", headers={"Host": f"evil.example:{port}"})[0] == 403
+    assert request(server, "GET", "/jobs", headers={"Host": f"localhost:{port}"})[0] == 200
+
+
+def test_post_needs_a_json_content_type(server, tmp_path):
+    body = json.dumps({"preset": "mkv_to_mp4", "input": str(tmp_path / "missing.mkv")})
+    # A cross-site form or fetch "simple request" can only send text/plain or form types
+    assert request(server, "POST", "/jobs/convert", body, {"Content-Type": "text/plain"})[0] == 415
+    assert request(server, "POST", "/jobs/convert", body, {"Content-Type": None})[0] == 415
+    status, data = request(server, "POST", "/jobs/convert", body, {"Content-Type": "application/json; charset=utf-8"})
+    assert status == 400 and "Input file not found" in data["error"]
+
+
+def test_no_token_only_on_loopback():
+    with pytest.raises(ValueError):
+        make_server("0.0.0.0", 0, token=None)
+    httpd = make_server("127.0.0.1", 0, token=None)
+    httpd.job_server.shutdown()
+    httpd.server_close()
+
+
+def test_allowed_hosts():
+    assert allowed_hosts("127.0.0.1", 8750) == {"127.0.0.1:8750", "localhost:8750", "[::1]:8750"}
+    assert allowed_hosts("192.168.1.5", 8750) == {"192.168.1.5:8750"}
+    assert allowed_hosts("::1", 80) >= {"[::1]:80", "[::1]", "localhost"}
+    assert allowed_hosts("0.0.0.0", 8750) is None
+    assert is_loopback("localhost") and is_loopback("127.0.0.2") and not is_loopback("10.0.0.1")
+
+
+def test_token_is_generated_once(tmp_path):
+    path = tmp_path / "token.txt"
+    token = load_token(str(path))
+    assert len(token) >= 32
+    assert load_token(str(path)) == token
+    if os.name == "posix":
+        assert path.stat().st_mode & 0o777 == 0o600
+
+
+def test_conversions_share_the_cpus():
+    server = JobServer(max_workers=4)
+    job = ServerJob(1, KIND_CONVERT, {"preset": "mkv_to_mp4", "input": "in.mkv", "output": "out.mp4",
+                                      "profile": None})
+    runner = server._make_runner(job)
+    assert runner.max_workers == 1
+    assert runner.extra_options() == {"threads": max(1, default_worker_count() // 4)}
+    server.shutdown()
+
+
+def test_finished_jobs_are_pruned(monkeypatch):
+    monkeypatch.setattr(job_server, "MAX_FINISHED_JOBS", 2)
+    server = JobServer(max_workers=1)
+    for job_id, status in enumerate([JOB_DONE, JOB_RUNNING, JOB_DONE, JOB_DONE, JOB_QUEUED, JOB_DONE], 1):
+        job = ServerJob(job_id, KIND_DOWNLOAD, {})
+        job.status = status
+        server.jobs[job_id] = job
+    with server.lock:
+        server._prune()
+    assert list(server.jobs) == [2, 4, 5, 6] # Unfinished jobs stay, finished ones keep the newest 2
+    server.shutdown()
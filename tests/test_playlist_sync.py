@@ -0,0 +1,71 @@
+import shutil
+import subprocess
+
+import pytest
+
+from conftest import make_media
+
+pytest.importorskip("yt_dlp")
+pytestmark = pytest.mark.skipif(not shutil.which("ffmpeg"), reason="ffmpeg not installed")
+
+from downloader_core import sync_playlist, build_ydl_opts, FRAGMENT_WORKERS, ITEM_DONE, ITEM_SKIPPED
+
+PLAYLIST_PAGE = ('<html><head><title>Sync Test</title></head><body>'
+                 '<video src="first.mp4"></video><video src="second.mp4"></video></body></html>')
+
+
+@pytest.fixture
+def playlist(media_server):
+    """A page with two embedded videos, which yt-dlp's generic extractor reads as a playlist."""
+    folder = media_server.folder
+    make_media(f"{folder}/first.mp4")
+    make_media(f"{folder}/second.mp4")
+    with open(f"{folder}/index.html", "w", encoding="utf-8") as f:
+        f.write(PLAYLIST_PAGE)
+    return media_server.url("index.html")
+
+
+def test_sync_fetches_only_new_entries(playlist, media_server, tmp_path):
+    archive = tmp_path / "archive.txt"
+    output = tmp_path / "out"
+
+    assert sync_playlist(playlist, str(output), archive_file=str(archive)) == (ITEM_DONE, "2 new videos")
+    files = sorted(path.name for path in (output / "Sync Test").iterdir())
+    assert len(files) == 2 and all(name.endswith(".mp4") for name in files)
+    assert len(archive.read_text().splitlines()) == 2
+
+    # Second sync: everything is in the archive, so no media is requested again
+    assert sync_playlist(playlist, str(output), archive_file=str(archive)) == (ITEM_SKIPPED, "No new videos")
+    assert media_server.hits("first.mp4") == 1
+    assert media_server.hits("second.mp4") == 1
+
+
+def test_sync_fetches_entry_added_later(playlist, media_server, tmp_path):
+    archive = tmp_path / "archive.txt"
+    output = tmp_path / "out"
+    sync_playlist(playlist, str(output), archive_file=str(archive))
+
+    make_media(f"{media_server.folder}/third.mp4")
+    with open(f"{media_server.folder}/index.html", "w", encoding="utf-8") as f:
+        f.write(PLAYLIST_PAGE.replace("</body>", '<video src="third.mp4"></video></body>'))
+
+    assert sync_playlist(playlist, str(output), archive_file=str(archive)) == (ITEM_DONE, "1 new videos")
+    assert media_server.hits("third.mp4") == 1
+    assert media_server.hits("first.mp4") == 1
+
+
+def test_segmented_download_fetches_fragments_concurrently(media_server, tmp_path):
+    import yt_dlp
+    subprocess.run(["ffmpeg", "-hide_banner", "-loglevel", "error", "-y",
+                    "-f", "lavfi", "-i", "testsrc=size=160x120:rate=25:duration=8",
+                    "-c:v", "libx264", "-g", "25", "-f", "hls", "-hls_time", "1", "-hls_playlist_type", "vod",
+                    f"{media_server.folder}/stream.m3u8"], check=True)
+    media_server.delays[".ts"] = 0.3 # Keeps each fragment request open long enough to overlap
+
+    ydl_opts = build_ydl_opts("video", "best", str(tmp_path / "out"))
+    ydl_opts.update({"quiet": True, "noprogress": True, "fixup": "never"})
+    with yt_dlp.YoutubeDL(ydl_opts) as ydl:
+        ydl.download([media_server.url("stream.m3u8")])
+
+    assert media_server.max_in_flight == FRAGMENT_WORKERS
+    assert sum(1 for path, _ in media_server.requests if path.endswith(".ts")) == 8
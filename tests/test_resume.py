@@ -0,0 +1,101 @@
+import os
+
+import pytest
+
+pytest.importorskip("yt_dlp")
+
+import downloader_core
+from downloader_core import (
+    DownloadQueue, DownloadCancelled, download_item, partial_file_sizes, item_journal_options,
+    ITEM_CANCELLED, ITEM_DONE, NO_FILE_ERROR,
+)
+from job_journal import JobJournal, KIND_DOWNLOAD, JOB_FAILED, encode_options
+from scratch import download_work_dir
+
+KIB = 1024
+SIZE = 2048 * KIB
+
+
+def make_item(media_server, tmp_path, name):
+    with open(os.path.join(media_server.folder, name), "wb") as f:
+        f.write(os.urandom(SIZE))
+    return {"url": media_server.url(name), "output_dir": str(tmp_path / "out"), "type": "video", "resolution": "best"}
+
+
+def run_queue(item, on_progress=None):
+    """Returns a one-item DownloadQueue (not started yet) and the list its statuses are appended to."""
+    statuses = []
+    queue = DownloadQueue([item], max_workers=1, on_progress=on_progress,
+                          on_status=lambda index, status, message: statuses.append(status))
+    return queue, statuses
+
+
+def test_cancelled_download_resumes_from_part_file(media_server, tmp_path):
+    item = make_item(media_server, tmp_path, "resume.mp4")
+
+    # First attempt: cancelled once half of the file has arrived
+    def cancel_halfway(index, d):
+        if d["status"] == "downloading" and (d.get("downloaded_bytes") or 0) >= SIZE // 2:
+            queue.cancel(keep_resumable=True)
+            raise DownloadCancelled("Download cancelled by user.") # Like the next hook call would
+
+    queue, statuses = run_queue(item, cancel_halfway)
+    queue.run()
+    assert statuses[-1] == ITEM_CANCELLED
+    work_dir = download_work_dir(item["url"], item["output_dir"], encode_options(item_journal_options(item)))
+    part_sizes = list(partial_file_sizes(work_dir).values())
+    assert len(part_sizes) == 1 and SIZE // 2 <= part_sizes[0] < SIZE
+
+    # Second attempt: only the missing bytes are requested, the rest is reported as resumed
+    queue, statuses = run_queue(item)
+    queue.run()
+    assert statuses[-1] == ITEM_DONE
+    assert os.path.getsize(os.path.join(item["output_dir"], os.listdir(item["output_dir"])[0])) == SIZE
+    assert ("/resume.mp4", f"bytes={part_sizes[0]}-") in media_server.requests
+    assert queue.total_resumed() == part_sizes[0]
+    assert queue.transferred[0] == SIZE - part_sizes[0]
+
+
+def test_restarted_download_reports_nothing_resumed(media_server, tmp_path):
+    item = make_item(media_server, tmp_path, "restart.mp4")
+
+    def cancel_halfway(index, d):
+        if d["status"] == "downloading" and (d.get("downloaded_bytes") or 0) >= SIZE // 2:
+            queue.cancel(keep_resumable=True)
+            raise DownloadCancelled("Download cancelled by user.")
+
+    queue, _ = run_queue(item, cancel_halfway)
+    queue.run()
+
+    # The server ignores the Range header, so yt-dlp starts the file over
+    media_server.ranges = False
+    queue, statuses = run_queue(item)
+    queue.run()
+    assert statuses[-1] == ITEM_DONE
+    assert queue.total_resumed() == 0
+    assert queue.transferred[0] == SIZE
+
+
+def test_fresh_download_reports_nothing_resumed(media_server, tmp_path):
+    item = make_item(media_server, tmp_path, "fresh.mp4")
+    queue, statuses = run_queue(item)
+    queue.run()
+    assert statuses[-1] == ITEM_DONE
+    assert queue.total_resumed() == 0
+    assert queue.transferred[0] == SIZE
+
+
+def test_download_without_a_file_is_not_remembered_as_done(media_server, tmp_path, monkeypatch):
+    item = make_item(media_server, tmp_path, "filtered.mp4")
+    os.makedirs(item["output_dir"])
+    journal = JobJournal(str(tmp_path / "jobs.sqlite3"))
+    monkeypatch.setattr(downloader_core, "_run_download", lambda *args: (ITEM_DONE, None))
+
+    with pytest.raises(Exception, match=NO_FILE_ERROR):
+        download_item(item, lambda d: None, journal=journal)
+    [row] = journal.conn.execute("SELECT * FROM jobs").fetchall()
+    assert row["status"] == JOB_FAILED
+
+    # A done row without a result file (the output folder exists) doesn't make the next request a skip
+    journal.mark_done(row["id"])
+    assert journal.find_completed(KIND_DOWNLOAD, item["url"], item["output_dir"], item_journal_options(item)) is None
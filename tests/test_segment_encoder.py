@@ -0,0 +1,64 @@
+import re
+import shutil
+import subprocess
+
+import pytest
+
+from conftest import has_encoder
+
+pytest.importorskip("ffmpeg")
+pytestmark = pytest.mark.skipif(not shutil.which("ffmpeg"), reason="ffmpeg not installed")
+
+import segment_encoder
+from segment_encoder import encode_segmented, segment_ranges
+
+DURATION = 24
+ENCODE_OPTIONS = {"vcodec": "libx264", "preset": "ultrafast", "acodec": "aac", "fps_mode": "passthrough"}
+
+
+def make_avi(path, vcodec):
+    """Writes a test AVI with B-frames and audio (the layout the stream-copy split failed on)."""
+    subprocess.run(["ffmpeg", "-hide_banner", "-loglevel", "error", "-y",
+                    "-f", "lavfi", "-i", "testsrc=size=320x240:rate=25",
+                    "-f", "lavfi", "-i", "sine=frequency=440",
+                    "-t", str(DURATION), "-c:v", vcodec, "-bf", "2", "-g", "50", "-c:a", "mp3", str(path)],
+                   check=True)
+
+
+def measure(path):
+    """Returns (decoded video frames, container duration in seconds) of a file."""
+    result = subprocess.run(["ffmpeg", "-hide_banner", "-i", str(path), "-map", "0:v",
+                             "-fps_mode", "passthrough", "-f", "null", "-"], capture_output=True, text=True)
+    frames = int(re.findall(r"frame=\s*(\d+)", result.stderr)[-1])
+    hours, minutes, seconds = re.search(r"Duration: (\d+):(\d+):([\d.]+)", result.stderr).groups()
+    return frames, int(hours) * 3600 + int(minutes) * 60 + float(seconds)
+
+
+def test_segment_ranges_cover_duration():
+    assert segment_ranges(100, 30) == [(0, 30), (30, 60), (60, 90), (90, None)]
+    assert segment_ranges(90, 30) == [(0, 30), (30, 60), (60, None)]
+    assert segment_ranges(10, 30) == [(0, None)]
+
+
+@pytest.mark.parametrize("vcodec", ["libx264", "libxvid", "mpeg4"])
+def test_segmented_matches_single_pass(tmp_path, monkeypatch, vcodec):
+    if not has_encoder(vcodec) or not has_encoder("libx264"):
+        pytest.skip(f"ffmpeg lacks {vcodec}")
+    monkeypatch.setattr(segment_encoder, "MIN_SEGMENT_SECONDS", 5)
+    source = tmp_path / "source.avi"
+    make_avi(source, vcodec)
+    media_info = {"format": {"duration": str(DURATION), "start_time": "0"},
+                  "streams": [{"codec_type": "video"}, {"codec_type": "audio"}]}
+
+    segmented = tmp_path / "segmented.mp4"
+    encode_segmented(str(source), str(segmented), ENCODE_OPTIONS, media_info, ".mp4")
+
+    single = tmp_path / "single.mp4"
+    subprocess.run(["ffmpeg", "-hide_banner", "-loglevel", "error", "-y", "-i", str(source),
+                    "-c:v", "libx264", "-preset", "ultrafast", "-c:a", "aac", "-fps_mode", "passthrough",
+                    str(single)], check=True)
+
+    segmented_frames, segmented_duration = measure(segmented)
+    single_frames, single_duration = measure(single)
+    assert segmented_frames == single_frames
+    assert segmented_duration == pytest.approx(single_duration, abs=0.1)
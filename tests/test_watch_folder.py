@@ -0,0 +1,75 @@
+import shutil
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from conftest import make_media
+
+pytestmark = pytest.mark.skipif(not shutil.which("ffmpeg"), reason="ffmpeg not installed")
+
+import watch_folder
+from converter_core import STATUS_DONE, default_worker_count
+from media_probe import file_signature
+from watch_folder import FolderWatcher, WatchState
+
+PRESET = "mkv_to_mp4"
+
+
+@pytest.fixture
+def watch_dir(tmp_path):
+    path = tmp_path / "watch"
+    path.mkdir()
+    return path
+
+
+def make_watcher(watch_dir, tmp_path, **kwargs):
+    state = WatchState(str(tmp_path / "watch_state.sqlite3"))
+    return FolderWatcher(str(watch_dir), PRESET, settle_seconds=0, state=state, use_notifications=False, **kwargs)
+
+
+def test_output_recorded_while_settling_is_not_converted(watch_dir, tmp_path):
+    watcher = make_watcher(watch_dir, tmp_path)
+    watcher.pool = ThreadPoolExecutor(max_workers=1) # Checked by hand instead of start()
+    try:
+        output = watch_dir / "recording.mkv"
+        make_media(output, seconds=1)
+        watcher.notice(str(output))
+        assert str(output) in watcher.pending
+
+        # Another watch finishes writing its output here before the file settles
+        source = watch_dir / "source.mp4"
+        make_media(source, seconds=1)
+        watcher.state.mark_handled(file_signature(str(source)), "mp4_to_mkv", STATUS_DONE, str(output))
+        watcher.check_pending()
+        assert not watcher.pending and not watcher.active
+    finally:
+        watcher.stop()
+        watcher.state.close()
+
+
+def test_parallel_conversions_share_the_cpus(watch_dir, tmp_path, monkeypatch):
+    created = []
+
+    class RecordingConverter(watch_folder.BatchConverter):
+        def __init__(self, *args, **kwargs):
+            super().__init__(*args, **kwargs)
+            created.append(self)
+
+    monkeypatch.setattr(watch_folder, "BatchConverter", RecordingConverter)
+    watcher = make_watcher(watch_dir, tmp_path, max_workers=2)
+    assert watcher.threads == max(1, default_worker_count() // 2)
+
+    source = watch_dir / "clip.mkv"
+    make_media(source, seconds=1)
+    watcher.start()
+    try:
+        deadline = time.monotonic() + 60
+        while watcher.counts[STATUS_DONE] < 1 and time.monotonic() < deadline:
+            time.sleep(0.2)
+        assert watcher.counts[STATUS_DONE] == 1
+        assert [runner.threads for runner in created] == [watcher.threads]
+        assert (watch_dir / "clip.mp4").exists()
+    finally:
+        watcher.stop()
+        watcher.state.close()
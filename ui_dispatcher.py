@@ -0,0 +1,62 @@
+import threading
+
+# --- UI Update Dispatcher ---
+# Worker threads never touch Tk directly. They post their latest state here,
+# keyed by the widget (or row) it belongs to, and the Tk main thread drains
+# the pending updates at a fixed rate. A key posted many times between two
+# drains (e.g. a progress hook firing for every downloaded chunk) is applied
+# only once, with its newest value.
+
+DRAIN_INTERVAL_MS = 66 # ~15 updates per second
+
+
+class UIDispatcher:
+    """
+    Coalescing, thread-safe queue of UI updates, drained by the Tk main loop.
+    Keys are tuples whose first item is the owning window, e.g. (self, "status").
+    """
+    def __init__(self, root, interval_ms=DRAIN_INTERVAL_MS):
+        self.root = root
+        self.interval_ms = interval_ms
+        self.lock = threading.Lock()
+        self.pending = {} # key -> (func, args, kwargs), in first-posted order
+        self.after_id = None
+
+    def start(self):
+        """Starts draining (main thread only)."""
+        if self.after_id is None:
+            self.after_id = self.root.after(self.interval_ms, self.drain)
+
+    def stop(self):
+        """Stops draining and drops pending updates (main thread only)."""
+        if self.after_id is not None:
+            self.root.after_cancel(self.after_id)
+            self.after_id = None
+        with self.lock:
+            self.pending.clear()
+
+    def post(self, key, func, *args, **kwargs):
+        """Schedules func(*args, **kwargs) on the main thread, replacing any pending update with the same key."""
+        with self.lock:
+            self.pending[key] = (func, args, kwargs)
+
+    def discard(self, owner):
+        """Drops the pending updates of a window that is being closed."""
+        with self.lock:
+            for key in [key for key in self.pending if key[0] is owner]:
+                del self.pending[key]
+
+    def drain(self):
+        """Applies all pending updates, then schedules the next drain (main thread only)."""
+        with self.lock:
+            updates = list(self.pending.values())
+            self.pending.clear()
+
+        for func, args, kwargs in updates:
+            try:
+                func(*args, **kwargs)
+            except Exception as e:
+                # The target widget may have been destroyed meanwhile
+                print(f"UI update error: {e}")
+
+        self.after_id = self.root.after(self.interval_ms, self.drain)
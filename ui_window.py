@@ -0,0 +1,106 @@
+import os
+import sys
+import tkinter as tk
+
+import ttkbootstrap as ttk
+
+from app_config import ICON_NAME
+
+# --- Shared Window Helpers ---
+# Every window of the app sets the same icon and opens centered on the
+# screen. Windows never open taller than the screen; tall tool windows put
+# their options in a ScrollableFrame so everything stays reachable.
+
+SCREEN_MARGIN = 80 # Pixels kept free for the taskbar and title bar
+SCROLL_UNITS = 3 # Lines scrolled per mouse wheel step on Linux
+SELF_SCROLLING_CLASSES = ("Text", "Treeview", "Listbox")
+
+
+class AppWindowMixin:
+    """Icon and placement helpers shared by the app's Window and Toplevel classes."""
+    def set_app_icon(self):
+        """Sets the application icon for the window."""
+        try:
+            # Get the absolute path to the icon file
+            base_path = getattr(sys, '_MEIPASS', os.path.dirname(os.path.abspath(__file__)))
+            icon_path = os.path.join(base_path, ICON_NAME)
+
+            if os.path.exists(icon_path):
+                self.iconbitmap(icon_path)
+            else:
+                print(f"Warning: Icon file not found at {icon_path}")
+        except Exception as e:
+            print(f"Error setting icon: {e}")
+
+    def center_window(self, width, height):
+        """Centers the window on the screen, shrinking it to fit small screens."""
+        screen_width = self.winfo_screenwidth()
+        screen_height = self.winfo_screenheight()
+        width = min(width, screen_width)
+        height = min(height, screen_height - SCREEN_MARGIN)
+        x_coordinate = (screen_width / 2) - (width / 2)
+        y_coordinate = max(0, (screen_height - SCREEN_MARGIN) / 2 - (height / 2))
+        self.geometry(f"{width}x{height}+{int(x_coordinate)}+{int(y_coordinate)}")
+
+
+class ScrollableFrame(ttk.Frame):
+    """
+    Frame whose content scrolls vertically once the window is shorter than it.
+    Widgets go into .content; the scrollbar only shows when it is needed.
+    """
+    def __init__(self, master, padding=0, **kwargs):
+        super().__init__(master, **kwargs)
+        background = ttk.Style().lookup("TFrame", "background")
+        self.canvas = tk.Canvas(self, highlightthickness=0, borderwidth=0, background=background)
+        self.scrollbar = ttk.Scrollbar(self, orient="vertical", command=self.canvas.yview)
+        self.canvas.configure(yscrollcommand=self.scrollbar.set)
+        self.canvas.pack(side="left", fill="both", expand=True)
+
+        self.content = ttk.Frame(self.canvas, padding=padding)
+        self.content_id = self.canvas.create_window((0, 0), window=self.content, anchor="nw")
+        self.content.bind("<Configure>", self.on_resize)
+        self.canvas.bind("<Configure>", self.on_resize)
+        # The wheel scrolls whatever frame the pointer is over
+        self.canvas.bind("<Enter>", self.bind_wheel)
+        self.canvas.bind("<Leave>", self.unbind_wheel)
+
+    def on_resize(self, event=None):
+        """Stretches the content to the canvas width and shows the scrollbar if it doesn't fit."""
+        self.canvas.itemconfigure(self.content_id, width=self.canvas.winfo_width())
+        self.canvas.configure(scrollregion=(0, 0, self.content.winfo_reqwidth(), self.content.winfo_reqheight()))
+        if self.content.winfo_reqheight() > self.canvas.winfo_height():
+            if not self.scrollbar.winfo_ismapped():
+                self.scrollbar.pack(side="right", fill="y", before=self.canvas)
+        elif self.scrollbar.winfo_ismapped():
+            self.scrollbar.pack_forget()
+            self.canvas.yview_moveto(0)
+
+    def bind_wheel(self, event=None):
+        self.canvas.bind_all("<MouseWheel>", self.on_wheel)
+        self.canvas.bind_all("<Button-4>", self.on_wheel)
+        self.canvas.bind_all("<Button-5>", self.on_wheel)
+
+    def unbind_wheel(self, event=None):
+        # Moving onto a child widget also fires <Leave>; keep the wheel while inside
+        if event is not None and self.contains(self.winfo_containing(event.x_root, event.y_root)):
+            return
+        for sequence in ("<MouseWheel>", "<Button-4>", "<Button-5>"):
+            self.canvas.unbind_all(sequence)
+
+    def contains(self, widget):
+        """Returns True if the widget is this frame or one of its descendants."""
+        return widget is not None and str(widget).startswith(str(self))
+
+    def on_wheel(self, event):
+        """Scrolls the content (Windows/macOS wheel deltas, X11 buttons 4/5)."""
+        if not self.scrollbar.winfo_ismapped():
+            return
+        if isinstance(event.widget, str) or event.widget.winfo_class() in SELF_SCROLLING_CLASSES:
+            return # Text boxes and lists scroll themselves
+        if event.num == 4:
+            steps = -SCROLL_UNITS
+        elif event.num == 5:
+            steps = SCROLL_UNITS
+        else:
+            steps = -int(event.delta / 120) or (-1 if event.delta > 0 else 1)
+        self.canvas.yview_scroll(steps, "units")
@@ -0,0 +1,360 @@
+import os
+import time
+import sqlite3
+import threading
+import collections
+from concurrent.futures import ThreadPoolExecutor
+
+from app_config import data_path
+from converter_core import (
+    PRESETS, NATIVE_AUDIO, BatchConverter, default_worker_count, get_preset_pattern, matches_pattern,
+    plan_batch_jobs, collect_batch_files,
+    STATUS_QUEUED, STATUS_RUNNING, STATUS_DONE, STATUS_FAILED, STATUS_SKIPPED,
+)
+from media_probe import file_signature
+from job_journal import get_journal
+from job_metrics import get_metrics
+from encoder_profiles import PROFILES, get_default_profile
+
+# --- Watch Folders ---
+# Converts files as they are dropped into a folder (e.g. a share recordings
+# are saved to) with one preset. Changes are picked up from the OS's file
+# notifications (inotify on Linux) through the optional watchdog package,
+# or by rescanning the folder every few seconds without it. A file is only
+# queued once its size and modification time have stopped changing for
+# SETTLE_SECONDS, so half-copied files are never converted. Handled files
+# are remembered by size and mtime, so after a restart only files that are
+# new or changed since are converted. Usage:
+#   python main.py --watch D:\Recordings --preset mkv_to_mp4 --output D:\Converted
+
+STATE_FILE = "watch_state.sqlite3"
+SETTLE_SECONDS = 5.0 # A file must be unchanged this long before it is converted
+CHECK_INTERVAL = 1.0 # Seconds between stability checks of pending files
+POLL_INTERVAL = 5.0 # Seconds between rescans without file notifications
+# Notifications don't see files written by other machines on a network share, so rescan now and then anyway
+RESCAN_INTERVAL = 60.0
+
+FINAL_STATES = (STATUS_DONE, STATUS_SKIPPED, STATUS_FAILED) # Failed files are retried once they change
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS handled (
+    input TEXT NOT NULL,
+    preset TEXT NOT NULL,
+    size INTEGER NOT NULL,
+    mtime_ns INTEGER NOT NULL,
+    status TEXT NOT NULL,
+    output TEXT,
+    message TEXT,
+    handled REAL NOT NULL,
+    PRIMARY KEY (input, preset)
+);
+CREATE INDEX IF NOT EXISTS handled_output ON handled (output);
+"""
+
+
+class WatchState:
+    """Thread-safe SQLite record of the files watch folders have already handled."""
+    def __init__(self, path=None):
+        self.path = path or data_path(STATE_FILE)
+        self.lock = threading.Lock()
+        self.conn = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None)
+        self.conn.row_factory = sqlite3.Row
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.executescript(_SCHEMA)
+
+    def is_handled(self, signature, preset_name):
+        """True if this version of the file (path, size, mtime) was already handled with the preset."""
+        path, size, mtime_ns = signature
+        with self.lock:
+            row = self.conn.execute("SELECT size, mtime_ns FROM handled WHERE input=? AND preset=?",
+                                    (path, preset_name)).fetchone()
+        return row is not None and row["size"] == size and row["mtime_ns"] == mtime_ns
+
+    def is_output(self, path):
+        """True if path was written by a watch folder conversion (so it isn't converted again)."""
+        with self.lock:
+            return self.conn.execute("SELECT 1 FROM handled WHERE output=? LIMIT 1",
+                                     (os.path.abspath(path),)).fetchone() is not None
+
+    def mark_handled(self, signature, preset_name, status, output_file=None, message=None):
+        """Records how a version of a file was handled."""
+        path, size, mtime_ns = signature
+        output_file = os.path.abspath(output_file) if output_file else None
+        with self.lock:
+            self.conn.execute(
+                "INSERT OR REPLACE INTO handled (input, preset, size, mtime_ns, status, output, message, handled) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (path, preset_name, size, mtime_ns, status, output_file, message, time.time()))
+
+    def close(self):
+        with self.lock:
+            self.conn.close()
+
+
+def is_readable(path):
+    """True if the file can be opened (on Windows a file still being copied is locked)."""
+    try:
+        with open(path, "rb"):
+            return True
+    except OSError:
+        return False
+
+
+class _NotificationHandler:
+    """Forwards watchdog file events to a FolderWatcher."""
+    def __init__(self, watcher):
+        self.watcher = watcher
+
+    def dispatch(self, event):
+        """(THREAD) Called by the watchdog observer for every event."""
+        if event.is_directory:
+            return
+        for path in (event.src_path, getattr(event, "dest_path", None)):
+            if path:
+                self.watcher.notice(os.fsdecode(path))
+
+
+class FolderWatcher:
+    """
+    Watches a folder and converts every new or changed file matching the
+    preset's pattern on a bounded pool of workers, one single-item batch per
+    file (journaled and recorded in the metrics like any other conversion).
+    on_event(input_file, status, message) is invoked from worker threads;
+    the caller must marshal it to the UI.
+    """
+    def __init__(self, folder, preset_name, output_folder=None, recursive=False, max_workers=None,
+                 profile=None, settle_seconds=SETTLE_SECONDS, state=None, on_event=None, use_notifications=True):
+        self.folder = os.path.abspath(folder)
+        self.preset_name = preset_name
+        self.output_folder = os.path.abspath(output_folder or folder)
+        self.pattern = get_preset_pattern(preset_name)
+        self.recursive = recursive
+        self.max_workers = max(1, max_workers or default_worker_count())
+        # Encoder threads per conversion, so parallel files share the CPUs instead of oversubscribing them
+        self.threads = max(1, default_worker_count() // self.max_workers)
+        self.profile = profile
+        self.settle_seconds = settle_seconds
+        self.state = state or get_watch_state()
+        self.on_event = on_event
+        self.use_notifications = use_notifications
+
+        self.lock = threading.Lock()
+        self.stop_event = threading.Event()
+        self.pending = {} # Path -> (signature, monotonic time it last changed)
+        self.active = set() # Paths queued or converting
+        self.runners = set() # Running single-item batches, for cancelling
+        self.counts = collections.Counter() # Finished files per status
+        self.pool = None
+        self.observer = None
+
+    def mode(self):
+        """Returns how changes are detected, for status messages."""
+        if self.observer is not None:
+            return "file notifications"
+        return f"rescanning every {POLL_INTERVAL:.0f}s"
+
+    def start(self):
+        """Starts watching in background threads and returns immediately."""
+        self.pool = ThreadPoolExecutor(max_workers=self.max_workers)
+        if self.use_notifications:
+            self.observer = self._start_observer()
+        threading.Thread(target=self.run, daemon=True).start()
+
+    def _start_observer(self):
+        """Subscribes to file notifications through watchdog; returns None if it isn't installed."""
+        try:
+            from watchdog.observers import Observer
+        except ImportError:
+            return None
+        observer = Observer()
+        observer.daemon = True
+        try:
+            observer.schedule(_NotificationHandler(self), self.folder, recursive=self.recursive)
+            observer.start()
+        except OSError as e:
+            print(f"Watch folder: file notifications unavailable ({e}), rescanning instead.")
+            return None
+        return observer
+
+    def stop(self):
+        """Stops watching, drops queued files and cancels running conversions."""
+        self.stop_event.set()
+        if self.observer is not None:
+            self.observer.stop()
+            self.observer.join(timeout=5)
+        with self.lock:
+            self.pending.clear()
+            runners = list(self.runners)
+        for runner in runners:
+            runner.cancel()
+        if self.pool is not None:
+            self.pool.shutdown(wait=False, cancel_futures=True)
+
+    def run(self):
+        """(THREAD) Picks up files added while stopped, then converts files as they settle."""
+        self.scan()
+        scanned_at = time.monotonic()
+        interval = RESCAN_INTERVAL if self.observer is not None else POLL_INTERVAL
+        while not self.stop_event.wait(CHECK_INTERVAL):
+            if time.monotonic() - scanned_at >= interval:
+                self.scan()
+                scanned_at = time.monotonic()
+            self.check_pending()
+
+    def scan(self):
+        """Notices every matching file in the folder."""
+        try:
+            for path in collect_batch_files(self.folder, self.pattern, self.recursive):
+                self.notice(path)
+        except OSError as e:
+            print(f"Watch folder: could not scan '{self.folder}': {e}")
+
+    def notice(self, path):
+        """Marks a file as possibly new or changed (from a notification or a scan)."""
+        path = os.path.abspath(path)
+        with self.lock:
+            if self.stop_event.is_set() or path in self.pending or path in self.active:
+                return
+        if not self.matches(path):
+            return
+        signature = file_signature(path)
+        if signature is None or self.state.is_handled(signature, self.preset_name):
+            return
+        with self.lock:
+            if path not in self.pending and path not in self.active:
+                self.pending[path] = (signature, time.monotonic())
+
+    def matches(self, path):
+        """True if path is an input file of this watch (not a hidden temp file or one of its outputs)."""
+        name = os.path.basename(path)
+        if name.startswith(".") or not matches_pattern(name, self.pattern):
+            return False
+        folder = os.path.dirname(path)
+        if folder != self.folder and not (self.recursive and folder.startswith(self.folder + os.sep)):
+            return False
+        return not self.state.is_output(path)
+
+    def check_pending(self):
+        """Queues the pending files that have stopped changing."""
+        now = time.monotonic()
+        with self.lock:
+            pending = list(self.pending.items())
+        ready = []
+        for path, (signature, changed_at) in pending:
+            current = file_signature(path)
+            with self.lock:
+                if path not in self.pending:
+                    continue # Dropped by stop()
+                if current is None:
+                    del self.pending[path] # Deleted or moved away before it settled
+                elif current != signature:
+                    self.pending[path] = (current, now) # Still growing
+                elif now - changed_at >= self.settle_seconds and is_readable(path):
+                    del self.pending[path]
+                    self.active.add(path)
+                    ready.append((path, signature))
+        for path, signature in ready:
+            # An output may be recorded while its file is still settling (another watch writing here)
+            if self.state.is_output(path):
+                with self.lock:
+                    self.active.discard(path)
+                continue
+            self._report(path, STATUS_QUEUED, "")
+            self.pool.submit(self.convert, path, signature)
+
+    def convert(self, path, signature):
+        """(WORKER) Converts one settled file through a single-item BatchConverter."""
+        outcome = {}
+
+        def on_status(index, status, message):
+            outcome.update(status=status, message=message)
+            self._report(path, status, message)
+
+        runner = None
+        try:
+            [(preset_name, input_file, output_file)] = plan_batch_jobs(self.preset_name, [path], self.folder,
+                                                                      self.output_folder)
+            runner = BatchConverter([(preset_name, input_file, output_file)], max_workers=1,
+                                    journal=get_journal(), metrics=get_metrics(),
+                                    on_status=on_status, profile=self.profile, threads=self.threads)
+            with self.lock:
+                if self.stop_event.is_set():
+                    return
+                self.runners.add(runner)
+            runner.run()
+            if outcome.get("status") in FINAL_STATES:
+                self.state.mark_handled(signature, self.preset_name, outcome["status"], output_file,
+                                        outcome.get("message"))
+        except Exception as e:
+            self.state.mark_handled(signature, self.preset_name, STATUS_FAILED, message=str(e))
+            on_status(0, STATUS_FAILED, str(e))
+        finally:
+            with self.lock:
+                self.runners.discard(runner)
+                self.active.discard(path)
+        self.notice(path) # Changed again while it was converting?
+
+    def _report(self, path, status, message):
+        """Counts finished files and forwards a status change to the caller."""
+        if status in FINAL_STATES:
+            with self.lock:
+                self.counts[status] += 1
+        if self.on_event:
+            self.on_event(path, status, message)
+
+
+# --- Headless Mode ---
+
+def print_event(path, status, message):
+    """Prints a file's status changes (not its progress updates)."""
+    if status == STATUS_RUNNING and message:
+        return
+    print(f"[watch] {os.path.basename(path)}: {status}" + (f" ({message})" if message else ""))
+
+
+def watch(folder, preset_name, output_folder=None, recursive=False, max_workers=None, profile=None):
+    """Converts files dropped into folder until interrupted (Ctrl+C)."""
+    if preset_name not in PRESETS and preset_name != NATIVE_AUDIO:
+        print(f"Unknown preset '{preset_name}' (use one of {', '.join(list(PRESETS) + [NATIVE_AUDIO])})")
+        return
+    profile = profile or get_default_profile()
+    if profile not in PROFILES:
+        print(f"Unknown profile '{profile}' (use one of {', '.join(PROFILES)})")
+        return
+    if not os.path.isdir(folder):
+        print(f"Watch folder not found: '{folder}'")
+        return
+
+    watcher = FolderWatcher(folder, preset_name, output_folder, recursive, max_workers, profile,
+                            on_event=print_event)
+    watcher.start()
+    print(f"Watching '{watcher.folder}' for {get_preset_pattern(preset_name)} -> '{watcher.output_folder}' "
+          f"({watcher.mode()}, {watcher.max_workers} workers, profile {profile})")
+    try:
+        while not watcher.stop_event.wait(1):
+            pass
+    except KeyboardInterrupt:
+        print("Stopping watcher...")
+    finally:
+        watcher.stop()
+
+
+# --- Shared Instance ---
+
+_watch_state = None
+_state_lock = threading.Lock()
+
+
+def get_watch_state():
+    """Returns the shared record of handled files."""
+    global _watch_state
+    with _state_lock:
+        if _watch_state is None:
+            _watch_state = WatchState()
+        return _watch_state
+
+
+if __name__ == "__main__":
+    print("ERROR: This file cannot be run directly.")
+    print("Please run 'main.py --watch <folder> --preset <preset>' instead.")
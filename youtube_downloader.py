@@ -1,18 +1,22 @@
 import ttkbootstrap as ttk
 from ttkbootstrap.constants import *
-from tkinter import filedialog
-import yt_dlp
-import threading
+from tkinter import filedialog, TclError
+import json
 import os 
-import sys # Added for icon path
-
-# Import ICON_NAME from main.py config
-try:
-    from main import ICON_NAME
-except ImportError:
-    ICON_NAME = "favicon.ico" # Fallback
+import threading
 
-class YouTubeDownloader(ttk.Toplevel):
+from ui_window import AppWindowMixin, ScrollableFrame
+from job_journal import get_journal, KIND_DOWNLOAD
+from job_metrics import get_metrics
+from info_cache import get_info_cache, describe_formats
+from bandwidth import get_bandwidth_scheduler, save_limit
+from download_library import get_library
+from downloader_core import (
+    DownloadQueue, parse_url_list, DEFAULT_PARALLEL_DOWNLOADS, MAX_PARALLEL_DOWNLOADS,
+    ITEM_QUEUED, ITEM_DOWNLOADING, ITEM_RETRYING, ITEM_DONE, ITEM_SKIPPED, ITEM_FAILED, friendly_error,
+)
+
+class YouTubeDownloader(AppWindowMixin, ttk.Toplevel):
     """
     Toplevel window for downloading YouTube media (video or audio).
     """
@@ -21,53 +25,77 @@ class YouTubeDownloader(ttk.Toplevel):
         self.main_app = main_app
         self.title("YouTube Media Downloader")
         
-        self.geometry("500x750") # Height increased to 750px
-        self.center_window(500, 750)
-        self.resizable(False, False)
+        self.geometry("560x1020") # Height for the download queue
+        self.center_window(560, 1020) # Shrinks to fit small screens; the options scroll
+        self.minsize(560, 300)
         
         self.cookie_file_path = None
         self.is_closing = False # Flag to stop threads
+        self.dispatcher = main_app.dispatcher # Applies UI updates posted by worker threads
+        self.queue = None # Running DownloadQueue
+        self.row_ids = []
+        self.item_percents = []
+        self.resolve_after_id = None # Pending debounce of the URL box
+        self.resolved_urls = set() # URLs already sent to the info cache
         
         self.set_app_icon()
         self.create_widgets()
 
-    def set_app_icon(self):
-        """Sets the application icon for the window."""
-        try:
-            # Get the absolute path to the icon file
-            base_path = getattr(sys, '_MEIPASS', os.path.dirname(os.path.abspath(__file__)))
-            icon_path = os.path.join(base_path, ICON_NAME)
-            
-            if os.path.exists(icon_path):
-                self.iconbitmap(icon_path)
-            else:
-                print(f"Warning: Icon file not found at {icon_path}")
-        except Exception as e:
-            print(f"Error setting icon: {e}")
-
-    def center_window(self, width, height):
-        """Centers the window on the screen."""
-        screen_width = self.winfo_screenwidth()
-        screen_height = self.winfo_screenheight()
-        x_coordinate = (screen_width / 2) - (width / 2)
-        y_coordinate = (screen_height / 2) - (height / 2)
-        self.geometry(f"{width}x{height}+{int(x_coordinate)}+{int(y_coordinate)}")
-
     def create_widgets(self):
         """Creates and places all widgets in the downloader window."""
-        main_frame = ttk.Frame(self, padding="20")
-        main_frame.pack(expand=True, fill="both")
+        # Packed first and outside the scroll area so they stay visible on small screens
+        button_frame = ttk.Frame(self, padding=(20, 10))
+        button_frame.pack(side="bottom", fill="x")
+
+        back_button = ttk.Button(button_frame, text="Back", command=self.go_back, bootstyle="secondary-outline")
+        back_button.pack(side="left", expand=True, padx=5)
+
+        exit_button = ttk.Button(button_frame, text="Exit App", command=self.exit_app, bootstyle="danger")
+        exit_button.pack(side="left", expand=True, padx=5)
+
+        scroll_frame = ScrollableFrame(self, padding=(20, 20, 20, 0))
+        scroll_frame.pack(expand=True, fill="both")
+        main_frame = scroll_frame.content
 
         label_header = ttk.Label(main_frame, text="YouTube Downloader", 
                                   bootstyle="primary", font=("Segoe UI", 16, "bold"), 
                                   anchor="center")
         label_header.pack(pady=10, fill="x")
 
-        label_url = ttk.Label(main_frame, text="Video URL:")
+        label_url = ttk.Label(main_frame, text="Video URLs (one per line):")
         label_url.pack(pady=5, anchor="w")
 
-        self.entry_url = ttk.Entry(main_frame, width=60)
-        self.entry_url.pack(pady=5, fill="x")
+        self.url_text = ttk.Text(main_frame, height=4, width=60, wrap="none")
+        self.url_text.pack(pady=5, fill="x")
+        # Resolve formats shortly after the user stops typing or pastes
+        self.url_text.bind("<KeyRelease>", self.schedule_resolve)
+        self.url_text.bind("<<Paste>>", self.schedule_resolve)
+
+        url_tools_frame = ttk.Frame(main_frame)
+        url_tools_frame.pack(fill="x")
+
+        (ttk.Button(url_tools_frame, text="Import .txt", command=self.import_url_file,
+                    bootstyle="secondary-outline")
+            .pack(side="left", padx=5))
+
+        self.workers_var = ttk.IntVar(value=DEFAULT_PARALLEL_DOWNLOADS)
+        (ttk.Spinbox(url_tools_frame, from_=1, to=MAX_PARALLEL_DOWNLOADS, width=4,
+                     textvariable=self.workers_var)
+            .pack(side="right", padx=5))
+        ttk.Label(url_tools_frame, text="Parallel downloads:").pack(side="right")
+
+        # Global bandwidth budget shared by all running downloads (0 = unlimited)
+        limit = get_bandwidth_scheduler().limit
+        self.limit_var = ttk.DoubleVar(value=round(limit / 1024 ** 2, 1) if limit else 0)
+        (ttk.Spinbox(url_tools_frame, from_=0, to=1000, increment=0.5, width=5,
+                     textvariable=self.limit_var)
+            .pack(side="right", padx=5))
+        ttk.Label(url_tools_frame, text="Limit MiB/s:").pack(side="right")
+        self.limit_var.trace_add("write", self.apply_bandwidth_limit)
+
+        self.formats_label = ttk.Label(main_frame, text="", font=("Segoe UI", 9),
+                                       bootstyle="secondary", wraplength=500)
+        self.formats_label.pack(pady=(5, 0), fill="x")
 
         # --- Download Type (Video/Audio) ---
         self.type_frame = ttk.Labelframe(main_frame, text="Download Type", padding=10)
@@ -90,6 +118,18 @@ class YouTubeDownloader(ttk.Toplevel):
                                       bootstyle="toolbutton")
         radio_audio.pack(side="left", padx=0, pady=0, fill="x", expand=True)
 
+        # Playlist/channel URLs: download only the entries missing from the archive
+        self.playlist_var = ttk.BooleanVar(value=False)
+        ttk.Checkbutton(self.type_frame, text="Sync playlist / channel (only new videos)",
+                        variable=self.playlist_var,
+                        bootstyle="round-toggle").pack(pady=(10, 0), anchor="w")
+
+        # Audio mode: pipe the download into the MP3 encoder instead of converting afterwards
+        self.stream_var = ttk.BooleanVar(value=True)
+        ttk.Checkbutton(self.type_frame, text="Encode MP3 while downloading (audio only)",
+                        variable=self.stream_var,
+                        bootstyle="round-toggle").pack(pady=(5, 0), anchor="w")
+
         # --- Resolution Selection ---
         self.resolution_frame = ttk.Labelframe(main_frame, text="Resolution", padding=10)
         # We pack this later in toggle_resolution_frame() to fix the layout bug
@@ -121,31 +161,76 @@ class YouTubeDownloader(ttk.Toplevel):
         feedback_frame = ttk.Labelframe(main_frame, text="Download Progress", padding=10)
         feedback_frame.pack(pady=10, fill="x")
 
+        list_frame = ttk.Frame(feedback_frame)
+        list_frame.pack(fill="both", expand=True)
+
+        self.queue_tree = ttk.Treeview(list_frame, columns=("item", "status", "progress", "speed"),
+                                       show="headings", height=6)
+        for column, text, width in (("item", "Video", 250), ("status", "Status", 110),
+                                    ("progress", "Progress", 70), ("speed", "Speed", 80)):
+            self.queue_tree.heading(column, text=text)
+            self.queue_tree.column(column, width=width)
+        self.queue_tree.pack(side="left", fill="both", expand=True)
+
+        scrollbar = ttk.Scrollbar(list_frame, orient="vertical", command=self.queue_tree.yview)
+        scrollbar.pack(side="right", fill="y")
+        self.queue_tree.configure(yscrollcommand=scrollbar.set)
+
         self.status_label = ttk.Label(feedback_frame, text="Waiting for download...", anchor="center")
         self.status_label.pack(pady=5, fill="x")
         
         self.progress_bar = ttk.Progressbar(feedback_frame, orient='horizontal', 
                                             mode='determinate', 
                                             bootstyle="success-striped")
-        self.progress_bar.pack(pady=10, fill="x")
+        self.progress_bar.pack(pady=5, fill="x")
+
+        self.throughput_label = ttk.Label(feedback_frame, text="", anchor="center", font=("Segoe UI", 9))
+        self.throughput_label.pack(fill="x")
 
         # --- Action Buttons ---
-        download_button = ttk.Button(main_frame, text="Download", 
-                                     command=self.start_download_thread, 
-                                     bootstyle="primary", padding=10)
-        download_button.pack(pady=10, fill="x")
+        action_frame = ttk.Frame(main_frame)
+        action_frame.pack(pady=10, fill="x")
 
-        button_frame = ttk.Frame(main_frame)
-        button_frame.pack(pady=10, fill="x")
+        self.download_button = ttk.Button(action_frame, text="Download All", 
+                                          command=self.start_download_thread, 
+                                          bootstyle="primary", padding=10)
+        self.download_button.pack(side="left", fill="x", expand=True, padx=(0, 5))
 
-        back_button = ttk.Button(button_frame, text="Back", command=self.go_back, bootstyle="secondary-outline")
-        back_button.pack(side="left", expand=True, padx=5)
+        self.cancel_button = ttk.Button(action_frame, text="Cancel", command=self.cancel_downloads,
+                                        bootstyle="danger-outline", padding=10, state="disabled")
+        self.cancel_button.pack(side="left")
 
-        exit_button = ttk.Button(button_frame, text="Exit App", command=self.exit_app, bootstyle="danger")
-        exit_button.pack(side="left", expand=True, padx=5)
+        (ttk.Button(action_frame, text="Library...", command=self.open_library_window,
+                    bootstyle="info-outline", padding=10)
+            .pack(side="left", padx=(5, 0)))
+
+        # Shown only when the journal holds downloads interrupted by a crash or close
+        self.resume_button = ttk.Button(main_frame, text="Resume Unfinished Downloads",
+                                        command=self.resume_unfinished_downloads,
+                                        bootstyle="warning-outline")
+        self.resume_button.pack(pady=5, fill="x", after=action_frame)
 
         # Initial call to set the correct UI state
         self.toggle_resolution_frame()
+        self.refresh_resume_button()
+
+    def refresh_resume_button(self):
+        """Shows the resume button if the journal holds unfinished downloads."""
+        try:
+            pending = len(get_journal().unfinished(KIND_DOWNLOAD))
+        except Exception as e:
+            print(f"Journal error: {e}")
+            pending = 0
+
+        if pending:
+            self.resume_button.config(text=f"Resume Unfinished Downloads ({pending})", state="normal")
+        else:
+            self.resume_button.pack_forget()
+
+    def open_library_window(self):
+        """Opens the download library window."""
+        if not self.is_closing:
+            LibraryWindow(self)
 
     def toggle_resolution_frame(self):
         """Shows or hides the resolution selection frame based on download type."""
@@ -169,57 +254,88 @@ class YouTubeDownloader(ttk.Toplevel):
         else:
             self.cookie_file_path = None
             self.cookie_status_label.config(text="Status: No cookies loaded.", bootstyle="warning")
+        # Cached info is per cookie file: resolve again with the new cookies
+        self.resolved_urls.clear()
+        self.schedule_resolve()
 
-    def on_progress(self, d):
-        """Progress hook for yt-dlp to update the UI."""
-        if self.is_closing: # Stop processing if window is closing
-            raise yt_dlp.utils.DownloadError("Download cancelled by user.")
-
-        if d['status'] == 'downloading':
-            total_bytes_str = d.get('total_bytes') or d.get('total_bytes_estimate')
-            if total_bytes_str:
-                total_bytes = int(total_bytes_str)
-                downloaded_bytes = int(d.get('downloaded_bytes'))
-                percent = (downloaded_bytes / total_bytes) * 100
-                self.progress_bar['value'] = percent
-            
-            percent_str = d.get('_percent_str', '...').strip()
-            speed_str = d.get('_speed_str', '...').strip()
-            eta_str = d.get('_eta_str', '...').strip()
-            
-            status_message = f"Downloading: {percent_str} | Speed: {speed_str} | ETA: {eta_str}"
-            self.update_status_safe(status_message, "info")
-
-        elif d['status'] == 'finished':
-            self.progress_bar['value'] = 100
-            self.update_status_safe("Download finished. Finalizing (merging)...", "info")
+    def import_url_file(self):
+        """Appends the URLs of a text file (one per line) to the URL box."""
+        file_path = filedialog.askopenfilename(
+            title="Select URL list",
+            filetypes=[("Text Files", "*.txt")]
+        )
+        if not file_path:
+            return
+        try:
+            with open(file_path, encoding="utf-8-sig") as f:
+                urls = parse_url_list(f.read())
+        except OSError as e:
+            self.update_status_safe(f"Error: {e}", style="danger")
+            return
+
+        existing = parse_url_list(self.url_text.get("1.0", "end"))
+        new_urls = [url for url in urls if url not in existing]
+        if new_urls:
+            if existing:
+                self.url_text.insert("end", "\n")
+            self.url_text.insert("end", "\n".join(new_urls))
+            self.schedule_resolve()
+        self.update_status_safe(f"Imported {len(new_urls)} URLs from {os.path.basename(file_path)}", "success")
+
+    # --- Format Pre-Resolution ---
+
+    def schedule_resolve(self, event=None):
+        """Resolves the entered URLs once the URL box has been idle for a moment."""
+        if self.resolve_after_id is not None:
+            self.after_cancel(self.resolve_after_id)
+        self.resolve_after_id = self.after(800, self.start_resolve_thread)
+
+    def start_resolve_thread(self):
+        """Starts resolving the URLs that haven't been resolved yet."""
+        self.resolve_after_id = None
+        if self.is_closing or self.playlist_var.get():
+            return # Playlists are listed by the sync itself
+        urls = [url for url in parse_url_list(self.url_text.get("1.0", "end")) if url not in self.resolved_urls]
+        if not urls:
+            return
+        self.resolved_urls.update(urls)
+        threading.Thread(target=self.resolve_urls, args=(urls, self.cookie_file_path), daemon=True).start()
+
+    def resolve_urls(self, urls, cookie_file):
+        """(THREAD) Extracts the info of each URL into the shared cache and shows its formats."""
+        info_cache = get_info_cache()
+        for url in urls:
+            if self.is_closing:
+                return
+            self.run_on_ui("formats", self.formats_label.config, text="Resolving formats...")
+            try:
+                info = info_cache.resolve(url, cookie_file)
+                summary = f"{info.get('title') or url}: {describe_formats(info)}"
+            except Exception as e:
+                self.resolved_urls.discard(url) # Try again on the next edit
+                summary = f"Could not resolve {url}: {friendly_error(e)}"
+            self.run_on_ui("formats", self.formats_label.config, text=summary)
 
     def update_status_safe(self, message, style="success"):
-        """Safely updates the status label from the download thread."""
+        """Safely updates the status label from any thread."""
+        self.run_on_ui("status", self.status_label.config, text=message, bootstyle=style)
+
+    def run_on_ui(self, name, func, *args, **kwargs):
+        """
+        Schedules func on the Tk main thread, from any thread. Only the newest
+        pending update of each name is applied.
+        """
         if self.is_closing:
             return
-        try:
-            self.after(0, lambda: self.status_label.config(text=message, bootstyle=style))
-        except Exception as e:
-            # This can happen if the window is destroyed
-            print(f"UI update error (safe): {e}")
+        self.dispatcher.post((self, name), func, *args, **kwargs)
 
     def start_download_thread(self):
-        """Starts the download process in a separate thread."""
-        if self.is_closing: return
-        
-        self.update_status_safe("Starting download...", style="info")
-        self.progress_bar['value'] = 0
-        self.progress_bar.config(bootstyle="success-striped")
-        
-        download_thread = threading.Thread(target=self.download_media, daemon=True)
-        download_thread.start()
-
-    def download_media(self):
-        """The core download logic that runs in a thread."""
-        youtube_url = self.entry_url.get()
-        if not youtube_url:
-            self.update_status_safe("Please enter a URL", style="danger")
+        """Reads the inputs in the main thread and starts the download queue."""
+        if self.is_closing or self.queue is not None: return
+
+        urls = parse_url_list(self.url_text.get("1.0", "end"))
+        if not urls:
+            self.update_status_safe("Please enter at least one URL", style="danger")
             return
 
         output_dir = filedialog.askdirectory(title="Select Download Directory")
@@ -228,60 +344,157 @@ class YouTubeDownloader(ttk.Toplevel):
             return
 
         download_type = self.download_type.get()
-        
+        resolution = self.resolution_var.get()
+        playlist = self.playlist_var.get()
+        stream = self.stream_var.get()
+        items = [{"url": url, "output_dir": output_dir, "type": download_type, "resolution": resolution,
+                  "playlist": playlist, "stream": stream}
+                 for url in urls]
+        self.start_queue(items)
+
+    def resume_unfinished_downloads(self):
+        """Continues the downloads left unfinished by the last session."""
+        if self.is_closing or self.queue is not None: return
+        jobs = get_journal().unfinished(KIND_DOWNLOAD)
+        self.resume_button.pack_forget()
+        if not jobs:
+            return
+
+        items = []
+        for job in jobs:
+            options = json.loads(job["options"])
+            items.append({"url": job["input"], "output_dir": job["output"],
+                          "type": options["type"], "resolution": options["resolution"],
+                          "playlist": options.get("playlist", False), "stream": options.get("stream", True)})
+        self.start_queue(items)
+
+    def apply_bandwidth_limit(self, *args):
+        """Applies the limit field to the bandwidth scheduler (running downloads follow at once)."""
         try:
-            if download_type == "video":
-                resolution = self.resolution_var.get()
-                if resolution == "best":
-                    format_string = "bestvideo[ext=mp4]+bestaudio[ext=m4a]/best[ext=mp4]/best"
-                else:
-                    format_string = f"bestvideo[height<={resolution}][ext=mp4]+bestaudio[ext=m4a]/best[height<={resolution}][ext=mp4]/best"
-                
-                ydl_opts = {
-                    'format': format_string,
-                    'outtmpl': f'{output_dir}/%(title)s.%(ext)s',
-                    'merge_output_format': 'mp4',
-                    'progress_hooks': [self.on_progress],
-                }
-            else: # Audio
-                ydl_opts = {
-                    'format': 'bestaudio/best',
-                    'outtmpl': f'{output_dir}/%(title)s.mp3', # Force .mp3 extension
-                    'postprocessors': [{
-                        'key': 'FFmpegExtractAudio',
-                        'preferredcodec': 'mp3',
-                        'preferredquality': '192',
-                    }],
-                    'progress_hooks': [self.on_progress],
-                }
-
-            if self.cookie_file_path:
-                ydl_opts['cookiefile'] = self.cookie_file_path
-
-            with yt_dlp.YoutubeDL(ydl_opts) as ydl:
-                ydl.download([youtube_url])
-            
-            if self.is_closing: return
-            self.update_status_safe("Download Successful!", style="success")
-            self.progress_bar['value'] = 100
-        
-        except Exception as e:
-            if self.is_closing: return # Don't show error if user just closed the window
-            
-            print(f"Download Error: {e}")
-            error_message = str(e)
-            
-            self.progress_bar['value'] = 100
-            self.progress_bar.config(bootstyle="danger-striped")
+            limit = int(float(self.limit_var.get()) * 1024 ** 2) or None
+        except (ValueError, TclError):
+            return # Half-typed value
+        get_bandwidth_scheduler().set_limit(limit)
+        save_limit(limit)
+
+    def start_queue(self, items):
+        """Fills the queue list and starts downloading the items."""
+        self.queue_tree.delete(*self.queue_tree.get_children())
+        self.row_ids = [self.queue_tree.insert("", "end", values=(item["url"], ITEM_QUEUED, "", ""))
+                        for item in items]
+        self.item_percents = [0.0] * len(items)
+
+        self.progress_bar['value'] = 0
+        self.progress_bar.config(bootstyle="success-striped")
+        self.download_button.config(state="disabled")
+        self.cancel_button.config(state="normal")
+
+        try:
+            workers = int(self.workers_var.get())
+        except (ValueError, TclError):
+            workers = DEFAULT_PARALLEL_DOWNLOADS
+
+        self.queue = DownloadQueue(items, max_workers=workers, cookie_file=self.cookie_file_path,
+                                   journal=get_journal(), metrics=get_metrics(),
+                                   on_status=self.on_item_status,
+                                   on_progress=self.on_progress,
+                                   on_throughput=self.on_throughput,
+                                   on_finished=self.on_queue_finished)
+        self.update_status_safe(f"Downloading {len(items)} items, {self.queue.max_workers} at a time...", "info")
+        self.queue.start()
+
+    def cancel_downloads(self):
+        """Cancels the running queue."""
+        if self.queue is not None:
+            self.queue.cancel()
+            self.update_status_safe("Cancelling downloads...", style="warning")
+
+    # --- Queue Callbacks (called from worker threads) ---
+
+    def on_item_status(self, index, status, message):
+        """(WORKER) Shows the status of one queue item."""
+        self.run_on_ui(("item_status", index), self.set_item_status, index, status, message)
+
+    def set_item_status(self, index, status, message):
+        """Updates the status column of one row (main thread only)."""
+        row_id = self.row_ids[index]
+        if status in (ITEM_DONE, ITEM_SKIPPED):
+            self.item_percents[index] = 100.0
+            self.queue_tree.set(row_id, "progress", "100%")
+            if message:
+                self.queue_tree.set(row_id, "item", os.path.basename(message))
+        elif status == ITEM_FAILED:
+            self.item_percents[index] = 100.0
+            self.queue_tree.set(row_id, "progress", message)
+        elif status == ITEM_RETRYING:
+            self.update_status_safe(f"Retrying item {index + 1} {message}", "warning")
+        if status != ITEM_DOWNLOADING:
+            self.queue_tree.set(row_id, "speed", "")
+        self.queue_tree.set(row_id, "status", status)
+        self.update_total_progress()
+
+    def on_progress(self, index, d):
+        """(WORKER) yt-dlp progress of one queue item."""
+        if d['status'] != 'downloading':
+            return
 
-            if "This video is unavailable" in error_message:
-                self.update_status_safe("Error: Video is unavailable", style="danger")
-            elif "Sign in" in error_message:
-                 self.update_status_safe("ERROR: YouTube 'Bot' Block! Use 'Load Cookies.txt'.", style="danger")
-            else:
-                # Get the first line of the error, clean it
-                clean_error = error_message.splitlines()[0].replace('ERROR: ', '')
-                self.update_status_safe(f"Error: {clean_error}", style="danger")
+        percent = None
+        total_bytes = d.get('total_bytes') or d.get('total_bytes_estimate')
+        if total_bytes:
+            percent = (int(d.get('downloaded_bytes') or 0) / int(total_bytes)) * 100
+
+        title = (d.get('info_dict') or {}).get('title')
+        percent_str = d.get('_percent_str', '...').strip()
+        speed_str = d.get('_speed_str', '...').strip()
+        self.run_on_ui(("item_progress", index), self.set_item_progress, index, title, percent, percent_str, speed_str)
+
+    def set_item_progress(self, index, title, percent, percent_str, speed_str):
+        """Updates the progress columns of one row (main thread only)."""
+        row_id = self.row_ids[index]
+        if title:
+            self.queue_tree.set(row_id, "item", title)
+        self.queue_tree.set(row_id, "progress", percent_str)
+        self.queue_tree.set(row_id, "speed", speed_str)
+        if percent is not None:
+            self.item_percents[index] = min(percent, 100.0)
+            self.update_total_progress()
+
+    def update_total_progress(self):
+        """Sets the aggregate progress bar from the per-item percentages (main thread only)."""
+        if self.item_percents:
+            self.progress_bar['value'] = sum(self.item_percents) / len(self.item_percents)
+
+    def on_throughput(self, bytes_per_second, completed, total):
+        """(WORKER) Shows the combined speed of all running downloads."""
+        message = f"Total: {bytes_per_second / 1024 ** 2:.2f} MiB/s | Finished: {completed} / {total}"
+        budget = get_bandwidth_scheduler().budget
+        if budget:
+            message += f" | Limit: {budget / 1024 ** 2:.1f} MiB/s"
+        queue = self.queue
+        resumed = queue.total_resumed() if queue is not None else 0
+        if resumed:
+            message += f" | Resumed: {resumed / 1024 ** 2:.1f} MiB"
+        self.run_on_ui("throughput", self.throughput_label.config, text=message)
+
+    def on_queue_finished(self, completed, failed, cancelled):
+        """(WORKER) Called once every item of the queue has ended."""
+        resumed = self.queue.total_resumed() if self.queue is not None else 0
+        self.run_on_ui("finished", self.show_queue_finished, completed, failed, cancelled, resumed)
+
+    def show_queue_finished(self, completed, failed, cancelled, resumed=0):
+        """Resets the buttons once the queue has ended (main thread only)."""
+        self.queue = None
+        self.download_button.config(state="normal")
+        self.cancel_button.config(state="disabled")
+        if cancelled:
+            self.update_status_safe(f"Downloads cancelled after {completed} items | Failed: {failed}", "warning")
+        elif failed:
+            self.progress_bar.config(bootstyle="danger-striped")
+            self.update_status_safe(f"Finished: {completed - failed} downloaded, {failed} failed", "danger")
+        else:
+            self.progress_bar['value'] = 100
+            saved = f" ({resumed / 1024 ** 2:.1f} MiB resumed from partial files)" if resumed else ""
+            self.update_status_safe(f"Download Successful!{saved}", style="success")
 
     def go_back(self):
         """Closes this window and shows the main menu."""
@@ -291,9 +504,166 @@ class YouTubeDownloader(ttk.Toplevel):
     def close_window(self):
         """Safely closes the window and sets the closing flag."""
         self.is_closing = True 
+        if self.queue is not None:
+            self.queue.cancel(keep_resumable=True) # Unfinished items stay resumable
+        if self.resolve_after_id is not None:
+            self.after_cancel(self.resolve_after_id)
+        self.dispatcher.discard(self)
         self.destroy() 
 
     def exit_app(self):
         """Exits the entire application."""
         self.is_closing = True 
-        self.main_app.exit_app()
\ No newline at end of file
+        if self.queue is not None:
+            self.queue.cancel(keep_resumable=True)
+        self.main_app.exit_app()
+
+
+class LibraryWindow(AppWindowMixin, ttk.Toplevel):
+    """
+    Toplevel window for searching the download library and checking it
+    against the files on disk.
+    """
+    def __init__(self, downloader):
+        super().__init__(downloader)
+        self.downloader = downloader
+        self.title("Download Library")
+
+        self.geometry("700x520")
+        self.center_window(700, 520)
+        self.resizable(False, False)
+
+        self.is_closing = False
+        self.dispatcher = downloader.dispatcher
+        self.search_after_id = None # Pending debounce of the search box
+        self.checking = False
+
+        self.set_app_icon()
+        self.create_widgets()
+        self.protocol("WM_DELETE_WINDOW", self.close_window)
+        self.bind("<Destroy>", self.on_destroy)
+        self.run_search()
+
+    def create_widgets(self):
+        """Creates and places all widgets in the library window."""
+        main_frame = ttk.Frame(self, padding="20")
+        main_frame.pack(expand=True, fill="both")
+
+        search_frame = ttk.Frame(main_frame)
+        search_frame.pack(pady=5, fill="x")
+        ttk.Label(search_frame, text="Search:").pack(side="left", padx=(0, 5))
+        self.search_entry = ttk.Entry(search_frame)
+        self.search_entry.pack(side="left", fill="x", expand=True)
+        self.search_entry.bind("<KeyRelease>", self.schedule_search)
+
+        # --- Entries ---
+        list_frame = ttk.Frame(main_frame)
+        list_frame.pack(pady=5, fill="both", expand=True)
+
+        self.entry_tree = ttk.Treeview(list_frame, columns=("title", "format", "size", "path"),
+                                       show="headings", height=14)
+        self.entry_tree.heading("title", text="Title")
+        self.entry_tree.heading("format", text="Format")
+        self.entry_tree.heading("size", text="Size")
+        self.entry_tree.heading("path", text="File")
+        self.entry_tree.column("title", width=230)
+        self.entry_tree.column("format", width=110)
+        self.entry_tree.column("size", width=70, anchor="e")
+        self.entry_tree.column("path", width=220)
+        self.entry_tree.pack(side="left", fill="both", expand=True)
+
+        scrollbar = ttk.Scrollbar(list_frame, orient="vertical", command=self.entry_tree.yview)
+        scrollbar.pack(side="right", fill="y")
+        self.entry_tree.configure(yscrollcommand=scrollbar.set)
+
+        self.summary_label = ttk.Label(main_frame, text="", anchor="center", wraplength=640)
+        self.summary_label.pack(pady=5, fill="x")
+
+        # --- Action Buttons ---
+        button_frame = ttk.Frame(main_frame)
+        button_frame.pack(pady=5, fill="x")
+
+        self.check_button = ttk.Button(button_frame, text="Check Files...", command=self.start_check,
+                                       bootstyle="primary-outline")
+        self.check_button.pack(side="left", expand=True, padx=5)
+
+        (ttk.Button(button_frame, text="Close", command=self.close_window, bootstyle="secondary-outline")
+            .pack(side="left", expand=True, padx=5))
+
+    def run_on_ui(self, name, func, *args):
+        """Schedules func on the Tk main thread, from any thread (newest update of each name wins)."""
+        if self.is_closing:
+            return
+        self.dispatcher.post((self, name), func, *args)
+
+    def schedule_search(self, event=None):
+        """Searches once the search box has been idle for a moment."""
+        if self.search_after_id is not None:
+            self.after_cancel(self.search_after_id)
+        self.search_after_id = self.after(200, self.run_search)
+
+    def run_search(self):
+        """Lists the entries matching the search box (the newest ones if it's empty)."""
+        self.search_after_id = None
+        library = get_library()
+        entries = library.search(self.search_entry.get())
+        self.entry_tree.delete(*self.entry_tree.get_children())
+        for entry in entries:
+            size = f"{entry['size'] / 1024 ** 2:.1f} MiB" if entry["size"] is not None else ""
+            self.entry_tree.insert("", "end", values=(entry["title"] or entry["video_id"], entry["format"] or "",
+                                                      size, entry["path"]))
+        if not self.checking:
+            self.summary_label.config(text=f"Showing {len(entries)} of {library.count()} downloads",
+                                      bootstyle="info")
+
+    def start_check(self):
+        """Reconciles the library with the disk, looking for moved files in a chosen folder."""
+        if self.checking:
+            return
+        folder = filedialog.askdirectory(title="Folder to look for moved files in (Cancel to skip)", parent=self)
+        self.checking = True
+        self.check_button.config(state="disabled")
+        self.summary_label.config(text="Checking files...", bootstyle="info")
+        threading.Thread(target=self.run_check, args=([folder] if folder else [],), daemon=True).start()
+
+    def run_check(self, folders):
+        """(THREAD) Runs the consistency check and reports the outcome."""
+        try:
+            counts = get_library().check(folders, on_progress=self.on_check_progress)
+            message = (f"Checked: {counts['ok']} OK | {counts['updated']} updated | {counts['moved']} moved | "
+                       f"{counts['removed']} removed (file gone)")
+            self.run_on_ui("checked", self.show_checked, message, "success")
+        except Exception as e:
+            self.run_on_ui("checked", self.show_checked, f"Check failed: {e}", "danger")
+
+    def on_check_progress(self, done, total):
+        """(THREAD) Shows how far the check got."""
+        self.run_on_ui("progress", self.show_check_progress, done, total)
+
+    def show_check_progress(self, done, total):
+        """Updates the summary while the check runs (main thread only)."""
+        if self.checking:
+            self.summary_label.config(text=f"Checking files... {done} / {total}")
+
+    def show_checked(self, message, style):
+        """Shows the check's outcome and refreshes the list (main thread only)."""
+        self.checking = False
+        self.check_button.config(state="normal")
+        self.run_search()
+        self.summary_label.config(text=message, bootstyle=style)
+
+    # --- Window Closing Methods ---
+
+    def on_destroy(self, event):
+        """Stops pending updates if the window is destroyed with its parent."""
+        if event.widget is self:
+            self.is_closing = True
+            self.dispatcher.discard(self)
+
+    def close_window(self):
+        """Closes the window."""
+        self.is_closing = True
+        if self.search_after_id is not None:
+            self.after_cancel(self.search_after_id)
+        self.dispatcher.discard(self)
+        self.destroy()